@@ -0,0 +1,214 @@
+"""
+Measures what each user action costs in firestore reads, writes and round trips, and how long it takes, by running the real pages against FakeFirestore instead of the Firebase project.
+
+The application runs in a temporary working directory, so no real user file or cache is touched. The report is written as JSON.
+
+Usage:
+  python actionBenchmark.py --latency 0.05 --history-days 365 --output report.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+
+from benchmarkHarness import open_window, working_directory
+from fakeFirestore import FakeFirestore, Increment
+from userSession import TOTAL_FIELD
+
+BENCHMARK_EMAIL = "benchmark@myproteinbuddy.test"
+BENCHMARK_PASSWORD = "benchmark"
+# Found in foods.csv, so logging it doesn't go to Nutritionix
+BENCHMARK_FOOD = "egg"
+
+
+def type_into(entry, text):
+  """
+  Replaces the text of an entry, like the user typing into it
+
+  Args
+    entry: tk Entry object
+        the entry typed into
+    text: str
+        the text typed
+  """
+  entry.delete(0, "end")
+  entry.insert(0, text)
+
+
+def sign_up(app, db):
+  """ Signs up a new user """
+  page = app.listing["EmailPassSignUp"]
+  type_into(page.email_box, BENCHMARK_EMAIL)
+  type_into(page.password_box, BENCHMARK_PASSWORD)
+  page.authenticate(None, app, db)
+
+
+def set_goal(app, db):
+  """ Sets the highest protein goal, so logging food never opens the congratulations message """
+  page = app.listing["GoalSetter"]
+  page.slider.set(200)
+  page.get_information(app, db)
+
+
+def log_food(app, db):
+  """ Searches for a food of the local table and logs two servings of it """
+  food_page = app.listing["FoodPage"]
+  type_into(food_page.search_box, BENCHMARK_FOOD)
+  food_page.search(None, app, db)
+  search_results = app.listing["SearchResults"]
+  type_into(search_results.serving_boxes[0], "2")
+  search_results.write_to_database(None, app, db)
+
+
+def view_stats(app, db):
+  """ Opens the stats page on the last seven days """
+  app.listing["StatsPage"].days.set(7)
+  app.listing["FoodPage"].clear_before_change(app, "StatsPage", db)
+
+
+def view_history(app, db):
+  """ Shows every day since the user started tracking on the stats page """
+  stats_page = app.listing["StatsPage"]
+  stats_page.days.set(0)
+  stats_page.refresh(app, db)
+
+
+def delete_food(app, db):
+  """ Deletes the first food of today's intake """
+  delete_page = app.listing["DeletePage"]
+  delete_page.food_list.selection_set(0)
+  delete_page.delete_food(app, db)
+
+
+def log_out(app, db):
+  """ Logs out """
+  app.listing["ProfilePage"].log_out(app)
+
+
+def log_in(app, db):
+  """ Logs the user back in """
+  page = app.listing["EmailPassLogIn"]
+  type_into(page.email_box, BENCHMARK_EMAIL)
+  type_into(page.password_box, BENCHMARK_PASSWORD)
+  page.authenticate(None, app, db)
+
+
+def warm_start(app, db):
+  """ Loads the logged in user's information like the application does when it starts with a user in user.txt """
+  app.tracker.unsubscribe()
+  app.tracker = None
+  app.get_information(db)
+
+
+# Each action measured, in the order the user does them
+ACTIONS = [("sign up", sign_up), ("set goal", set_goal),
+           ("log food", log_food), ("view stats", view_stats),
+           ("view history", view_history), ("delete food", delete_food),
+           ("log out", log_out), ("log in", log_in),
+           ("warm start", warm_start), ("log food again", log_food),
+           ("view stats again", view_stats)]
+
+
+def seed_history(db, days):
+  """
+  Writes past days of intake for the benchmark user, as if they had tracked for a while. The writes aren't counted.
+
+  Args
+    db: FakeFirestore object
+        the database written to
+    days: int
+        number of days before today written
+  """
+  days_ref = db.collection("users").document(BENCHMARK_EMAIL).collection("days")
+  today = datetime.date.today()
+  for start in range(1, days + 1, 499):
+    batch = db.batch()
+    for offset in range(start, min(start + 499, days + 1)):
+      date = str(today - datetime.timedelta(offset))
+      batch.set(days_ref.document(date), {
+        "chicken": Increment(30 + offset % 20),
+        TOTAL_FIELD: Increment(30 + offset % 20)
+      },
+                merge=True)
+    batch.commit()
+  db.reset_stats()
+
+
+def run_benchmark(latency, history_days, path):
+  """
+  Runs every action of ACTIONS against a FakeFirestore and measures each one
+
+  Args
+    latency: float
+        seconds each round trip to the database takes
+    history_days: int
+        past days of intake written for the user after they set their goal
+    path: str
+        SQLite file the documents are kept in, or ":memory:"
+
+  Returns
+    dict: the report
+  """
+  report = {
+    "created": datetime.datetime.now().isoformat(timespec="seconds"),
+    "latency_seconds": latency,
+    "history_days": history_days,
+    "actions": []
+  }
+  # The application runs in a temporary directory, so the SQLite file is found before moving there
+  if path != ":memory:":
+    path = os.path.abspath(path)
+  with working_directory():
+    db = FakeFirestore(path, latency)
+    app, error = open_window(db)
+    if app is None:
+      report["error"] = error
+      return report
+    app.update()
+    for name, action in ACTIONS:
+      db.reset_stats()
+      start = time.perf_counter()
+      action(app, db)
+      app.update()
+      measured = db.stats()
+      measured["ms"] = round((time.perf_counter() - start) * 1000, 2)
+      report["actions"].append({"action": name, **measured})
+      if action is set_goal:
+        seed_history(db, history_days)
+    app.destroy()
+  return report
+
+
+def main():
+  """ Runs the benchmark from the command line """
+  parser = argparse.ArgumentParser(
+    description="Measure the firestore cost of each user action")
+  parser.add_argument("--latency",
+                      type=float,
+                      default=0,
+                      help="seconds each round trip takes")
+  parser.add_argument("--history-days",
+                      type=int,
+                      default=365,
+                      help="past days of intake the user has")
+  parser.add_argument("--sqlite",
+                      default=":memory:",
+                      help="SQLite file the documents are kept in")
+  parser.add_argument("--output", help="file the JSON report is written to")
+  args = parser.parse_args()
+  report = run_benchmark(args.latency, args.history_days, args.sqlite)
+  text = json.dumps(report, indent=2)
+  if args.output is None:
+    print(text)
+  else:
+    with open(args.output, "w") as file:
+      file.write(text + "\n")
+  if "error" in report:
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,598 @@
+"""
+An HTTP API for MyProteinBuddy, so one process can serve many users at once instead of one desktop window per user.
+
+Requests are read with asyncio streams, so thousands of open connections only cost a coroutine each. The firestore calls of ProteinTracker block, so they run on a bounded pool of threads sharing one firestore client, whose connection to Google is reused by every request. Each user's tracker is kept between requests, so a request usually costs no read at all.
+
+Every endpoint except sign up uses HTTP basic authentication with the user's email and password. Bodies and answers are JSON, and errors are answered as {"message": ...}.
+
+  POST   /users   {"email": ..., "password": ...}   signs up
+  GET    /today                                     today's foods, intake, goal and streak
+  POST   /foods   {"foods": {name: grams}}          logs foods
+  DELETE /foods   {"foods": [name, ...]}            deletes foods logged today
+  GET    /stats?days=30                             statistics of the last days
+  PUT    /goal    {"goal": grams}                   changes the protein goal
+
+Usage:
+  python apiServer.py --port 8080
+  python apiServer.py --port 8080 --fake data.sqlite
+"""
+
+import argparse
+import asyncio
+import base64
+import binascii
+import collections
+import concurrent.futures
+import datetime
+import json
+import math
+import time
+import urllib.parse
+
+from proteinTracker import TOTAL_FIELD, ProteinTracker
+
+# Threads running firestore calls, which is also the most firestore calls in flight at once
+WORKERS = 32
+# Users whose tracker is kept in memory before the least recently used one is dropped
+TRACKER_CACHE_SIZE = 1000
+# Seconds a tracker is kept before it is loaded again, so changes such as a new password are picked up
+TRACKER_TTL = 300
+# Largest body accepted, in bytes
+MAX_BODY = 64 * 1024
+# Seconds a connection may stay silent before it is closed
+IDLE_TIMEOUT = 30
+# Longest history the stats endpoint returns
+MAX_DAYS = 3650
+# Longest food name accepted, well under firestore's limit on field names
+MAX_FOOD_NAME = 100
+REASONS = {
+  200: "OK",
+  201: "Created",
+  400: "Bad Request",
+  401: "Unauthorized",
+  404: "Not Found",
+  405: "Method Not Allowed",
+  409: "Conflict",
+  411: "Length Required",
+  413: "Payload Too Large",
+  500: "Internal Server Error"
+}
+
+
+class HTTPError(Exception):
+  """
+  Class for an error answered to the client
+
+  Attributes
+    status: int
+        HTTP status of the answer
+    message: str
+        explanation sent to the client
+  """
+
+  def __init__(self, status, message):
+    """
+    Initializes HTTPError.
+
+    Args
+      status: int
+          HTTP status of the answer
+      message: str
+          explanation sent to the client
+    """
+    Exception.__init__(self, message)
+    self.status = status
+    self.message = message
+
+
+def is_valid_email(email):
+  """
+  Checks an email the same way the sign up page does: it needs a domain, and no forward slash as it is used in firestore paths
+
+  Args
+    email: str
+        the email
+
+  Returns
+    bool: True if the email can be used
+  """
+  return len(email.split("@")[-1].split(".")) == 2 and "/" not in email
+
+
+def is_grams(value):
+  """
+  Checks that a value of a body is an amount of grams. JSON true and false are not numbers here, and NaN and Infinity are refused.
+
+  Args
+    value: Any
+        the value
+
+  Returns
+    bool: True if the value is a finite number
+  """
+  return isinstance(value, (int, float)) and not isinstance(
+    value, bool) and math.isfinite(value)
+
+
+def is_food_name(name):
+  """
+  Checks that a value of a body can name a food: firestore refuses empty field names, and the day's total can't be used
+
+  Args
+    name: Any
+        the value
+
+  Returns
+    bool: True if the value can be used as a food name
+  """
+  return isinstance(name, str) and name.strip() != "" and len(
+    name) <= MAX_FOOD_NAME and name.replace(" ", "_") != TOTAL_FIELD
+
+
+def stats_of(engine, goal):
+  """
+  Turns the statistics of a period into JSON
+
+  Args
+    engine: StatsEngine object
+        intake of every day of the period
+    goal: float
+        the user's protein goal
+
+  Returns
+    dict: the intake of each day, the average of the last seven days, the goal hit rate and the band of a usual day
+  """
+  low, middle, high = engine.percentile_bands((25, 50, 75))
+  return {
+    "days": {
+      str(date): float(total)
+      for date, total in zip(engine.dates, engine.totals)
+    },
+    "week_average": float(engine.rolling_average(7)[-1]),
+    "goal_hit_rate": engine.goal_hit_rate(goal),
+    "usual_day": {
+      "p25": float(low),
+      "p50": float(middle),
+      "p75": float(high)
+    }
+  }
+
+
+class TrackerServer:
+  """
+  Class for the HTTP API. Requests of different users run at the same time, while the requests of one user run one after the other as they change the same tracker.
+
+  Attributes
+    db: firestore client object
+        shared by every request
+    executor: ThreadPoolExecutor object
+        runs the blocking firestore calls
+    trackers: OrderedDict
+        tracker of each user and the time it was loaded, least recently used first
+    locks: dict
+        asyncio Lock of each user, so one user's requests run in order
+    requests: int
+        number of requests answered
+
+  Methods
+    start(self, host, port)
+        starts listening for connections
+    handle_connection(self, reader, writer)
+        answers the requests of one connection
+    read_request(self, reader)
+        reads one request
+    respond(self, method, path, headers, body)
+        answers one request
+    run(self, function, *args)
+        runs a blocking call on the executor
+    tracker_for(self, headers)
+        returns the tracker of the user authenticated by a request
+    sign_up(self, body)
+        creates a user
+    keep_tracker(self, email, tracker)
+        keeps a user's tracker, forgetting the least recently used one once the cache is full
+    drop_tracker(self, email)
+        forgets a user's tracker
+    forget_lock(self, email)
+        forgets a user's lock once no tracker of theirs is kept
+  """
+
+  def __init__(self, db, workers=WORKERS):
+    """
+    Initializes TrackerServer.
+
+    Args
+      db: firestore client object
+          shared by every request
+      workers: int
+          threads running firestore calls
+    """
+    self.db = db
+    self.executor = concurrent.futures.ThreadPoolExecutor(workers)
+    self.trackers = collections.OrderedDict()
+    self.locks = {}
+    self.requests = 0
+
+  async def start(self, host, port):
+    """
+    Starts listening for connections
+
+    Args
+      host: str
+          address listened on
+      port: int
+          port listened on
+
+    Returns
+      asyncio Server object: the server, already accepting connections
+    """
+    # Learned how to serve connections with streams using https://docs.python.org/3/library/asyncio-stream.html
+    return await asyncio.start_server(self.handle_connection, host, port)
+
+  async def handle_connection(self, reader, writer):
+    """
+    Answers the requests of one connection, keeping it open between requests unless the client asks to close it
+
+    Args
+      reader: StreamReader object
+          reads from the connection
+      writer: StreamWriter object
+          writes to the connection
+    """
+    try:
+      while True:
+        try:
+          request = await asyncio.wait_for(self.read_request(reader),
+                                           IDLE_TIMEOUT)
+        except HTTPError as error:
+          await self.write_response(writer, error.status,
+                                    {"message": error.message}, False)
+          break
+        if request is None:
+          break
+        method, path, headers, body = request
+        try:
+          status, answer = await self.respond(method, path, headers, body)
+        except HTTPError as error:
+          status, answer = error.status, {"message": error.message}
+        # An unexpected error is answered without stopping the server
+        except Exception:
+          status, answer = 500, {"message": "Internal error"}
+        self.requests += 1
+        keep_alive = headers.get("connection", "").lower() != "close"
+        await self.write_response(writer, status, answer, keep_alive)
+        if not keep_alive:
+          break
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError,
+            ConnectionError):
+      pass
+    finally:
+      writer.close()
+
+  async def read_request(self, reader):
+    """
+    Reads one request
+
+    Args
+      reader: StreamReader object
+          reads from the connection
+
+    Returns
+      tuple: the method, path, headers (lowercase names) and body, or None if the client closed the connection
+
+    Raises
+      HTTPError: if the request can't be read
+    """
+    line = await reader.readline()
+    if line == b"":
+      return None
+    try:
+      method, path, version = line.decode("latin-1").split()
+    except ValueError:
+      raise HTTPError(400, "Malformed request line")
+    headers = {}
+    while True:
+      line = await reader.readline()
+      if line in (b"\r\n", b"\n", b""):
+        break
+      name, _, value = line.decode("latin-1").partition(":")
+      headers[name.strip().lower()] = value.strip()
+    if "transfer-encoding" in headers:
+      raise HTTPError(411, "Send a Content-Length instead")
+    try:
+      length = int(headers.get("content-length", 0))
+    except ValueError:
+      raise HTTPError(400, "Invalid Content-Length")
+    if length > MAX_BODY:
+      raise HTTPError(413, "Body too large")
+    body = await reader.readexactly(length)
+    return method.upper(), path, headers, body
+
+  async def write_response(self, writer, status, answer, keep_alive):
+    """
+    Writes an answer as JSON
+
+    Args
+      writer: StreamWriter object
+          writes to the connection
+      status: int
+          HTTP status of the answer
+      answer: dict
+          the answer
+      keep_alive: bool
+          whether the connection stays open for another request
+    """
+    body = json.dumps(answer).encode()
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n")
+    if status == 401:
+      head += 'WWW-Authenticate: Basic realm="MyProteinBuddy"\r\n'
+    writer.write(head.encode("latin-1") + b"\r\n" + body)
+    await writer.drain()
+
+  async def respond(self, method, path, headers, body):
+    """
+    Answers one request
+
+    Args
+      method: str
+          HTTP method
+      path: str
+          path of the request, with its query string
+      headers: dict
+          headers of the request, with lowercase names
+      body: bytes
+          body of the request
+
+    Returns
+      tuple: the HTTP status and the answer
+
+    Raises
+      HTTPError: if the request can't be answered
+    """
+    url = urllib.parse.urlsplit(path)
+    routes = {
+      "/users": ["POST"],
+      "/today": ["GET"],
+      "/foods": ["POST", "DELETE"],
+      "/stats": ["GET"],
+      "/goal": ["PUT"]
+    }
+    if url.path not in routes:
+      raise HTTPError(404, "Unknown endpoint")
+    if method not in routes[url.path]:
+      raise HTTPError(405, "Method not allowed")
+    try:
+      data = json.loads(body) if body else {}
+    except ValueError:
+      raise HTTPError(400, "Body is not valid JSON")
+    if not isinstance(data, dict):
+      raise HTTPError(400, "Body must be a JSON object")
+    if url.path == "/users":
+      return 201, await self.sign_up(data)
+    email, tracker = await self.tracker_for(headers)
+    # One user's requests run one after the other, as they change the same tracker
+    async with self.locks.setdefault(email, asyncio.Lock()):
+      # Apply what other devices changed since the last request
+      tracker.apply_updates()
+      if url.path == "/today":
+        return 200, tracker.today_summary()
+      if url.path == "/foods" and method == "POST":
+        foods = data.get("foods")
+        if not isinstance(foods, dict) or len(foods) == 0 or not all(
+            is_food_name(name) and is_grams(grams) and grams > 0
+            for name, grams in foods.items()):
+          raise HTTPError(400, "foods must map food names to grams")
+        await self.run(tracker.log_food, foods)
+        return 200, tracker.today_summary()
+      if url.path == "/foods":
+        foods = data.get("foods")
+        if not isinstance(foods, list) or not all(
+            is_food_name(food) for food in foods):
+          raise HTTPError(400, "foods must list food names")
+        await self.run(tracker.delete_foods, foods)
+        return 200, tracker.today_summary()
+      if url.path == "/goal":
+        goal = data.get("goal")
+        if not is_grams(goal) or not 0 <= goal <= 1000:
+          raise HTTPError(400, "goal must be a number of grams")
+        await self.run(tracker.set_goal, goal)
+        return 200, tracker.today_summary()
+      # The stats of the last days, today included
+      query = urllib.parse.parse_qs(url.query)
+      try:
+        days = int(query.get("days", ["30"])[0])
+      except ValueError:
+        raise HTTPError(400, "days must be a number")
+      if not 1 <= days <= MAX_DAYS:
+        raise HTTPError(400, f"days must be between 1 and {MAX_DAYS}")
+      today = datetime.date.today()
+      engine = await self.run(tracker.history,
+                              today - datetime.timedelta(days - 1), today)
+      return 200, {
+        **stats_of(engine, tracker.protein_goal()), "streak": tracker.streak()
+      }
+
+  async def run(self, function, *args):
+    """
+    Runs a blocking call on the executor, so the event loop keeps answering other requests
+
+    Args
+      function: function
+          the blocking call
+      args: tuple
+          arguments of the call
+
+    Returns
+      Any: the result of the call
+    """
+    return await asyncio.get_running_loop().run_in_executor(
+      self.executor, function, *args)
+
+  async def tracker_for(self, headers):
+    """
+    Gets the tracker of the user authenticated by a request. Trackers are kept between requests, so most requests don't read the user's document again.
+
+    Args
+      headers: dict
+          headers of the request, with lowercase names
+
+    Returns
+      tuple: the user's email and tracker
+
+    Raises
+      HTTPError: if the request isn't authenticated
+    """
+    scheme, _, credentials = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "basic":
+      raise HTTPError(401, "Log in with your email and password")
+    try:
+      email, _, password = base64.b64decode(credentials).decode().partition(
+        ":")
+    except (binascii.Error, UnicodeDecodeError):
+      raise HTTPError(401, "Malformed credentials")
+    if not is_valid_email(email):
+      raise HTTPError(401, "Email or password is incorrect")
+    async with self.locks.setdefault(email, asyncio.Lock()):
+      cached = self.trackers.get(email)
+      if cached is not None and time.monotonic() - cached[1] > TRACKER_TTL:
+        self.drop_tracker(email)
+        cached = None
+      if cached is None:
+        # Nothing is written before the password is checked, so guessing passwords can't migrate a user
+        tracker = await self.run(ProteinTracker.fetch, self.db, email)
+        # Only a user who logged in gets a tracker kept and a listener, so guessing emails can't fill the cache
+        if tracker is None or not tracker.check_password(password):
+          authenticated = False
+        else:
+          authenticated = True
+          await self.run(tracker.prepare)
+          # Listen to today's intake so changes from the desktop application show up
+          await self.run(tracker.subscribe)
+          self.keep_tracker(email, tracker)
+      else:
+        tracker = cached[0]
+        authenticated = tracker.check_password(password)
+        if authenticated:
+          self.trackers.move_to_end(email)
+    if not authenticated:
+      self.forget_lock(email)
+      raise HTTPError(401, "Email or password is incorrect")
+    return email, tracker
+
+  async def sign_up(self, body):
+    """
+    Creates a user
+
+    Args
+      body: dict
+          the email and password of the new user
+
+    Returns
+      dict: the new user's summary of today
+
+    Raises
+      HTTPError: if the email or password can't be used, or the email is taken
+    """
+    email = body.get("email")
+    password = body.get("password")
+    if not isinstance(email, str) or not is_valid_email(email):
+      raise HTTPError(400, "Email is invalid")
+    if not isinstance(password, str) or len(password) < 4:
+      raise HTTPError(400, "Password must be at least 4 characters long")
+    async with self.locks.setdefault(email, asyncio.Lock()):
+      tracker = await self.run(ProteinTracker.sign_up, self.db, email,
+                               password)
+      if tracker is None:
+        raise HTTPError(409, "Email is already used")
+      await self.run(tracker.subscribe)
+      self.keep_tracker(email, tracker)
+    return tracker.today_summary()
+
+  def keep_tracker(self, email, tracker):
+    """
+    Keeps a user's tracker as the most recently used, forgetting the least recently used tracker once the cache is full
+
+    Args
+      email: str
+          email of the user
+      tracker: ProteinTracker object
+          the user's tracker, already listening to their intake
+    """
+    self.trackers[email] = (tracker, time.monotonic())
+    self.trackers.move_to_end(email)
+    while len(self.trackers) > TRACKER_CACHE_SIZE:
+      self.drop_tracker(next(iter(self.trackers)))
+
+  def drop_tracker(self, email):
+    """
+    Forgets a user's tracker and stops listening to their intake
+
+    Args
+      email: str
+          email of the user
+    """
+    tracker, loaded = self.trackers.pop(email)
+    tracker.unsubscribe()
+    self.forget_lock(email)
+
+  def forget_lock(self, email):
+    """
+    Forgets a user's lock once no tracker of theirs is kept. It is kept if a request of the user holds it or waits on it.
+
+    Args
+      email: str
+          email of the user
+    """
+    lock = self.locks.get(email)
+    if email not in self.trackers and lock is not None and not lock.locked():
+      del self.locks[email]
+
+
+async def serve(host, port, db, workers):
+  """
+  Runs the server until it is interrupted
+
+  Args
+    host: str
+        address listened on
+    port: int
+        port listened on
+    db: firestore client object
+        shared by every request
+    workers: int
+        threads running firestore calls
+  """
+  server = TrackerServer(db, workers)
+  listener = await server.start(host, port)
+  print(f"Serving on http://{host}:{port}")
+  async with listener:
+    await listener.serve_forever()
+
+
+def main():
+  """ Runs the server from the command line """
+  parser = argparse.ArgumentParser(description="Serve the MyProteinBuddy API")
+  parser.add_argument("--host", default="127.0.0.1")
+  parser.add_argument("--port", type=int, default=8080)
+  parser.add_argument("--workers", type=int, default=WORKERS)
+  parser.add_argument(
+    "--fake",
+    help="SQLite file used instead of firestore, or :memory: for a throwaway one")
+  args = parser.parse_args()
+  if args.fake is not None:
+    from fakeFirestore import FakeFirestore
+    db = FakeFirestore(args.fake)
+  else:
+    from lazyDatabase import LazyDatabase
+    db = LazyDatabase()
+  try:
+    asyncio.run(serve(args.host, args.port, db, args.workers))
+  except KeyboardInterrupt:
+    pass
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,71 @@
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+
+# Files the application reads from its working directory when it starts
+ASSETS = ["little_mascot.gif", "foods.csv"]
+# Folder holding the application's modules and assets
+SOURCE = os.path.dirname(os.path.abspath(__file__))
+
+
+def prepare_directory(directory, user_email=""):
+  """
+  Fills a working directory for the application: its assets and a user.txt, so no real user file or cache is touched
+
+  Args
+    directory: str
+        the directory filled
+    user_email: str
+        email written to user.txt, so the application starts logged in, or "" to start on the welcome page
+  """
+  for asset in ASSETS:
+    if os.path.exists(os.path.join(SOURCE, asset)):
+      shutil.copy(os.path.join(SOURCE, asset), directory)
+  with open(os.path.join(directory, "user.txt"), "w") as file:
+    file.write(user_email)
+
+
+@contextlib.contextmanager
+def working_directory(user_email=""):
+  """
+  Runs the application in a temporary working directory filled by prepare_directory, moving back to the previous directory afterwards
+
+  Args
+    user_email: str
+        email written to user.txt, or "" to start on the welcome page
+
+  Returns
+    generator: yields the temporary directory
+  """
+  if SOURCE not in sys.path:
+    sys.path.insert(0, SOURCE)
+  previous = os.getcwd()
+  with tempfile.TemporaryDirectory() as directory:
+    prepare_directory(directory, user_email)
+    os.chdir(directory)
+    try:
+      yield directory
+    finally:
+      os.chdir(previous)
+
+
+def open_window(db):
+  """
+  Builds the application's window on a database
+
+  Args
+    db: firestore client object
+        the database given to every page
+
+  Returns
+    tuple: the MainFrame, and None, or None and the error if no window could be opened
+  """
+  import tkinter as tk
+  import main
+  try:
+    return main.MainFrame(db=db), None
+  # Tkinter can't open a window without a display
+  except tk.TclError as error:
+    return None, f"TclError: {error}"
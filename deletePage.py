@@ -1,7 +1,6 @@
 import tkinter as tk
-from firebase_admin import firestore
 import tkinter.messagebox as messagebox
-import datetime
+from listModel import ListModel, food_row
 
 
 class DeletePage(tk.Frame):
@@ -11,6 +10,8 @@ class DeletePage(tk.Frame):
   Attributes
     food_list: tkinter Listbox object
         stores the user's food list
+    food_model: ListModel object
+        firestore keys and amounts of the foods shown in food_list
     
   Methods
     return_to_food(self, controller, db)
@@ -47,6 +48,7 @@ class DeletePage(tk.Frame):
                                 selectmode=tk.MULTIPLE,
                                 width=20,
                                 height=8)
+    self.food_model = ListModel(self.food_list, food_row)
     # Create button with function to return to food page
     return_to_food = tk.Button(
       self,
@@ -72,6 +74,9 @@ class DeletePage(tk.Frame):
     self.food_list.grid(row=0, column=1, pady=5)
     delete.grid(row=1, column=1, pady=5)
     return_to_food.grid(row=2, column=1, pady=5)
+    # The page is built the first time it is shown, which may be after the user logged in
+    if controller.tracker is not None:
+      self.get_food(controller, db)
 
   def get_food(self, controller, db):
     """
@@ -83,17 +88,8 @@ class DeletePage(tk.Frame):
       db: firestore client object
           Used to access firestore database to persist information
     """
-    doc_ref = db.collection('users').document(controller.user_email)
-    doc = doc_ref.get()
-    today = str(datetime.date.today())
-    # Empty food list before adding other items
-    self.food_list.delete(0, "end")
-    # For food in today, add the food to the list
-    if today in doc.to_dict():
-      for food in doc.to_dict()[today]:
-        if food != "total_intake":
-          self.food_list.insert(
-            "end", f"{food.replace('_', ' ')}: {doc.to_dict()[today][food]}")
+    # Only the rows of foods that were added, changed or removed are touched
+    self.food_model.sync(controller.tracker.today_foods())
 
   def delete_food(self, controller, db):
     """
@@ -105,22 +101,13 @@ class DeletePage(tk.Frame):
       db: firestore client object
           Used to access firestore database to persist information
     """
-    today = str(datetime.date.today())
-    doc_ref = db.collection("users").document(controller.user_email)
-    # Learned to access selected row using https://www.geeksforgeeks.org/how-to-get-selected-value-from-listbox-in-tkinter/. For each selection, the food is deleted from the food list and eliminated from the database
+    # Learned to access selected row using https://www.geeksforgeeks.org/how-to-get-selected-value-from-listbox-in-tkinter/. All selected foods are eliminated from the database in one batched write, then removed from the food list
     # Checks if the user has selected their food
-    if len(self.food_list.curselection()) != 0:
-      # As the list will shift up for each food deleted, continuously delete the food at that index.
-      mutable_food_list = list(self.food_list.curselection())
-      for i in mutable_food_list:
-        food = self.food_list.get(i).split(": ")[0]
-        doc_ref.update(
-          {f"{today}.{food.replace(' ', '_')}": firestore.DELETE_FIELD})
-        self.food_list.delete(i)
-        # Shift all values up one as one is deleted
-        for i in range(len(mutable_food_list)):
-          # i-1 as lists begin at 0
-          mutable_food_list[i - 1] = mutable_food_list[i - 1] - 1
+    selection = self.food_list.curselection()
+    if len(selection) != 0:
+      controller.tracker.delete_foods(
+        [self.food_model.keys[i] for i in selection])
+      self.food_model.remove(selection)
     else:
       messagebox.showwarning(title="Error", message="Please select a food.")
 
@@ -1,6 +1,6 @@
 import tkinter as tk
 import tkinter.messagebox as messagebox
-import datetime
+from proteinTracker import ProteinTracker
 
 
 class EmailPassLogIn(tk.Frame):
@@ -14,10 +14,16 @@ class EmailPassLogIn(tk.Frame):
         used for user's password, accesses in other functions
     show_hide_pass: tk Button object
         used to change if the user can see password or not
+    login_button: tk Button object
+        used to log in, disabled while waiting for the database
         
   Methods
     authenticate(self, controller, db)
         authenticates the user
+    log_in(self, controller, db, user_email, user_password)
+        logs the user in once the database is ready
+    show_connection_error(self, error)
+        tells the user the database could not be reached
     show_hide_password(self)
         shows or hides the user's password
     go_to_welcome(self, event):
@@ -61,14 +67,15 @@ class EmailPassLogIn(tk.Frame):
                                     fg=controller.BEIGE,
                                     font=controller.titlefont,
                                     command=lambda: self.show_hide_password())
-    login = tk.Button(self,
-                      text="Log in",
-                      activebackground=controller.BEIGE2,
-                      activeforeground=controller.BROWN,
-                      bg=controller.ALMOND,
-                      fg=controller.BEIGE,
-                      font=controller.titlefont,
-                      command=lambda: self.authenticate("", controller, db))
+    self.login_button = tk.Button(
+      self,
+      text="Log in",
+      activebackground=controller.BEIGE2,
+      activeforeground=controller.BROWN,
+      bg=controller.ALMOND,
+      fg=controller.BEIGE,
+      font=controller.titlefont,
+      command=lambda: self.authenticate("", controller, db))
     back_button = tk.Button(self,
                             text="Back to welcome page",
                             activebackground=controller.BEIGE2,
@@ -93,7 +100,7 @@ class EmailPassLogIn(tk.Frame):
     self.password_box.grid(row=3, column=1)
     # Learned how to pad items using https://www.reddit.com/r/learnpython/comments/pumip2/tkinter_make_some_space_between_elements/
     self.show_hide_pass.grid(row=4, column=1, pady=5)
-    login.grid(row=5, column=1, pady=5)
+    self.login_button.grid(row=5, column=1, pady=5)
     back_button.grid(row=6, column=1, pady=5)
 
   def show_hide_password(self):
@@ -120,52 +127,94 @@ class EmailPassLogIn(tk.Frame):
       db: firestore client object
           Used to access firestore database to persist information
     """
+    # A log in is already waiting for the database
+    if self.login_button["state"] == "disabled":
+      return
     user_email = self.email_box.get().rstrip()
     # Checks if email has a domain. If it does not have a domain, an error is shown. Cannot have forward slash as to not impede with firestore.
     if len(user_email.split("@")[-1].split(".")) != 2 or "/" in user_email:
       messagebox.showwarning(title="Error", message="Email is invalid")
     else:
       user_password = self.password_box.get().rstrip()
-      doc_ref = db.collection('users').document(user_email)
-      doc = doc_ref.get()
-      # Checks if email is in database. If it isn't, an error is shown
-      if doc.exists:
-        # Checks if password is correct by comparing user input the password stores in database. If it is not correct, an error is shown. Otherwise, a new dictionary is set for today's intake if the user hasn't logged any food yet. 
-        if doc.to_dict()["password"] != user_password:
-          messagebox.showwarning(title="Error",
-                                 message="Your password is incorrect")
-        else:
-          today = str(datetime.date.today())
-          doc_ref = db.collection('users').document(user_email)
-          if today not in doc.to_dict():
-            doc_ref.set({today: {"total_intake": 0}}, merge=True)
-          controller.user_email = user_email
-          # Learned how to clear a entry widget using https://sites.google.com/a/pythonlake.com/django/tkinterentrydelete
-          self.email_box.delete(0, "end")
-          # Learned how to clear an entry widget using https://sites.google.com/a/pythonlake.com/django/tkinterentrydelete
-          self.password_box.delete(0, "end")
-          # Write user into text file so that when they log in, they remain logged in unless they choose to log out.
-          with open("user.txt", "w") as file:
-            file.write(user_email)
-          # Get food in food page
-          controller.listing["FoodPage"].get_food(controller, "initial", db)
-          # Get food in delete page
-          controller.listing["DeletePage"].get_food(controller, db)
-          # Create bar in food page
-          controller.listing["FoodPage"].create_bar(controller)
+      # Wait for the firestore client without freezing the window if it is still connecting
+      self.login_button.configure(text="Connecting...", state="disabled")
+      controller.when_database_ready(
+        db,
+        lambda: self.log_in(controller, db, user_email, user_password),
+        self.show_connection_error)
+
+  def log_in(self, controller, db, user_email, user_password):
+    """
+    Logs the user in once the database is ready
+
+    Args
+      controller: Tk object
+          Used to allow page changes and to access appliction attributes
+      db: firestore client object
+          Used to access firestore database to persist information
+      user_email: str
+          email typed by the user
+      user_password: str
+          password typed by the user
+    """
+    self.login_button.configure(text="Log in", state="normal")
+    # The user's document and today's intake are fetched together, and shared with every page so that logging in costs a single round trip. Nothing is written until the password is checked.
+    tracker = ProteinTracker.fetch(db, user_email)
+    # Checks if email is in database. If it isn't, an error is shown
+    if tracker is not None:
+      # Checks if password is correct by comparing user input the password stores in database. If it is not correct, an error is shown.
+      if not tracker.check_password(user_password):
+        messagebox.showwarning(title="Error",
+                               message="Your password is incorrect")
+      else:
+        # Move a user still on the old layout to day documents
+        tracker.prepare()
+        controller.tracker = tracker
+        # Listen to today's intake so changes from other devices show up
+        tracker.subscribe()
+        controller.user_email = user_email
+        # Learned how to clear a entry widget using https://sites.google.com/a/pythonlake.com/django/tkinterentrydelete
+        self.email_box.delete(0, "end")
+        # Learned how to clear an entry widget using https://sites.google.com/a/pythonlake.com/django/tkinterentrydelete
+        self.password_box.delete(0, "end")
+        # Write user into text file so that when they log in, they remain logged in unless they choose to log out.
+        with open("user.txt", "w") as file:
+          file.write(user_email)
+        # Get food in food page and delete page
+        controller.listing["FoodPage"].get_food(controller, "initial", db)
+        # Create bar in food page
+        controller.listing["FoodPage"].create_bar(controller, db)
+        # Pages that weren't built yet get the user's information when they are built
+        if "StatsPage" in controller.listing:
           # Create graph in stats page
-          controller.listing["StatsPage"].create_graph(controller, db)
+          controller.listing["StatsPage"].refresh(controller, db)
+        if "ProfilePage" in controller.listing:
           # Get necessary information for profile page
           controller.listing["ProfilePage"].get_intake(controller, db)
-          # Set cursor in search box at food page
-          controller.listing["FoodPage"].search_box.focus_set()
-          # Go to food page
-          controller.up_frame("FoodPage")
-      else:
-        messagebox.showwarning(
-          title="Error",
-          message="Your email is not in our database. Did you mean to sign up?"
-        )
+        # Set cursor in search box at food page
+        controller.listing["FoodPage"].search_box.focus_set()
+        # Go to food page
+        controller.up_frame("FoodPage")
+    else:
+      messagebox.showwarning(
+        title="Error",
+        message="Your email is not in our database. Did you mean to sign up?"
+      )
+
+  def show_connection_error(self, error):
+    """
+    Tells the user the database could not be reached
+
+    Args
+      error: Exception
+          the error raised while connecting
+    """
+    self.login_button.configure(text="Log in", state="normal")
+    messagebox.showwarning(
+      title="Error",
+      message=
+      "Could not connect to the database. Check your connection and restart the application."
+    )
 
   def go_to_welcome(self, controller): 
     """
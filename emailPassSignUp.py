@@ -1,6 +1,6 @@
 import tkinter as tk
 import tkinter.messagebox as messagebox
-import datetime
+from proteinTracker import ProteinTracker
 
 
 class EmailPassSignUp(tk.Frame):
@@ -14,10 +14,16 @@ class EmailPassSignUp(tk.Frame):
         used for user's password, accesses in other functions
     show_hide_pass: tk Button object
         used to change if the user can see
+    signup_button: tk Button object
+        used to sign up, disabled while waiting for the database
     
   Methods
     authenticate(self, controller, db)
         authenticates the user
+    sign_up(self, controller, db, user_email, user_password)
+        creates the user once the database is ready
+    show_connection_error(self, error)
+        tells the user the database could not be reached
     show_hide_password(self)
         shows or hides the user's password
     go_to_welcome(self, event):
@@ -60,14 +66,15 @@ class EmailPassSignUp(tk.Frame):
                                     fg=controller.BEIGE,
                                     font=controller.titlefont,
                                     command=lambda: self.show_hide_password())
-    signup = tk.Button(self,
-                       text="Sign up",
-                       activebackground=controller.BEIGE2,
-                       activeforeground=controller.BROWN,
-                       bg=controller.ALMOND,
-                       fg=controller.BEIGE,
-                       font=controller.titlefont,
-                       command=lambda: self.authenticate("", controller, db))
+    self.signup_button = tk.Button(
+      self,
+      text="Sign up",
+      activebackground=controller.BEIGE2,
+      activeforeground=controller.BROWN,
+      bg=controller.ALMOND,
+      fg=controller.BEIGE,
+      font=controller.titlefont,
+      command=lambda: self.authenticate("", controller, db))
     back_button = tk.Button(self,
                             text="Back to welcome page",
                             activebackground=controller.BEIGE2,
@@ -91,7 +98,7 @@ class EmailPassSignUp(tk.Frame):
     password.grid(row=2, column=1)
     self.password_box.grid(row=3, column=1)
     self.show_hide_pass.grid(row=4, column=1, pady=5)
-    signup.grid(row=5, column=1, pady=5)
+    self.signup_button.grid(row=5, column=1, pady=5)
     back_button.grid(row=6, column=1, pady=5)
 
   def show_hide_password(self):
@@ -119,6 +126,9 @@ class EmailPassSignUp(tk.Frame):
       db: firestore client object
           Used to access firestore database to persist information
     """
+    # A sign up is already waiting for the database
+    if self.signup_button["state"] == "disabled":
+      return
     user_email = self.email_box.get().rstrip()
     # Checks if email has a domain. If it does not have a domain, an error is shown
     if len(user_email.split("@")[-1].split(".")) != 2 or "/" in user_email:
@@ -130,35 +140,65 @@ class EmailPassSignUp(tk.Frame):
         messagebox.showwarning(
           title="Error", message="Password must be at least 4 characters long")
       else:
-        doc_ref = db.collection('users').document(user_email)
-        doc = doc_ref.get()
-        # Checks the database is the email is already registered. If it is, an error is shown indicating to the user that they might want to log in. Otherwise, a new field for the user's intake today is initialized and the email is written to the text file. Pages needed to be set up are set up.
-        if doc.exists:
-          messagebox.showwarning(
-            title="Error",
-            message=
-            "Your email is already in our database, did you mean to log in?")
-        else:
-          today = str(datetime.date.today())
-          user_json = {
-            "password": user_password,
-            today: {
-              "total_intake": 0
-            },
-            "protein_goal": 0
-          }
-          doc_ref = db.collection('users').document(user_email)
-          doc_ref.set(user_json)
-          controller.user_email = user_email
-          # Clear entry widgets
-          self.email_box.delete(0, "end")
-          self.password_box.delete(0, "end")
-          controller.up_frame("GoalSetter")
-          # Write the user's email into the file to make sure they stay logged in
-          with open("user.txt", "w") as file:
-            file.write(user_email)
-          # Create graph
-          controller.listing["StatsPage"].create_graph(controller, db)
+        # Wait for the firestore client without freezing the window if it is still connecting
+        self.signup_button.configure(text="Connecting...", state="disabled")
+        controller.when_database_ready(
+          db,
+          lambda: self.sign_up(controller, db, user_email, user_password),
+          self.show_connection_error)
+
+  def sign_up(self, controller, db, user_email, user_password):
+    """
+    Creates the user once the database is ready
+
+    Args
+      controller: Tk object
+          Used to allow page changes and to access appliction attributes
+      db: firestore client object
+          Used to access firestore database to persist information
+      user_email: str
+          email typed by the user
+      user_password: str
+          password typed by the user
+    """
+    self.signup_button.configure(text="Sign up", state="normal")
+    # The user's document and today's document are created together. The new user's data is already known, so it is shared with every page without reading it back
+    tracker = ProteinTracker.sign_up(db, user_email, user_password)
+    # Checks the database is the email is already registered. If it is, an error is shown indicating to the user that they might want to log in. Otherwise, the email is written to the text file. Pages needed to be set up are set up.
+    if tracker is None:
+      messagebox.showwarning(
+        title="Error",
+        message="Your email is already in our database, did you mean to log in?")
+    else:
+      controller.user_email = user_email
+      controller.tracker = tracker
+      # Listen to today's intake so changes from other devices show up
+      tracker.subscribe()
+      # Clear entry widgets
+      self.email_box.delete(0, "end")
+      self.password_box.delete(0, "end")
+      controller.up_frame("GoalSetter")
+      # Write the user's email into the file to make sure they stay logged in
+      with open("user.txt", "w") as file:
+        file.write(user_email)
+      # Create graph, unless the stats page wasn't built yet, in which case it is drawn when it is shown
+      if "StatsPage" in controller.listing:
+        controller.listing["StatsPage"].refresh(controller, db)
+
+  def show_connection_error(self, error):
+    """
+    Tells the user the database could not be reached
+
+    Args
+      error: Exception
+          the error raised while connecting
+    """
+    self.signup_button.configure(text="Sign up", state="normal")
+    messagebox.showwarning(
+      title="Error",
+      message=
+      "Could not connect to the database. Check your connection and restart the application."
+    )
 
   def go_to_welcome(self, controller):
     """
@@ -0,0 +1,959 @@
+import copy
+import datetime
+import json
+import sqlite3
+import threading
+import time
+import types
+
+
+class NotFound(Exception):
+  """ Raised when a document that must exist doesn't, like firestore does for update """
+
+
+class Increment:
+  """
+  Class for adding to a number field, for use when firebase_admin isn't installed. firestore.Increment is recognized as well.
+
+  Attributes
+    value: float
+        amount added to the field
+  """
+
+  def __init__(self, value):
+    """
+    Initializes Increment.
+
+    Args
+      value: float
+          amount added to the field
+    """
+    self.value = value
+
+
+class Sentinel:
+  """
+  Class for special values written in place of a field, for use when firebase_admin isn't installed. firestore.DELETE_FIELD is recognized as well.
+
+  Attributes
+    description: str
+        what the value does
+  """
+
+  def __init__(self, description):
+    """
+    Initializes Sentinel.
+
+    Args
+      description: str
+          what the value does
+    """
+    self.description = description
+
+
+DELETE_FIELD = Sentinel("Value used to delete a field in a document.")
+
+
+def transactional(function):
+  """
+  Makes a function run as a transaction, like firestore.transactional. The function is called with the transaction and its reads and writes hold the database's lock, so no other write comes in between. Unlike firestore, it is never retried.
+
+  Args
+    function: function
+        reads with the transaction, queues writes in it and returns a result
+
+  Returns
+    function: called with a FakeTransaction and the function's other arguments, commits the writes and returns the result
+  """
+
+  def run(transaction, *args, **kwargs):
+    with transaction.db.lock:
+      result = function(transaction, *args, **kwargs)
+      transaction.commit()
+    return result
+
+  return run
+
+
+# Special values written with FakeFirestore, found by userSession.firestore_values in place of firebase_admin.firestore
+FIELD_VALUES = types.SimpleNamespace(Increment=Increment,
+                                     DELETE_FIELD=DELETE_FIELD,
+                                     transactional=transactional)
+
+
+def is_increment(value):
+  """
+  Checks if a value adds to a field. Checked by name so firestore.Increment works without importing firebase_admin.
+
+  Args
+    value: Any
+        value written to a field
+
+  Returns
+    bool: True if the value is an Increment
+  """
+  return type(value).__name__ == "Increment" and hasattr(value, "value")
+
+
+def is_delete(value):
+  """
+  Checks if a value deletes a field. Checked by description so firestore.DELETE_FIELD works without importing firebase_admin.
+
+  Args
+    value: Any
+        value written to a field
+
+  Returns
+    bool: True if the value is DELETE_FIELD
+  """
+  return type(value).__name__ == "Sentinel" and "delete" in getattr(
+    value, "description", "").lower()
+
+
+def write_field(fields, key, value, merge):
+  """
+  Writes one field of a document, applying increments and deletions
+
+  Args
+    fields: dict
+        fields of the document, changed in place
+    key: str
+        name of the field
+    value: Any
+        value written
+    merge: bool
+        whether maps are merged into the maps already there instead of replacing them
+  """
+  if is_delete(value):
+    fields.pop(key, None)
+  elif is_increment(value):
+    current = fields.get(key)
+    # Like firestore, a field that isn't a number is replaced by the amount
+    if isinstance(current, (int, float)) and not isinstance(current, bool):
+      fields[key] = current + value.value
+    else:
+      fields[key] = value.value
+  elif isinstance(value, dict) and merge and len(value) != 0:
+    if not isinstance(fields.get(key), dict):
+      fields[key] = {}
+    for inner_key, inner_value in value.items():
+      write_field(fields[key], inner_key, inner_value, merge)
+  else:
+    fields[key] = copy.deepcopy(value)
+
+
+def apply_set(current, data, merge):
+  """
+  Works out a document after a set
+
+  Args
+    current: dict
+        fields of the document, None if it doesn't exist
+    data: dict
+        fields written
+    merge: bool
+        whether the fields are merged into the document instead of replacing it
+
+  Returns
+    dict: fields of the document after the set
+  """
+  fields = copy.deepcopy(current) if merge and current is not None else {}
+  for key, value in data.items():
+    write_field(fields, key, value, merge)
+  return fields
+
+
+def apply_update(current, data):
+  """
+  Works out a document after an update. Keys are field paths, so "a.b" changes field b of map a.
+
+  Args
+    current: dict
+        fields of the document, None if it doesn't exist
+    data: dict
+        field paths written
+
+  Returns
+    dict: fields of the document after the update
+
+  Raises
+    NotFound: if the document doesn't exist
+  """
+  if current is None:
+    raise NotFound("No document to update")
+  fields = copy.deepcopy(current)
+  for path, value in data.items():
+    keys = path.split(".")
+    inner = fields
+    for key in keys[:-1]:
+      if not isinstance(inner.get(key), dict):
+        inner[key] = {}
+      inner = inner[key]
+    write_field(inner, keys[-1], value, False)
+  return fields
+
+
+class FakeFirestore:
+  """
+  Class for an in-process stand-in of the parts of the firestore client used by the application, so it can be run and measured without the Firebase project. Documents are kept in SQLite, in memory unless a file is given. Reads, writes and round trips are counted the way firestore bills them, and every round trip can be slowed down to act like a network.
+
+  Attributes
+    connection: sqlite3 Connection object
+        holds every document as JSON, keyed by its path
+    latency: float
+        seconds each round trip takes
+    lock: Lock object
+        keeps writes of a batch together when several threads use the database
+    listeners: dict
+        callbacks listening to each document path
+    reads: int
+        documents read, including those sent to listeners
+    writes: int
+        documents written
+    round_trips: int
+        requests sent to the database
+    field_values: namespace
+        Increment, DELETE_FIELD and transactional to write with, so the application doesn't need firebase_admin
+
+  Methods
+    collection(self, name)
+        returns a top level collection
+    batch(self)
+        returns a batch of writes committed together
+    transaction(self)
+        returns a transaction, run with transactional
+    get_all(self, references)
+        reads several documents in one round trip
+    stats(self)
+        returns the counters
+    reset_stats(self)
+        sets the counters back to 0
+  """
+
+  def __init__(self, path=":memory:", latency=0):
+    """
+    Initializes FakeFirestore.
+
+    Args
+      path: str
+          SQLite file the documents are kept in, or ":memory:" to keep them in memory
+      latency: float
+          seconds each round trip takes
+    """
+    # The search runs on a background thread, so the connection may be used from several threads, one at a time thanks to the lock
+    self.connection = sqlite3.connect(path, check_same_thread=False)
+    self.connection.execute(
+      "CREATE TABLE IF NOT EXISTS documents (path TEXT PRIMARY KEY, parent TEXT, id TEXT, data TEXT)"
+    )
+    self.latency = latency
+    self.lock = threading.RLock()
+    self.listeners = {}
+    self.field_values = FIELD_VALUES
+    self.reset_stats()
+
+  def collection(self, name):
+    """
+    Gets a top level collection
+
+    Args
+      name: str
+          name of the collection
+
+    Returns
+      FakeCollection: the collection
+    """
+    return FakeCollection(self, name)
+
+  def batch(self):
+    """
+    Gets a batch of writes committed together
+
+    Returns
+      FakeBatch: the empty batch
+    """
+    return FakeBatch(self)
+
+  def transaction(self):
+    """
+    Gets a transaction, run by a function made with transactional
+
+    Returns
+      FakeTransaction: the empty transaction
+    """
+    return FakeTransaction(self)
+
+  def get_all(self, references):
+    """
+    Reads several documents in one round trip
+
+    Args
+      references: list
+          FakeDocument objects to read
+
+    Returns
+      generator: a FakeSnapshot of each document
+    """
+    references = list(references)
+    self.round_trip()
+    with self.lock:
+      snapshots = [
+        FakeSnapshot(reference, self.load(reference.path))
+        for reference in references
+      ]
+      self.reads += len(snapshots)
+    yield from snapshots
+
+  def stats(self):
+    """
+    Gets the counters
+
+    Returns
+      dict: reads, writes and round trips since the counters were last reset
+    """
+    return {
+      "reads": self.reads,
+      "writes": self.writes,
+      "round_trips": self.round_trips
+    }
+
+  def reset_stats(self):
+    """ Sets the counters back to 0 """
+    self.reads = 0
+    self.writes = 0
+    self.round_trips = 0
+
+  def round_trip(self):
+    """ Counts a request to the database and waits for the latency """
+    self.round_trips += 1
+    if self.latency > 0:
+      time.sleep(self.latency)
+
+  def load(self, path):
+    """
+    Gets the fields of a document, without counting a read
+
+    Args
+      path: str
+          path of the document
+
+    Returns
+      dict: fields of the document, None if it doesn't exist
+    """
+    row = self.connection.execute("SELECT data FROM documents WHERE path = ?",
+                                  (path, )).fetchone()
+    return None if row is None else json.loads(row[0])
+
+  def store(self, path, fields):
+    """
+    Replaces the fields of a document, or deletes it. Listeners are told about the change.
+
+    Args
+      path: str
+          path of the document
+      fields: dict
+          new fields of the document, None to delete it
+    """
+    if fields is None:
+      self.connection.execute("DELETE FROM documents WHERE path = ?", (path, ))
+    else:
+      parent, doc_id = path.rsplit("/", 1)
+      self.connection.execute(
+        "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)",
+        (path, parent, doc_id, json.dumps(fields)))
+    self.writes += 1
+    for listener in list(self.listeners.get(path, [])):
+      listener.notify(fields)
+
+  def commit(self, operations):
+    """
+    Applies writes together in one round trip
+
+    Args
+      operations: list
+          each write, as the kind of write ("set", "update" or "delete"), the FakeDocument written, its data and whether it is merged
+    """
+    self.round_trip()
+    with self.lock:
+      changes = {}
+      # Work out every document before storing anything, so a failing update leaves the database untouched
+      for kind, reference, data, merge in operations:
+        current = changes.get(reference.path, self.load(reference.path))
+        if kind == "set":
+          changes[reference.path] = apply_set(current, data, merge)
+        elif kind == "update":
+          changes[reference.path] = apply_update(current, data)
+        else:
+          changes[reference.path] = None
+      with self.connection:
+        for kind, reference, data, merge in operations:
+          self.store(reference.path, changes[reference.path])
+
+  def query(self, parent, filters, order, limit):
+    """
+    Reads the documents of a collection matching a query, in one round trip
+
+    Args
+      parent: str
+          path of the collection
+      filters: list
+          each filter, as a field path, an operator and a value
+      order: list
+          each field path to sort by with its direction
+      limit: int
+          maximum number of documents, None for no limit
+
+    Returns
+      list: a FakeSnapshot of each document found
+    """
+    self.round_trip()
+    with self.lock:
+      rows = self.connection.execute(
+        "SELECT id, data FROM documents WHERE parent = ? ORDER BY id",
+        (parent, )).fetchall()
+    snapshots = []
+    for doc_id, data in rows:
+      snapshot = FakeSnapshot(FakeDocument(self, f"{parent}/{doc_id}"),
+                              json.loads(data))
+      if all(
+          matches(snapshot.get_field(field), operator, value)
+          for field, operator, value in filters):
+        snapshots.append(snapshot)
+    # Sort by the last key first, so earlier keys win
+    for field, direction in reversed(order):
+      snapshots.sort(key=lambda snapshot: sort_key(snapshot.get_field(field)),
+                     reverse=direction == "DESCENDING")
+    if limit is not None:
+      snapshots = snapshots[:limit]
+    # Like firestore, a query finding nothing still costs a read
+    self.reads += max(len(snapshots), 1)
+    return snapshots
+
+
+def sort_key(value):
+  """
+  Gets a key to sort field values of different types together, like firestore orders them
+
+  Args
+    value: Any
+        value of a field
+
+  Returns
+    tuple: the sort key
+  """
+  if value is None:
+    return (0, 0)
+  if isinstance(value, bool):
+    return (1, value)
+  if isinstance(value, (int, float)):
+    return (2, value)
+  if isinstance(value, str):
+    return (3, value)
+  return (4, json.dumps(value, sort_keys=True))
+
+
+def matches(field, operator, value):
+  """
+  Checks if a field value passes a query filter
+
+  Args
+    field: Any
+        value of the field, None if it is missing
+    operator: str
+        comparison such as "==", "<" or "in"
+    value: Any
+        value compared with
+
+  Returns
+    bool: True if the field passes the filter
+  """
+  # Documents are filtered by name by giving a reference to a document
+  if isinstance(value, FakeDocument):
+    value = value.id
+  if operator == "in":
+    return field in value
+  if operator == "array_contains":
+    return isinstance(field, list) and value in field
+  if field is None:
+    return operator == "!=" and value is not None
+  if operator == "==":
+    return field == value
+  if operator == "!=":
+    return field != value
+  if sort_key(field)[0] != sort_key(value)[0]:
+    return False
+  if operator == "<":
+    return field < value
+  if operator == "<=":
+    return field <= value
+  if operator == ">":
+    return field > value
+  if operator == ">=":
+    return field >= value
+  raise ValueError(f"Unsupported operator {operator}")
+
+
+class FakeSnapshot:
+  """
+  Class for a document read from FakeFirestore
+
+  Attributes
+    reference: FakeDocument object
+        the document read
+    id: str
+        id of the document
+    exists: bool
+        whether the document exists
+    fields: dict
+        fields of the document, None if it doesn't exist
+
+  Methods
+    to_dict(self)
+        returns a copy of the fields
+    get_field(self, field)
+        returns the value of a field path
+  """
+
+  def __init__(self, reference, fields):
+    """
+    Initializes FakeSnapshot.
+
+    Args
+      reference: FakeDocument object
+          the document read
+      fields: dict
+          fields of the document, None if it doesn't exist
+    """
+    self.reference = reference
+    self.id = reference.id
+    self.exists = fields is not None
+    self.fields = fields
+
+  def to_dict(self):
+    """
+    Gets a copy of the fields
+
+    Returns
+      dict: the fields, None if the document doesn't exist
+    """
+    return copy.deepcopy(self.fields)
+
+  def get_field(self, field):
+    """
+    Gets the value of a field path. "__name__" is the id of the document.
+
+    Args
+      field: str
+          field path, with dots between the names of nested fields
+
+    Returns
+      Any: the value, None if it is missing
+    """
+    if field == "__name__":
+      return self.id
+    value = self.fields
+    for key in field.split("."):
+      if not isinstance(value, dict):
+        return None
+      value = value.get(key)
+    return value
+
+
+class FakeDocument:
+  """
+  Class for a reference to a document of FakeFirestore
+
+  Attributes
+    db: FakeFirestore object
+        the database holding the document
+    path: str
+        path of the document, such as users/{email}
+    id: str
+        id of the document
+
+  Methods
+    collection(self, name)
+        returns a collection under the document
+    get(self, transaction)
+        reads the document
+    set(self, data, merge)
+        writes the document
+    update(self, data)
+        changes fields of an existing document
+    delete(self)
+        deletes the document
+    on_snapshot(self, callback)
+        calls a function now and whenever the document changes
+  """
+
+  def __init__(self, db, path):
+    """
+    Initializes FakeDocument.
+
+    Args
+      db: FakeFirestore object
+          the database holding the document
+      path: str
+          path of the document
+    """
+    self.db = db
+    self.path = path
+    self.id = path.rsplit("/", 1)[-1]
+
+  def collection(self, name):
+    """
+    Gets a collection under the document
+
+    Args
+      name: str
+          name of the collection
+
+    Returns
+      FakeCollection: the collection
+    """
+    return FakeCollection(self.db, f"{self.path}/{name}")
+
+  def get(self, transaction=None):
+    """
+    Reads the document in one round trip
+
+    Args
+      transaction: FakeTransaction object
+          transaction the document is read in. Its function already holds the lock, so nothing changes.
+
+    Returns
+      FakeSnapshot: the document
+    """
+    self.db.round_trip()
+    with self.db.lock:
+      self.db.reads += 1
+      return FakeSnapshot(self, self.db.load(self.path))
+
+  def set(self, data, merge=False):
+    """
+    Writes the document in one round trip
+
+    Args
+      data: dict
+          fields written
+      merge: bool
+          whether the fields are merged into the document instead of replacing it
+    """
+    self.db.commit([("set", self, data, merge)])
+
+  def update(self, data):
+    """
+    Changes fields of an existing document in one round trip
+
+    Args
+      data: dict
+          field paths written
+    """
+    self.db.commit([("update", self, data, False)])
+
+  def delete(self):
+    """ Deletes the document in one round trip """
+    self.db.commit([("delete", self, None, False)])
+
+  def on_snapshot(self, callback):
+    """
+    Calls a function with the document now and whenever it changes. Unlike firestore, the function is called on the thread making the change.
+
+    Args
+      callback: function
+          called with the list of documents, the changes and the time they were read
+
+    Returns
+      FakeWatch: used to stop listening
+    """
+    watch = FakeWatch(self, callback)
+    with self.db.lock:
+      self.db.listeners.setdefault(self.path, []).append(watch)
+      watch.notify(self.db.load(self.path))
+    return watch
+
+
+class FakeQuery:
+  """
+  Class for a query over the documents of a collection of FakeFirestore
+
+  Attributes
+    db: FakeFirestore object
+        the database holding the collection
+    path: str
+        path of the collection
+    filters: list
+        each filter, as a field path, an operator and a value
+    order: list
+        each field path to sort by with its direction
+    limit_count: int
+        maximum number of documents, None for no limit
+
+  Methods
+    where(self, field, operator, value)
+        returns the query with a filter added
+    order_by(self, field, direction)
+        returns the query sorted by a field
+    limit(self, count)
+        returns the query limited to a number of documents
+    stream(self)
+        reads the documents found by the query
+    get(self)
+        returns the documents found by the query as a list
+  """
+
+  def __init__(self, db, path, filters=(), order=(), limit_count=None):
+    """
+    Initializes FakeQuery.
+
+    Args
+      db: FakeFirestore object
+          the database holding the collection
+      path: str
+          path of the collection
+      filters: tuple
+          each filter, as a field path, an operator and a value
+      order: tuple
+          each field path to sort by with its direction
+      limit_count: int
+          maximum number of documents, None for no limit
+    """
+    self.db = db
+    self.path = path
+    self.filters = tuple(filters)
+    self.order = tuple(order)
+    self.limit_count = limit_count
+
+  def where(self, field, operator, value):
+    """
+    Gets the query with a filter added
+
+    Args
+      field: str
+          field path filtered, "__name__" for the id of the document
+      operator: str
+          comparison such as "==", "<" or "in"
+      value: Any
+          value compared with
+
+    Returns
+      FakeQuery: the new query
+    """
+    return FakeQuery(self.db, self.path,
+                     self.filters + ((field, operator, value), ), self.order,
+                     self.limit_count)
+
+  def order_by(self, field, direction="ASCENDING"):
+    """
+    Gets the query sorted by a field
+
+    Args
+      field: str
+          field path sorted by, "__name__" for the id of the document
+      direction: str
+          "ASCENDING" or "DESCENDING"
+
+    Returns
+      FakeQuery: the new query
+    """
+    return FakeQuery(self.db, self.path, self.filters,
+                     self.order + ((field, direction), ), self.limit_count)
+
+  def limit(self, count):
+    """
+    Gets the query limited to a number of documents
+
+    Args
+      count: int
+          maximum number of documents
+
+    Returns
+      FakeQuery: the new query
+    """
+    return FakeQuery(self.db, self.path, self.filters, self.order, count)
+
+  def stream(self):
+    """
+    Reads the documents found by the query in one round trip
+
+    Returns
+      generator: a FakeSnapshot of each document
+    """
+    yield from self.db.query(self.path, self.filters, self.order,
+                             self.limit_count)
+
+  def get(self):
+    """
+    Reads the documents found by the query in one round trip
+
+    Returns
+      list: a FakeSnapshot of each document
+    """
+    return list(self.stream())
+
+
+class FakeCollection(FakeQuery):
+  """
+  Class for a collection of FakeFirestore. It is also a query finding every document of the collection.
+
+  Attributes
+    id: str
+        name of the collection
+
+  Methods
+    document(self, doc_id)
+        returns a document of the collection
+  """
+
+  def __init__(self, db, path):
+    """
+    Initializes FakeCollection.
+
+    Args
+      db: FakeFirestore object
+          the database holding the collection
+      path: str
+          path of the collection, such as users/{email}/days
+    """
+    FakeQuery.__init__(self, db, path)
+    self.id = path.rsplit("/", 1)[-1]
+
+  def document(self, doc_id):
+    """
+    Gets a document of the collection
+
+    Args
+      doc_id: str
+          id of the document
+
+    Returns
+      FakeDocument: the document
+    """
+    return FakeDocument(self.db, f"{self.path}/{doc_id}")
+
+
+class FakeBatch:
+  """
+  Class for writes of FakeFirestore committed together in one round trip
+
+  Attributes
+    db: FakeFirestore object
+        the database written to
+    operations: list
+        each write waiting to be committed
+
+  Methods
+    set(self, reference, data, merge)
+        adds a set to the batch
+    update(self, reference, data)
+        adds an update to the batch
+    delete(self, reference)
+        adds a deletion to the batch
+    commit(self)
+        applies every write of the batch together
+  """
+
+  def __init__(self, db):
+    """
+    Initializes FakeBatch.
+
+    Args
+      db: FakeFirestore object
+          the database written to
+    """
+    self.db = db
+    self.operations = []
+
+  def set(self, reference, data, merge=False):
+    """
+    Adds a set to the batch
+
+    Args
+      reference: FakeDocument object
+          the document written
+      data: dict
+          fields written
+      merge: bool
+          whether the fields are merged into the document instead of replacing it
+    """
+    self.operations.append(("set", reference, data, merge))
+
+  def update(self, reference, data):
+    """
+    Adds an update to the batch
+
+    Args
+      reference: FakeDocument object
+          the document changed
+      data: dict
+          field paths written
+    """
+    self.operations.append(("update", reference, data, False))
+
+  def delete(self, reference):
+    """
+    Adds a deletion to the batch
+
+    Args
+      reference: FakeDocument object
+          the document deleted
+    """
+    self.operations.append(("delete", reference, None, False))
+
+  def commit(self):
+    """ Applies every write of the batch together in one round trip """
+    self.db.commit(self.operations)
+    self.operations = []
+
+
+class FakeTransaction(FakeBatch):
+  """ Class for reads and writes of FakeFirestore made together, run by a function made with transactional """
+
+
+class FakeWatch:
+  """
+  Class for a listener of a document of FakeFirestore
+
+  Attributes
+    reference: FakeDocument object
+        the document listened to
+    callback: function
+        called with the document whenever it changes
+
+  Methods
+    notify(self, fields)
+        calls the callback with the new fields of the document
+    unsubscribe(self)
+        stops listening
+  """
+
+  def __init__(self, reference, callback):
+    """
+    Initializes FakeWatch.
+
+    Args
+      reference: FakeDocument object
+          the document listened to
+      callback: function
+          called with the document whenever it changes
+    """
+    self.reference = reference
+    self.callback = callback
+
+  def notify(self, fields):
+    """
+    Calls the callback with the new fields of the document. Each call is billed as a read, like firestore does.
+
+    Args
+      fields: dict
+          fields of the document, None if it was deleted
+    """
+    self.reference.db.reads += 1
+    self.callback([FakeSnapshot(self.reference, copy.deepcopy(fields))], [],
+                  datetime.datetime.now(datetime.timezone.utc))
+
+  def unsubscribe(self):
+    """ Stops listening """
+    with self.reference.db.lock:
+      watches = self.reference.db.listeners.get(self.reference.path, [])
+      if self in watches:
+        watches.remove(self)
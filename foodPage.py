@@ -1,6 +1,10 @@
 import tkinter as tk
-import datetime
 import tkinter.messagebox as messagebox
+from prefixIndex import PrefixIndex
+from listModel import ListModel, food_row
+
+# Milliseconds to wait after the last key press before suggesting foods
+SUGGESTION_DELAY = 150
 
 
 class FoodPage(tk.Frame):
@@ -12,22 +16,38 @@ class FoodPage(tk.Frame):
         used across functions to access user's food request
     mylist: tk Listbox object
         shows user's intake 
+    food_model: ListModel object
+        firestore keys and amounts of the foods shown in mylist
     search_box: tk Entry object
         input area for user's food request
     intake: tk Label object
         used to show protein intake
+    suggestions: tk Listbox object
+        foods suggested while the user types, shown under the search box
+    suggestion_index: PrefixIndex object
+        foods that can be suggested, built when the user first types
+    suggestion_job: str
+        id of the pending suggestion update, used to wait until the user stops typing
     
   Methods
-    create_bar(self, controller)
+    create_bar(self, controller, db)
         creates menu bar at top of application
     search(self, controller, db)
-        searches for food from Nutrionix database
+        searches for food from the local table, or from Nutrionix database
     get_food(self, controller, initial, db)
         create or update food list shown on food page
     to_delete(self, controller)
         checks if user has food to delete. If so, they proceed to the delete page.
-    clear_before_change(self, controller, page)
+    clear_before_change(self, controller, page, db)
         clears pages before changing pages
+    schedule_suggestions(self, controller)
+        updates the suggestions once the user stops typing
+    show_suggestions(self, controller)
+        suggests foods starting with what the user typed
+    pick_suggestion(self, controller, db)
+        searches for the suggested food the user picked
+    hide_suggestions(self)
+        hides the suggestions
   """
 
   def __init__(self, parent, controller, db):
@@ -56,6 +76,7 @@ class FoodPage(tk.Frame):
                              highlightcolor=controller.BEIGE,
                              width=20,
                              height=7)
+    self.food_model = ListModel(self.mylist, food_row)
     canvas = tk.Canvas(self,
                        width=100,
                        height=100,
@@ -67,6 +88,29 @@ class FoodPage(tk.Frame):
     self.search_box.bind("<Return>",
                          lambda event, controller=controller, db=db: self.
                          search(event, controller, db))
+    # Suggest foods as the user types, without going to Nutritionix
+    self.suggestions = tk.Listbox(self,
+                                  bg=controller.BEIGE,
+                                  fg=controller.BROWN,
+                                  font=controller.titlefont,
+                                  selectbackground=controller.ALMOND,
+                                  highlightthickness=0,
+                                  height=4)
+    self.suggestion_index = None
+    self.suggestion_job = None
+    self.search_box.bind(
+      "<KeyRelease>",
+      lambda event, controller=controller: self.schedule_suggestions(
+        controller))
+    self.search_box.bind("<Down>", lambda event: self.suggestions.focus_set())
+    self.suggestions.bind(
+      "<ButtonRelease-1>",
+      lambda event, controller=controller, db=db: self.pick_suggestion(
+        controller, db))
+    self.suggestions.bind(
+      "<Return>",
+      lambda event, controller=controller, db=db: self.pick_suggestion(
+        controller, db))
     search_box_descriptor = tk.Label(
       self,
       text="Search for a food to add to your intake:",
@@ -103,13 +147,15 @@ class FoodPage(tk.Frame):
     self.mylist.grid(row=5, column=1, pady=2)
     delete_food.grid(row=6, column=1, pady=2)
 
-  def create_bar(self, controller):
+  def create_bar(self, controller, db):
     """
     Creates menu bar for application
     
     Args:
       controller: Tk object
           Used to allow page changes and to access 
+      db: firestore client object
+          Used to access firestore database to persist information 
     """
 
     # Create menu bar, learned from https://pythonspot.com/tk-menubar/
@@ -123,21 +169,21 @@ class FoodPage(tk.Frame):
     # Add various paths to cascade
     file_menu.add_command(
       label="Food Page",
-      command=lambda: self.clear_before_change(controller, "FoodPage"))
+      command=lambda: self.clear_before_change(controller, "FoodPage", db))
     file_menu.add_command(
       label="Stats Page",
-      command=lambda: self.clear_before_change(controller, "StatsPage"))
+      command=lambda: self.clear_before_change(controller, "StatsPage", db))
     file_menu.add_command(
       label="Profile Page",
-      command=lambda: self.clear_before_change(controller, "ProfilePage"))
+      command=lambda: self.clear_before_change(controller, "ProfilePage", db))
     file_menu.add_command(
       label="Help Page",
-      command=lambda: self.clear_before_change(controller, "HelpPage"))
+      command=lambda: self.clear_before_change(controller, "HelpPage", db))
     # Make cascade show up on menu
     menubar.add_cascade(menu=file_menu, label="Pages")
     controller.config(menu=menubar)
 
-  def clear_before_change(self, controller, page):
+  def clear_before_change(self, controller, page, db):
     """
     Clears pages before changing pages.
 
@@ -146,17 +192,27 @@ class FoodPage(tk.Frame):
           used to access main frame 
       page: string
           used to go to requested page
+      db: firestore client object
+          Used to access firestore database to persist information 
     """
-    # Reset slider to 0
-    controller.listing["GoalSetter"].slider.set(0)
+    # Reset slider to 0. Pages that weren't built yet have nothing to clear
+    if "GoalSetter" in controller.listing:
+      controller.listing["GoalSetter"].slider.set(0)
     # Clear various text boxes
-    controller.listing["HelpPage"].email_content.delete('1.0', "end")
-    controller.listing["PasswordChange"].new_password_box.delete(0, "end")
-    controller.listing["PasswordChange"].current_password_box.delete(0, "end")
+    if "HelpPage" in controller.listing:
+      controller.listing["HelpPage"].email_content.delete('1.0', "end")
+    if "PasswordChange" in controller.listing:
+      controller.listing["PasswordChange"].new_password_box.delete(0, "end")
+      controller.listing["PasswordChange"].current_password_box.delete(
+        0, "end")
     controller.listing["FoodPage"].search_box.delete(0, "end")
+    self.hide_suggestions()
     # Set cursor at search box if going to food page
     if page == "FoodPage":
       controller.listing["FoodPage"].search_box.focus_set()
+    # Redraw the stats with food logged since they were last shown
+    if page == "StatsPage":
+      controller.listing["StatsPage"].refresh(controller, db)
     controller.up_frame(page)
 
   def search(self, event, controller, db):
@@ -173,11 +229,24 @@ class FoodPage(tk.Frame):
     """
     # Obtain food search from user's input
     self.food_request = self.search_box.get().rstrip()
+    self.hide_suggestions()
     # If user's input is empty, error is shown. Otherwise, search box is cleared and user is directed to search results.
     if len(self.food_request) == 0:
       messagebox.showwarning(title="Error", message="Please input a food")
+    # Food can't be logged until the user's information has been loaded
+    elif controller.tracker is None:
+      messagebox.showwarning(title="Error",
+                             message="Your intake is still loading")
     else:
-      controller.listing["SearchResults"].get_information(controller, db)
+      search_results = controller.listing["SearchResults"]
+      # Common foods are found in the local table without going to Nutritionix
+      foods = controller.local_foods.search(self.food_request)
+      if foods is not None:
+        # Any search still running is replaced by this one
+        search_results.search_id += 1
+        search_results.show_food(controller, db, foods)
+      else:
+        search_results.get_information(controller, db)
       controller.up_frame("SearchResults")
       self.search_box.delete(0, "end")
 
@@ -207,32 +276,86 @@ class FoodPage(tk.Frame):
       db: firestore client object
           Used to access firestore database to persist information 
     """
-    # Obtain information from user
-    doc_ref = db.collection('users').document(controller.user_email)
-    doc = doc_ref.get()
-    today = str(datetime.date.today())
-    # Clear current list
-    self.mylist.delete(0, "end")
-    today_intake = 0
-    # If user already logged in today, they obtain their current intake. If not, a new field is initialized
-    if today in doc.to_dict():
-      for food in doc.to_dict()[today]:
-        if food != "total_intake":
-          # Convert all underscores to spaces to make words from firestore-friendly to user friendly
-          self.mylist.insert(
-            "end", f"{food.replace('_', ' ')}: {doc.to_dict()[today][food]}")
-          # The intake amount increases too
-          today_intake += float(doc.to_dict()[today][food])
-      doc_ref.update({f'{today}.{"total_intake"}': today_intake})
-      # Learned how to format a float using https://stackoverflow.com/questions/455612/limiting-floats-to-two-decimal-points and configure text label using https://www.tutorialspoint.com/changing-tkinter-label-text-dynamically-using-label-configure. Changed the float because sometimes it goes into infinite decimal value.
-      self.intake.configure(text=f"Today's intake: {'%.2f' % today_intake}g")
-      # Update delete page as well
+    # Obtain information from the tracker loaded at log in instead of reading the document again. Nothing is written here as today's total is kept up to date whenever food is logged or deleted.
+    tracker = controller.tracker
+    # Foods may have been logged, so suggestions are rebuilt the next time the user types
+    self.suggestion_index = None
+    # Today's intake is empty if the user hasn't logged any food today
+    today_intake = tracker.today_intake()
+    # Only the rows of foods that were added, changed or removed are touched
+    self.food_model.sync(tracker.today_foods())
+    # Learned how to format a float using https://stackoverflow.com/questions/455612/limiting-floats-to-two-decimal-points and configure text label using https://www.tutorialspoint.com/changing-tkinter-label-text-dynamically-using-label-configure. Changed the float because sometimes it goes into infinite decimal value.
+    self.intake.configure(text=f"Today's intake: {'%.2f' % today_intake}g")
+    # When the user first logs in, it gets the starting intake to make sure to avoid repeating celebratory statements indicating that the user reached their goal
+    if initial == "initial":
+      controller.starting_intake = today_intake
+    # Update delete page as well, unless it wasn't built yet, in which case it gets the food when it is built
+    if "DeletePage" in controller.listing:
       controller.listing["DeletePage"].get_food(controller, db)
-      # When the user first logs in, it gets the starting intake to make sure to avoid repeating celebratory statements indicating that the user reached their goal
-      if initial == "initial":
-        controller.starting_intake = today_intake
-    else:
-      doc_ref.set({today: {}}, merge=True)
     # If the intake is larger than the user's protein goal, mark that the user has reached their goal
-    if today_intake > doc_ref.get().to_dict()["protein_goal"]:
+    if tracker.goal_reached():
       controller.goal = True
+
+  def schedule_suggestions(self, controller):
+    """
+    Updates the suggestions once the user has stopped typing for a moment, so they aren't rebuilt on every key press
+
+    Args:
+      controller: Tk object
+          Used to allow page changes and to access appliction attributes
+    """
+    # Learned how to cancel a pending after() using https://tkdocs.com/shipman/universal.html
+    if self.suggestion_job is not None:
+      self.after_cancel(self.suggestion_job)
+    self.suggestion_job = self.after(SUGGESTION_DELAY,
+                                     lambda: self.show_suggestions(controller))
+
+  def show_suggestions(self, controller):
+    """
+    Suggests foods starting with what the user typed, taken from foods they logged before, past searches and the local food table
+
+    Args:
+      controller: Tk object
+          Used to allow page changes and to access appliction attributes
+    """
+    self.suggestion_job = None
+    if self.suggestion_index is None:
+      names = controller.local_foods.names()
+      names += list(controller.nutrition_cache.entries)
+      if controller.tracker is not None:
+        names += controller.tracker.known_foods()
+      self.suggestion_index = PrefixIndex(names)
+    matches = self.suggestion_index.suggest(self.search_box.get())
+    if len(matches) == 0:
+      self.hide_suggestions()
+      return
+    self.suggestions.delete(0, "end")
+    for match in matches:
+      self.suggestions.insert("end", match)
+    self.suggestions.configure(height=len(matches))
+    # Learned how to show a widget over the others, right under the search box, using https://tkdocs.com/shipman/place.html
+    self.suggestions.place(in_=self.search_box, relx=0, rely=1, relwidth=1)
+    self.suggestions.lift()
+
+  def pick_suggestion(self, controller, db):
+    """
+    Searches for the suggested food the user picked
+
+    Args:
+      controller: Tk object
+          Used to allow page changes and to access appliction attributes
+      db: firestore client object
+          Used to access firestore database to persist information 
+    """
+    selection = self.suggestions.curselection()
+    if len(selection) != 0:
+      self.search_box.delete(0, "end")
+      self.search_box.insert(0, self.suggestions.get(selection[0]))
+      self.search("", controller, db)
+
+  def hide_suggestions(self):
+    """ Hides the suggestions """
+    if self.suggestion_job is not None:
+      self.after_cancel(self.suggestion_job)
+      self.suggestion_job = None
+    self.suggestions.place_forget()
@@ -69,16 +69,16 @@ class GoalSetter(tk.Frame):
     """
     # Get the slider value
     user_goal = self.slider.get()
-    # Update the text showing protein goal and email
-    controller.listing["ProfilePage"].user_goal.configure(
-      text=f"Current goal: {user_goal}g")
-    controller.listing["ProfilePage"].user_email.configure(
-      text=f"Current user: {controller.user_email}")
-    doc_ref = db.collection('users').document(controller.user_email)
-    doc_ref.set({'protein_goal': user_goal}, merge=True)
+    # Update the text showing protein goal and email, unless the profile page wasn't built yet
+    if "ProfilePage" in controller.listing:
+      controller.listing["ProfilePage"].user_goal.configure(
+        text=f"Current goal: {user_goal}g")
+      controller.listing["ProfilePage"].user_email.configure(
+        text=f"Current user: {controller.user_email}")
+    controller.tracker.set_goal(user_goal)
     # Checks if the user is inputting their protein goal for the first time or not. If they are, they are redirected to the food page. If not, they return to the food page
     if self.destination == "food":
-      controller.listing["FoodPage"].create_bar(controller)
+      controller.listing["FoodPage"].create_bar(controller, db)
       controller.up_frame("FoodPage")
     else:
       controller.up_frame("ProfilePage")
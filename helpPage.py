@@ -1,7 +1,5 @@
 import tkinter as tk
 import tkinter.messagebox as messagebox
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
 
 
 class HelpPage(tk.Frame):
@@ -63,6 +61,9 @@ class HelpPage(tk.Frame):
     # Learned how to send mail using https://docs.sendgrid.com/for-developers/sending-email/v3-python-code-example. The following code obtains the email content. If the email content is empty, an error is shown
     body = self.email_content.get('1.0', 'end').rstrip()
     if body != "":
+      # sendgrid is slow to import and only needed when an email is sent
+      from sendgrid import SendGridAPIClient
+      from sendgrid.helpers.mail import Mail
       message = Mail(from_email="olivia63chen@gmail.com",
                      to_emails="olivia63chen@gmail.com",
                      subject='Inquiry about MyProteinBuddy',
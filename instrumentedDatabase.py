@@ -0,0 +1,457 @@
+import json
+import sys
+import threading
+import time
+
+# Upper bound of each latency bucket of the histograms, in milliseconds
+BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, float("inf")]
+# Number of calling functions named in a call site, innermost last
+SITE_DEPTH = 3
+# Methods returning another reference or query, whose result is wrapped as well
+CHAINED = {
+  "collection", "document", "where", "order_by", "limit", "limit_to_last",
+  "start_at", "start_after", "end_at", "end_before", "select", "offset"
+}
+# Methods of a batch that queue a write instead of sending it
+QUEUED = {"set", "update", "delete", "create"}
+
+
+def call_site(depth=SITE_DEPTH):
+  """
+  Names the functions that called the database, skipping the frames of this module. Methods are named by their class, such as FoodPage.get_food.
+
+  Args
+    depth: int
+        number of calling functions named
+
+  Returns
+    str: the calling functions, outermost first, separated by " > "
+  """
+  # Learned how to walk up the call stack using https://docs.python.org/3/library/sys.html#sys._getframe
+  frame = sys._getframe(1)
+  while frame is not None and frame.f_code.co_filename == __file__:
+    frame = frame.f_back
+  names = []
+  while frame is not None and len(names) < depth:
+    code = frame.f_code
+    # co_qualname includes the class of a method since python 3.11
+    names.append(getattr(code, "co_qualname", code.co_name))
+    frame = frame.f_back
+  return " > ".join(reversed(names))
+
+
+def size_of(value):
+  """
+  Estimates the size of the fields of a document once sent, as the length of their JSON
+
+  Args
+    value: dict
+        fields of a document, None if it doesn't exist
+
+  Returns
+    int: estimated bytes
+  """
+  if value is None:
+    return 0
+  # Special values such as Increment are counted by their text
+  return len(json.dumps(value, default=str))
+
+
+def unwrap(value):
+  """
+  Gets the object of the client wrapped, so instrumented references can be handed back to the client
+
+  Args
+    value: Any
+        an argument given to the client
+
+  Returns
+    Any: the argument, with wrapped objects replaced by the objects they wrap
+  """
+  if isinstance(value, InstrumentedObject):
+    return value.target
+  if isinstance(value, (list, tuple)):
+    return type(value)(unwrap(item) for item in value)
+  return value
+
+
+class DatabaseStats:
+  """
+  Class for the reads, writes, bytes and latency of database calls, added up for each call site and operation
+
+  Attributes
+    sites: dict
+        totals and latency histogram of each call site and operation
+    lock: Lock object
+        listeners are called on firestore's own thread, so updates are made one at a time
+    started: float
+        time the stats started being collected
+
+  Methods
+    record(self, site, operation, reads, writes, size, seconds)
+        adds one database call to the stats
+    report(self)
+        returns the stats of every call site
+    summary(self)
+        returns the stats of the whole session on one line
+    dump(self, path)
+        writes the report as JSON, or the summary to stderr
+  """
+
+  def __init__(self):
+    """ Initializes DatabaseStats """
+    self.sites = {}
+    self.lock = threading.Lock()
+    self.started = time.time()
+
+  def record(self, site, operation, reads=0, writes=0, size=0, seconds=0):
+    """
+    Adds one database call to the stats
+
+    Args
+      site: str
+          functions that made the call
+      operation: str
+          method of the client called, such as get_all or commit
+      reads: int
+          documents read
+      writes: int
+          documents written
+      size: int
+          estimated bytes read or written
+      seconds: float
+          time the call took
+    """
+    milliseconds = seconds * 1000
+    with self.lock:
+      stats = self.sites.setdefault((site, operation), {
+        "calls": 0,
+        "reads": 0,
+        "writes": 0,
+        "bytes": 0,
+        "total_ms": 0,
+        "max_ms": 0,
+        "histogram": [0] * len(BUCKETS)
+      })
+      stats["calls"] += 1
+      stats["reads"] += reads
+      stats["writes"] += writes
+      stats["bytes"] += size
+      stats["total_ms"] += milliseconds
+      stats["max_ms"] = max(stats["max_ms"], milliseconds)
+      for bucket, bound in enumerate(BUCKETS):
+        if milliseconds <= bound:
+          stats["histogram"][bucket] += 1
+          break
+
+  def report(self):
+    """
+    Gets the stats of every call site, the most read first
+
+    Returns
+      dict: the totals of the session and the stats of each call site and operation
+    """
+    with self.lock:
+      sites = [{
+        "site": site,
+        "operation": operation,
+        **stats,
+        "total_ms": round(stats["total_ms"], 2),
+        "max_ms": round(stats["max_ms"], 2),
+        "histogram": {
+          f"<={bound:g}ms": count
+          for bound, count in zip(BUCKETS, stats["histogram"]) if count != 0
+        }
+      } for (site, operation), stats in self.sites.items()]
+    sites.sort(key=lambda stats: (stats["reads"], stats["writes"]),
+               reverse=True)
+    return {
+      "seconds": round(time.time() - self.started, 1),
+      "reads": sum(stats["reads"] for stats in sites),
+      "writes": sum(stats["writes"] for stats in sites),
+      "bytes": sum(stats["bytes"] for stats in sites),
+      "calls": sum(stats["calls"] for stats in sites),
+      "sites": sites
+    }
+
+  def summary(self):
+    """
+    Gets the stats of the whole session on one line, with the call site reading the most
+
+    Returns
+      str: the summary
+    """
+    report = self.report()
+    line = f"firestore: {report['reads']} reads, {report['writes']} writes, {report['bytes']} bytes in {report['calls']} calls over {report['seconds']}s"
+    if len(report["sites"]) != 0:
+      top = report["sites"][0]
+      line += f"; most reads: {top['site']} ({top['operation']}, {top['reads']} reads)"
+    return line
+
+  def dump(self, path):
+    """
+    Writes the report as JSON, or the summary to stderr
+
+    Args
+      path: str
+          file the report is written to, or "-" for the summary on stderr
+    """
+    if path == "-":
+      print(self.summary(), file=sys.stderr)
+    else:
+      with open(path, "w") as file:
+        json.dump(self.report(), file, indent=2)
+
+
+class InstrumentedObject:
+  """
+  Class wrapping a reference, query or batch of the firestore client, recording the calls that go to the database. Anything else is passed on unchanged.
+
+  Attributes
+    target: Any
+        the object wrapped
+    stats: DatabaseStats object
+        where the calls are recorded
+
+  Methods
+    __getattr__(self, name)
+        passes an attribute on to the wrapped object, recording the calls that go to the database
+    track(self, name, method, args, kwargs)
+        calls a method going to the database and records it
+  """
+
+  def __init__(self, target, stats):
+    """
+    Initializes InstrumentedObject.
+
+    Args
+      target: Any
+          the object wrapped
+      stats: DatabaseStats object
+          where the calls are recorded
+    """
+    self.target = target
+    self.stats = stats
+
+  def __getattr__(self, name):
+    """
+    Passes an attribute on to the wrapped object. Methods returning references are wrapped so their calls are recorded too.
+
+    Args
+      name: str
+          name of the attribute
+
+    Returns
+      Any: the attribute
+    """
+    value = getattr(self.target, name)
+    if not callable(value):
+      return value
+    if name in CHAINED:
+      return lambda *args, **kwargs: InstrumentedObject(
+        value(*unwrap(args), **kwargs), self.stats)
+    if name in ("get", "stream", "set", "update", "delete", "create",
+                "on_snapshot", "get_all"):
+      return lambda *args, **kwargs: self.track(name, value, args, kwargs)
+    return value
+
+  def track(self, name, method, args, kwargs):
+    """
+    Calls a method going to the database and records the documents read or written and the time it took
+
+    Args
+      name: str
+          name of the method
+      method: function
+          the method of the wrapped object
+      args: tuple
+          arguments of the call
+      kwargs: dict
+          keyword arguments of the call
+
+    Returns
+      Any: the result of the method. Documents read by a query are returned as a list.
+    """
+    site = call_site()
+    args = unwrap(args)
+    # A read made in a transaction is given the transaction wrapped
+    kwargs = {key: unwrap(value) for key, value in kwargs.items()}
+    if name == "on_snapshot":
+      callback = args[0]
+
+      # Each document sent to the listener is billed as a read
+      def on_snapshot(docs, changes, read_time):
+        self.stats.record(site, "on_snapshot", reads=len(docs),
+                          size=sum(size_of(doc.to_dict()) for doc in docs))
+        return callback(docs, changes, read_time)
+
+      return method(on_snapshot, *args[1:], **kwargs)
+    start = time.perf_counter()
+    result = method(*args, **kwargs)
+    if name in ("set", "update", "create"):
+      self.stats.record(site, name, writes=1, size=size_of(args[0]),
+                        seconds=time.perf_counter() - start)
+      return result
+    if name == "delete":
+      self.stats.record(site, name, writes=1,
+                        seconds=time.perf_counter() - start)
+      return result
+    # A document read returns one snapshot, a query or get_all return several, read as they are iterated
+    if hasattr(result, "to_dict"):
+      docs = [result]
+    else:
+      docs = list(result)
+      result = docs
+    self.stats.record(site, name, reads=max(len(docs), 1),
+                      size=sum(size_of(doc.to_dict()) for doc in docs),
+                      seconds=time.perf_counter() - start)
+    return result
+
+
+class InstrumentedBatch(InstrumentedObject):
+  """
+  Class wrapping a batch of the firestore client. Writes are counted when the batch is committed, as that is when they are sent.
+
+  Attributes
+    writes: int
+        writes queued in the batch
+    size: int
+        estimated bytes of the writes queued
+
+  Methods
+    commit(self)
+        sends the writes of the batch and records them
+  """
+
+  def __init__(self, target, stats):
+    """
+    Initializes InstrumentedBatch.
+
+    Args
+      target: firestore WriteBatch object
+          the batch wrapped
+      stats: DatabaseStats object
+          where the calls are recorded
+    """
+    InstrumentedObject.__init__(self, target, stats)
+    self.writes = 0
+    self.size = 0
+
+  def __getattr__(self, name):
+    """
+    Passes an attribute on to the wrapped batch, counting the writes queued
+
+    Args
+      name: str
+          name of the attribute
+
+    Returns
+      Any: the attribute
+    """
+    value = getattr(self.target, name)
+    if name not in QUEUED:
+      return value
+
+    def queue(reference, *args, **kwargs):
+      self.writes += 1
+      if len(args) != 0:
+        self.size += size_of(args[0])
+      return value(unwrap(reference), *args, **kwargs)
+
+    return queue
+
+  def commit(self):
+    """
+    Sends the writes of the batch and records them
+
+    Returns
+      Any: the result of the commit
+    """
+    start = time.perf_counter()
+    result = self.target.commit()
+    self.stats.record(call_site(), "commit", writes=self.writes,
+                      size=self.size, seconds=time.perf_counter() - start)
+    self.writes = 0
+    self.size = 0
+    return result
+
+
+class InstrumentedTransaction(InstrumentedBatch):
+  """
+  Class wrapping a transaction of the firestore client. firestore.transactional begins and commits it through private methods, and may begin it again after a conflict, so the writes queued are counted again on each attempt.
+
+  Methods
+    _begin(self, *args, **kwargs)
+        starts an attempt, forgetting the writes of an earlier one
+    _commit(self)
+        sends the writes of the transaction and records them
+  """
+
+  def _begin(self, *args, **kwargs):
+    """
+    Starts an attempt of the transaction, forgetting the writes queued by an earlier attempt
+
+    Returns
+      Any: the result of the wrapped transaction's _begin
+    """
+    self.writes = 0
+    self.size = 0
+    return self.target._begin(*args, **kwargs)
+
+  def _commit(self):
+    """
+    Sends the writes of the transaction and records them, as firestore.transactional does instead of calling commit
+
+    Returns
+      Any: the result of the commit
+    """
+    start = time.perf_counter()
+    result = self.target._commit()
+    self.stats.record(call_site(), "commit", writes=self.writes,
+                      size=self.size, seconds=time.perf_counter() - start)
+    self.writes = 0
+    self.size = 0
+    return result
+
+
+class InstrumentedDatabase(InstrumentedObject):
+  """
+  Class wrapping the firestore client given to every page, recording the reads, writes, bytes and latency of each call site so chatty pages are found without waiting for the Firebase bill.
+
+  Methods
+    batch(self)
+        returns an instrumented batch
+    transaction(self)
+        returns an instrumented transaction
+  """
+
+  def __init__(self, db, stats=None):
+    """
+    Initializes InstrumentedDatabase.
+
+    Args
+      db: firestore client object
+          the client wrapped
+      stats: DatabaseStats object
+          where the calls are recorded, a new one if None
+    """
+    InstrumentedObject.__init__(self, db,
+                                stats if stats is not None else DatabaseStats())
+
+  def batch(self):
+    """
+    Gets an instrumented batch
+
+    Returns
+      InstrumentedBatch: the empty batch
+    """
+    return InstrumentedBatch(self.target.batch(), self.stats)
+
+  def transaction(self):
+    """
+    Gets an instrumented transaction. Its writes are queued and counted like those of a batch.
+
+    Returns
+      InstrumentedTransaction: the empty transaction
+    """
+    return InstrumentedTransaction(self.target.transaction(), self.stats)
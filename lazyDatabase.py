@@ -0,0 +1,96 @@
+import threading
+
+# Service account key used to connect to firestore
+CREDENTIALS = 'python-te-98768-firebase-adminsdk-8xjdc-839fb11e0e.json'
+
+
+class LazyDatabase:
+  """
+  Class for a firestore client that is set up on a background thread. Importing firebase_admin and connecting take a while, so the window is shown first and the client is built in the meantime. It can be used like a firestore client: the first use waits for the client to be ready if it isn't yet.
+
+  Attributes
+    credentials_path: str
+        service account key used to connect to firestore
+    client: firestore client object
+        the client, None until it is ready
+    error: Exception
+        the error raised while connecting, None if there was none
+    loaded: Event object
+        set once connecting has finished, whether it worked or not
+
+  Methods
+    connect(self)
+        imports firebase_admin and builds the client, run on a background thread
+    ready(self)
+        returns whether connecting has finished
+    result(self)
+        returns the client, waiting for it if needed
+  """
+
+  def __init__(self, credentials_path=CREDENTIALS):
+    """
+    Initializes LazyDatabase and starts connecting on a background thread.
+
+    Args
+      credentials_path: str
+          service account key used to connect to firestore
+    """
+    self.credentials_path = credentials_path
+    self.client = None
+    self.error = None
+    self.loaded = threading.Event()
+    # Learned that daemon threads don't stop the application from closing using https://docs.python.org/3/library/threading.html
+    threading.Thread(target=self.connect, daemon=True).start()
+
+  def connect(self):
+    """ Imports firebase_admin and builds the client. Runs on a background thread, so it must not touch any widget. """
+    try:
+      import firebase_admin
+      from firebase_admin import credentials
+      from firebase_admin import firestore
+      # Initialize firestore with credentials
+      firebase_admin.initialize_app(
+        credentials.Certificate(self.credentials_path))
+      self.client = firestore.client()
+    # The error is raised again when the client is used, on the thread using it
+    except Exception as error:
+      self.error = error
+    finally:
+      self.loaded.set()
+
+  def ready(self):
+    """
+    Checks if connecting has finished, without waiting
+
+    Returns
+      bool: True once the client is ready or connecting failed
+    """
+    return self.loaded.is_set()
+
+  def result(self):
+    """
+    Gets the client, waiting for it if it isn't ready yet
+
+    Returns
+      firestore client object: the client
+
+    Raises
+      Exception: the error raised while connecting
+    """
+    self.loaded.wait()
+    if self.error is not None:
+      raise self.error
+    return self.client
+
+  def __getattr__(self, name):
+    """
+    Passes any other attribute, such as collection or batch, on to the client
+
+    Args
+      name: str
+          name of the attribute
+
+    Returns
+      Any: the attribute of the client
+    """
+    return getattr(self.result(), name)
@@ -0,0 +1,109 @@
+def food_row(food, amount):
+  """
+  Turns a food and its protein amount into the text of a row
+
+  Args
+    food: str
+        firestore key of the food
+    amount: float
+        protein amount of the food
+
+  Returns
+    str: the row, with underscores turned back into spaces to make words from firestore-friendly to user friendly
+  """
+  return f"{food.replace('_', ' ')}: {amount}"
+
+
+class ListModel:
+  """
+  Class for a keyed model of the rows shown in a tk Listbox. The listbox is brought up to date by only inserting, updating and removing the rows that changed, so a change to one food touches one row.
+
+  Attributes
+    listbox: tk Listbox object
+        the listbox kept up to date
+    row_text: function
+        turns a key and its value into the text of a row
+    keys: list
+        key of each row, in the order they are shown
+    values: dict
+        value shown for each key
+
+  Methods
+    sync(self, items)
+        brings the listbox up to date with new values
+    remove(self, indexes)
+        removes rows from the listbox
+    clear(self)
+        removes every row
+  """
+
+  def __init__(self, listbox, row_text):
+    """
+    Initializes ListModel.
+
+    Args
+      listbox: tk Listbox object
+          the listbox kept up to date
+      row_text: function
+          turns a key and its value into the text of a row
+    """
+    self.listbox = listbox
+    self.row_text = row_text
+    self.keys = []
+    self.values = {}
+
+  def sync(self, items):
+    """
+    Brings the listbox up to date with new values. Rows keep their place, new keys are added at the end and the selection of updated rows is kept.
+
+    Args
+      items: dict
+          value of each key that should be shown
+    """
+    # Remove rows from the bottom up so the indexes of the other rows don't shift
+    for i in reversed(range(len(self.keys))):
+      if self.keys[i] not in items:
+        self.listbox.delete(i)
+        del self.values[self.keys[i]]
+        del self.keys[i]
+    # Rewrite only the rows whose value changed
+    for i, key in enumerate(self.keys):
+      if items[key] != self.values[key]:
+        selected = self.listbox.selection_includes(i)
+        self.listbox.delete(i)
+        self.listbox.insert(i, self.row_text(key, items[key]))
+        if selected:
+          self.listbox.selection_set(i)
+        self.values[key] = items[key]
+    # Add rows for new keys
+    for key, value in items.items():
+      if key not in self.values:
+        self.listbox.insert("end", self.row_text(key, value))
+        self.keys.append(key)
+        self.values[key] = value
+
+  def remove(self, indexes):
+    """
+    Removes rows from the listbox
+
+    Args
+      indexes: iterable
+          indexes of the rows to remove
+
+    Returns
+      list: keys of the removed rows
+    """
+    removed = []
+    # Remove rows from the bottom up so the indexes of the other rows don't shift
+    for i in sorted(indexes, reverse=True):
+      self.listbox.delete(i)
+      removed.append(self.keys[i])
+      del self.values[self.keys[i]]
+      del self.keys[i]
+    return removed[::-1]
+
+  def clear(self):
+    """ Removes every row """
+    self.listbox.delete(0, "end")
+    self.keys = []
+    self.values = {}
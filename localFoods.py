@@ -0,0 +1,79 @@
+import csv
+import os
+from nutritionCache import normalize_query
+
+
+class LocalFoodDatabase:
+  """
+  Class for a table of common foods kept on disk, so that they are found without going to Nutritionix. The table is optional: if the file is missing, every search goes to Nutritionix.
+
+  Attributes
+    foods: dict
+        foods of the table indexed by their normalized name
+
+  Methods
+    load(self, path)
+        reads the table from a csv file
+    search(self, food_request)
+        finds a food of the table matching a search
+    names(self)
+        returns the names of every food in the table
+  """
+
+  def __init__(self, path="foods.csv"):
+    """
+    Initializes LocalFoodDatabase.
+
+    Args
+      path: str
+          csv file with a food_name, nf_protein and serving_weight_grams column
+    """
+    self.foods = {}
+    self.load(path)
+
+  def load(self, path):
+    """
+    Reads the table from a csv file. Foods are indexed by their normalized name so a search is a single dictionary lookup.
+
+    Args
+      path: str
+          csv file with a food_name, nf_protein and serving_weight_grams column
+    """
+    if not os.path.exists(path):
+      return
+    # Learned how to read a csv file into dictionaries using https://docs.python.org/3/library/csv.html#csv.DictReader
+    with open(path, newline="") as file:
+      for row in csv.DictReader(file):
+        self.foods[normalize_query(row["food_name"])] = {
+          "food_name": row["food_name"],
+          "nf_protein": float(row["nf_protein"]),
+          "serving_weight_grams": float(row["serving_weight_grams"])
+        }
+
+  def search(self, food_request):
+    """
+    Finds a food of the table matching a search. A plural search such as "eggs" also finds "egg".
+
+    Args
+      food_request: str
+          the food searched by the user
+
+    Returns
+      list: the food found, in the same form as parse_foods, or None if the table doesn't have it
+    """
+    key = normalize_query(food_request)
+    food = self.foods.get(key)
+    if food is None and key.endswith("s"):
+      food = self.foods.get(key[:-1])
+    if food is None:
+      return None
+    return [food]
+
+  def names(self):
+    """
+    Gets the names of every food in the table
+
+    Returns
+      list: names of the foods
+    """
+    return [food["food_name"] for food in self.foods.values()]
@@ -13,11 +13,10 @@ History:
 
 import tkinter as tk
 import tkinter.font as font
-import firebase_admin
-from firebase_admin import credentials
-from firebase_admin import firestore
 import os
-import datetime
+import functools
+import atexit
+import threading
 
 from deletePage import DeletePage
 from emailPassLogIn import EmailPassLogIn
@@ -30,11 +29,66 @@ from searchResults import SearchResults
 from welcomePage import WelcomePage
 from statsPage import StatsPage
 from profilePage import ProfilePage
+from proteinTracker import ProteinTracker
+from localFoods import LocalFoodDatabase
+from nutritionCache import NutritionCache
+from lazyDatabase import LazyDatabase
+from instrumentedDatabase import InstrumentedDatabase
 
-# Initialize firestore with credentials
-cred = credentials.Certificate(
-  'python-te-98768-firebase-adminsdk-8xjdc-839fb11e0e.json')
-firebase_admin.initialize_app(cred)
+# Milliseconds between checks for changes pushed by firestore
+UPDATE_INTERVAL = 200
+# Build the pages that weren't shown yet while the application is idle, so they open instantly later
+PREWARM = True
+# Milliseconds between building two pages while prewarming, so the application stays responsive
+PREWARM_INTERVAL = 50
+# Pages left out of prewarming. Building the search results page imports requests, which would freeze the window, so it is built on the first search
+PREWARM_SKIP = ["SearchResults"]
+# Milliseconds between checks for the firestore client being ready
+DATABASE_INTERVAL = 50
+# If this environment variable is set, every database call is recorded and a report is written to the file it names when the application closes ("-" prints a summary instead)
+DB_STATS_VARIABLE = "MYPROTEINBUDDY_DB_STATS"
+
+
+class PageListing(dict):
+  """
+  Class for the pages of the application, indexed by name. A page is only built the first time it is looked up, so starting the application only builds the page shown.
+
+  Attributes
+    factories: dict
+        function building each page, indexed by name
+
+  Methods
+    __missing__(self, page_name)
+        builds a page the first time it is looked up
+  """
+
+  def __init__(self, factories):
+    """
+    Initializes PageListing.
+
+    Args
+      factories: dict
+          function building each page, indexed by name
+    """
+    dict.__init__(self)
+    self.factories = factories
+
+  def __missing__(self, page_name):
+    """
+    Builds a page the first time it is looked up. Learned how to fill a dictionary on lookup using https://docs.python.org/3/library/stdtypes.html#dict
+
+    Args
+      page_name: str
+          the page looked up
+
+    Returns
+      tk Frame object: the page
+    """
+    frame = self.factories[page_name]()
+    frame.configure(background="#fff0db")
+    frame.grid(row=0, column=0, sticky="nesw")
+    self[page_name] = frame
+    return frame
 
 
 class MainFrame(tk.Tk):
@@ -58,22 +112,42 @@ class MainFrame(tk.Tk):
         indicates if food goal celebration has been shown
     starting_intake: float
         used to check if user has already reached their protein goal in previous log ins
-    listing: dict
-        used to transition between pages
+    listing: PageListing object
+        used to transition between pages, pages are built the first time they are shown
     user_email: string
         used to access user's database throughout the code
+    tracker: ProteinTracker object
+        the logged in user's intake, goal and streak, shared by every page
     bao: tk PhotoImage object
         image asset used across the application
+    local_foods: LocalFoodDatabase object
+        common foods found without going to Nutritionix
+    nutrition_cache: NutritionCache object
+        past searches, used by the search results page and suggested by the food page without building the search results page
         
   Methods
     up_frame(self, page_name)
         allows the application to change frames or pages
     get_information(self, db)
         allows application to get all necessary information if user is already logged in
+    check_updates(self, db)
+        refreshes the food and delete pages when today's intake changes on another device
+    when_database_ready(self, db, callback, failed)
+        calls a function once the firestore client is ready, without freezing the window
+    prewarm(self, page_names)
+        builds the pages that weren't shown yet, one at a time while the application is idle
+    import_search(self)
+        imports the Nutritionix client, run on a background thread
   """
 
-  def __init__(self, *args, **kwargs):
-    """ Initializes MainFrame """
+  def __init__(self, db=None, *args, **kwargs):
+    """
+    Initializes MainFrame
+
+    Args:
+      db: firestore client object
+        used across the code to access database to read and write. If None, a client is set up on a background thread while the first page is shown
+    """
     # Inherit from parent class
     tk.Tk.__init__(self, *args, **kwargs)
     # Initialize all attributes that will be used throughout the application
@@ -86,11 +160,18 @@ class MainFrame(tk.Tk):
     self.goal = False
     self.goal_shown = False
     self.starting_intake = 0
-    self.listing = {}
     self.user_email = ""
+    self.tracker = None
     self.bao = tk.PhotoImage(file="little_mascot.gif")
-    # Initialize firestore database
-    db = firestore.client()
+    self.local_foods = LocalFoodDatabase()
+    self.nutrition_cache = NutritionCache()
+    # Initialize firestore database in the background, pages wait for it when they first use it
+    if db is None:
+      db = LazyDatabase()
+    # Record the reads, writes and latency of each page when asked to
+    if os.environ.get(DB_STATS_VARIABLE):
+      db = InstrumentedDatabase(db)
+      atexit.register(db.stats.dump, os.environ[DB_STATS_VARIABLE])
     # As the logged in user's email is in the text file, check if an individual is logged in by checking if the file is empty or not, learned from https://thispointer.com/python-three-ways-to-check-if-a-file-is-empty/
     if os.stat("user.txt").st_size != 0:
       # If the user is logged in, change the user email to email in text file
@@ -108,39 +189,50 @@ class MainFrame(tk.Tk):
     self.configure(bg="#fff0db")
     self.grid_rowconfigure(0, weight=1)
     self.grid_columnconfigure(0, weight=1)
-    # Loops through pages to initialize each page. The pages in this for loop need to access the firestore database and controller
+    # Register how to build each page. Pages are only built when they are first shown. The pages in this for loop need to access the firestore database and controller
+    factories = {}
     for page in [
         EmailPassSignUp, EmailPassLogIn, GoalSetter, FoodPage, ProfilePage,
-        PasswordChange, DeletePage
+        PasswordChange, DeletePage, StatsPage
     ]:
-      page_name = page.__name__
-      frame = page(parent=container, controller=self, db=db)
-      frame.configure(background="#fff0db")
-      frame.grid(row=0, column=0, sticky="nesw")
-      # Append to listing to later transfer between pages
-      self.listing[page_name] = frame
-    # Loops through pages to initialize each page. The pages in this for loop do not need to access the firestore database
-    for page in [WelcomePage, HelpPage, StatsPage]:
-      page_name = page.__name__
-      frame = page(parent=container, controller=self)
-      frame.configure(background="#fff0db")
-      frame.grid(row=0, column=0, sticky="nesw")
-      # Append to listing to use to transfer between pages
-      self.listing[page_name] = frame
-    # Initialize search results page. It doesn't need a database nor a controller
-    for page in [SearchResults]:
-      page_name = page.__name__
-      frame = page(parent=container)
-      frame.configure(background="#fff0db")
-      frame.grid(row=0, column=0, sticky="nesw")
-      self.listing[page_name] = frame
+      # Learned how to fix the arguments of a function using https://docs.python.org/3/library/functools.html#functools.partial
+      factories[page.__name__] = functools.partial(page,
+                                                   parent=container,
+                                                   controller=self,
+                                                   db=db)
+    # The pages in this for loop do not need to access the firestore database
+    for page in [WelcomePage, HelpPage]:
+      factories[page.__name__] = functools.partial(page,
+                                                   parent=container,
+                                                   controller=self)
+    # Search results page doesn't need a database nor a controller
+    factories["SearchResults"] = functools.partial(SearchResults,
+                                                   parent=container,
+                                                   cache=self.nutrition_cache)
+    # Append to listing to later transfer between pages
+    self.listing = PageListing(factories)
+    # Start checking for changes pushed by firestore
+    self.check_updates(db)
     # If the user is logged in, go to food page. If not, go to welcome page.
     if self.user_email == "":
       self.up_frame('WelcomePage')
     else:
-      # Get necessary user information to set up page
-      self.get_information(db)
+      # Show the food page straight away and fill it in once firestore is connected
+      self.listing["FoodPage"].intake.configure(
+        text="Loading today's intake...")
       self.up_frame('FoodPage')
+      self.when_database_ready(
+        db, lambda: self.get_information(db),
+        lambda error: self.listing["FoodPage"].intake.configure(
+          text=
+          "Could not connect to the database.\nCheck your connection and restart the application."
+        ))
+    # Once the first page is shown, build the others while the user looks at it
+    if PREWARM:
+      self.after_idle(lambda: self.prewarm(
+        [name for name in factories if name not in PREWARM_SKIP]))
+      # The search results page isn't prewarmed, but requests is imported in the background so the first search builds it quickly
+      threading.Thread(target=self.import_search, daemon=True).start()
 
   def up_frame(self, page_name):
     """
@@ -150,7 +242,7 @@ class MainFrame(tk.Tk):
       page_name: str
           the page that the user wants to access
     """
-    # Gets the page associated with the page name from the listing dictionary
+    # Gets the page associated with the page name from the listing dictionary, building it if it wasn't shown before
     page = self.listing[page_name]
     page.tkraise()
 
@@ -162,26 +254,86 @@ class MainFrame(tk.Tk):
       db: firestore client object
         used across the code to access database to read and write
     """
-    today = str(datetime.date.today())
-    doc_ref = db.collection('users').document(self.user_email)
-    # Initialize today's dictionary is the user hasn't logged in yet
-    if today not in doc_ref.get().to_dict():
-      doc_ref.set({today: {"total_intake": 0}}, merge=True)
-    # Get food intake for food page, "initial" argument checks if the celebration goal has already been shown when logged in
+    # Fetch the user's document and today's intake once and share them with every page
+    self.tracker = ProteinTracker.load(db, self.user_email)
+    # Listen to today's intake so changes from other devices show up
+    self.tracker.subscribe()
+    # Get food intake for food page and delete page, "initial" argument checks if the celebration goal has already been shown when logged in
     self.listing["FoodPage"].get_food(self, "initial", db)
-    # Get food intake for delete page
-    self.listing["DeletePage"].get_food(self, db)
     # Create navigation bar
-    self.listing["FoodPage"].create_bar(self)
-    # Create user's intake graph in stats page
-    self.listing["StatsPage"].create_graph(self, db)
-    # Get food intake for profile page
-    self.listing["ProfilePage"].get_intake(self, db)
+    self.listing["FoodPage"].create_bar(self, db)
+    # Pages that weren't built yet get the user's information when they are built
+    if "StatsPage" in self.listing:
+      # Create user's intake graph in stats page
+      self.listing["StatsPage"].refresh(self, db)
+    if "ProfilePage" in self.listing:
+      # Get protein goal for profile page
+      self.listing["ProfilePage"].get_intake(self, db)
     # Set cursor to search box at food page
     self.listing["FoodPage"].search_box.focus_set()
     # Go to food page
     self.up_frame("FoodPage")
 
+  def check_updates(self, db):
+    """
+    Refreshes the food and delete pages from the tracker when firestore pushed a change to today's intake. Runs on the tkinter thread every UPDATE_INTERVAL milliseconds.
+
+    Args:
+      db: firestore client object
+        used across the code to access database to read and write
+    """
+    if self.tracker is not None and self.tracker.apply_updates():
+      self.listing["FoodPage"].get_food(self, "not", db)
+    self.after(UPDATE_INTERVAL, lambda: self.check_updates(db))
+
+  def when_database_ready(self, db, callback, failed):
+    """
+    Calls a function once the firestore client is ready. Checks again later if it isn't, so the window keeps responding while firebase_admin loads, instead of waiting for it on the first database call.
+
+    Args:
+      db: firestore client object
+        used across the code to access database to read and write
+      callback: function
+        called without arguments once the client is ready
+      failed: function
+        called with the error instead if the client could not connect
+    """
+    # Only a client set up in the background has to be waited for
+    ready = getattr(db, "ready", None)
+    if ready is not None and not ready():
+      self.after(DATABASE_INTERVAL,
+                 lambda: self.when_database_ready(db, callback, failed))
+    elif getattr(db, "error", None) is not None:
+      failed(db.error)
+    else:
+      callback()
+
+  def prewarm(self, page_names):
+    """
+    Builds the pages that weren't shown yet, one page every PREWARM_INTERVAL milliseconds so the application keeps responding to the user in between
+
+    Args:
+      page_names: list
+        names of the pages left to build
+    """
+    # Skip the pages already built, by being shown or by an earlier call
+    while len(page_names) != 0 and page_names[0] in self.listing:
+      page_names = page_names[1:]
+    if len(page_names) == 0:
+      return
+    # Looking the page up builds it
+    self.listing[page_names[0]]
+    self.after(PREWARM_INTERVAL, lambda: self.prewarm(page_names[1:]))
+
+  def import_search(self):
+    """ Imports the Nutritionix client and requests. Runs on a background thread, so it must not touch any widget. """
+    try:
+      import nutritionixClient
+    # The error is raised again when the search results page is built
+    except ImportError:
+      pass
+
 
-app = MainFrame()
-app.mainloop()
+if __name__ == "__main__":
+  app = MainFrame()
+  app.mainloop()
@@ -0,0 +1,153 @@
+import json
+import os
+import time
+from collections import OrderedDict
+
+# Searches are remembered for 30 days
+CACHE_TTL = 30 * 24 * 60 * 60
+# Number of searches remembered before the least recently used one is forgotten
+CACHE_SIZE = 500
+
+
+def normalize_query(food_request):
+  """
+  Normalizes a food search so that searches that only differ by case or spacing share a cache entry
+
+  Args
+    food_request: str
+        the food searched by the user
+
+  Returns
+    str: the lowercased search with whitespace collapsed
+  """
+  return " ".join(food_request.lower().split())
+
+
+def parse_foods(response_json):
+  """
+  Keeps only the parts of a Nutritionix response that the application uses
+
+  Args
+    response_json: dict
+        parsed response from Nutritionix
+
+  Returns
+    list: foods found, each with its name, protein and serving weight
+  """
+  return [{
+    "food_name": food["food_name"],
+    "nf_protein": food["nf_protein"],
+    "serving_weight_grams": food["serving_weight_grams"]
+  } for food in response_json["foods"]]
+
+
+class NutritionCache:
+  """
+  Class for a cache of Nutritionix searches kept on disk between sessions. Entries expire after a time to live, and the least recently used entry is forgotten once the cache is full.
+
+  Attributes
+    path: str
+        file the cache is saved to
+    ttl: float
+        seconds an entry stays valid
+    size: int
+        maximum number of entries
+    entries: OrderedDict
+        foods of each normalized search with the time they were saved, least recently used first
+    hits: int
+        number of searches answered by the cache
+    misses: int
+        number of searches that had to go to Nutritionix
+
+  Methods
+    get(self, food_request)
+        returns the cached foods for a search, or None
+    put(self, food_request, foods)
+        saves the foods found for a search
+    load(self)
+        reads the cache from disk
+    save(self)
+        writes the cache to disk
+  """
+
+  def __init__(self, path="nutrition_cache.json", ttl=CACHE_TTL,
+               size=CACHE_SIZE):
+    """
+    Initializes NutritionCache.
+
+    Args
+      path: str
+          file the cache is saved to
+      ttl: float
+          seconds an entry stays valid
+      size: int
+          maximum number of entries
+    """
+    self.path = path
+    self.ttl = ttl
+    self.size = size
+    self.entries = OrderedDict()
+    self.hits = 0
+    self.misses = 0
+    self.load()
+
+  def get(self, food_request):
+    """
+    Gets the cached foods for a search
+
+    Args
+      food_request: str
+          the food searched by the user
+
+    Returns
+      list: foods found for the search, or None if the search isn't cached or expired
+    """
+    key = normalize_query(food_request)
+    entry = self.entries.get(key)
+    if entry is None or time.time() - entry["saved"] > self.ttl:
+      self.entries.pop(key, None)
+      self.misses += 1
+      return None
+    # Mark the entry as the most recently used
+    self.entries.move_to_end(key)
+    self.hits += 1
+    return entry["foods"]
+
+  def put(self, food_request, foods):
+    """
+    Saves the foods found for a search, forgetting the least recently used search if the cache is full
+
+    Args
+      food_request: str
+          the food searched by the user
+      foods: list
+          foods found, as returned by parse_foods
+    """
+    key = normalize_query(food_request)
+    self.entries[key] = {"saved": time.time(), "foods": foods}
+    self.entries.move_to_end(key)
+    while len(self.entries) > self.size:
+      self.entries.popitem(last=False)
+    self.save()
+
+  def load(self):
+    """ Reads the cache from disk, skipping entries that have expired """
+    if not os.path.exists(self.path):
+      return
+    try:
+      with open(self.path, "r") as file:
+        entries = json.load(file)
+    # A damaged cache file is ignored, it gets rewritten at the next save
+    except (OSError, ValueError):
+      return
+    now = time.time()
+    for key, entry in entries.items():
+      if now - entry["saved"] <= self.ttl:
+        self.entries[key] = entry
+
+  def save(self):
+    """ Writes the cache to disk, in least recently used order """
+    # Write to a temporary file first so a crash can't leave half a cache behind
+    with open(f"{self.path}.tmp", "w") as file:
+      json.dump(self.entries, file)
+    os.replace(f"{self.path}.tmp", self.path)
@@ -0,0 +1,138 @@
+import os
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from nutritionCache import parse_foods
+
+# The address can be changed to point searches at a local stand-in such as nutritionixStandIn.py
+NUTRITIONIX_URL = os.environ.get(
+  "MYPROTEINBUDDY_NUTRITIONIX_URL",
+  'https://trackapi.nutritionix.com/v2/natural/nutrients')
+# Learned how to send the keys with every request using https://stackoverflow.com/questions/63164520/nutritionix-error-messagechild-query-fails-because-query-is-requir
+NUTRITIONIX_HEADERS = {
+  'Content-Type': "application/x-www-form-urlencoded",
+  'x-app-id': "c1358ca9",
+  'x-app-key': "7ecc612b2d7418187f2187710a7da088",
+  'x-remote-user-id': "0"
+}
+# Seconds allowed to connect and to wait for the answer
+TIMEOUT = (3.05, 10)
+# Rate limiting and server errors are worth trying again
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Longest wait between two tries in seconds, whatever Retry-After asks for, so a search stays bounded
+MAX_RETRY_WAIT = 5
+
+
+class CappedRetry(Retry):
+  """
+  Class for urllib3's retry rules with every wait capped at MAX_RETRY_WAIT seconds, including the one asked for by a Retry-After header
+
+  Methods
+    get_backoff_time(self)
+        returns the exponential wait before the next try, capped
+    get_retry_after(self, response)
+        returns the wait asked for by the server, capped
+  """
+
+  def get_backoff_time(self):
+    """
+    Gets the exponential wait before the next try, capped at MAX_RETRY_WAIT seconds
+
+    Returns
+      float: seconds to wait
+    """
+    return min(Retry.get_backoff_time(self), MAX_RETRY_WAIT)
+
+  def get_retry_after(self, response):
+    """
+    Gets the wait asked for by the server's Retry-After header, capped at MAX_RETRY_WAIT seconds
+
+    Args
+      response: urllib3 HTTPResponse object
+          the answer that is retried
+
+    Returns
+      float: seconds to wait, or None if the server didn't ask for a wait
+    """
+    retry_after = Retry.get_retry_after(self, response)
+    if retry_after is None:
+      return None
+    return min(retry_after, MAX_RETRY_WAIT)
+
+
+class NutritionixClient:
+  """
+  Class for a client of the Nutritionix natural language endpoint. One client is shared by every search so that connections are kept alive and reused instead of opening a new one per search.
+
+  Attributes
+    url: str
+        address of the nutrients endpoint
+    timeout: tuple
+        seconds allowed to connect and to wait for the answer
+    session: requests Session object
+        keeps a pool of open connections to Nutritionix
+
+  Methods
+    search(self, food_request)
+        gets the foods matching a search
+  """
+
+  def __init__(self, url=NUTRITIONIX_URL, timeout=TIMEOUT, retries=3,
+               backoff=0.5):
+    """
+    Initializes NutritionixClient.
+
+    Args
+      url: str
+          address of the nutrients endpoint
+      timeout: tuple
+          seconds allowed to connect and to wait for the answer
+      retries: int
+          number of times a rate limited or failed request is tried again
+      backoff: float
+          base of the exponential wait between retries, in seconds
+    """
+    self.url = url
+    self.timeout = timeout
+    # Learned how to retry with backoff using https://urllib3.readthedocs.io/en/stable/reference/urllib3.util.html. The nutrients endpoint only reads, so POST is safe to retry.
+    retry = CappedRetry(total=retries,
+                        backoff_factor=backoff,
+                        status_forcelist=RETRY_STATUSES,
+                        allowed_methods=frozenset(["POST"]),
+                        respect_retry_after_header=True,
+                        raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4,
+                          max_retries=retry)
+    self.session = requests.Session()
+    self.session.headers.update(NUTRITIONIX_HEADERS)
+    self.session.mount("https://", adapter)
+    self.session.mount("http://", adapter)
+
+  def search(self, food_request):
+    """
+    Gets the foods matching a search. Safe to call from a background thread.
+
+    Args
+      food_request: str
+          the food searched by the user
+
+    Returns
+      list: foods found, as returned by parse_foods. Empty if Nutritionix doesn't know the food
+
+    Raises
+      requests.RequestException: if Nutritionix can't be reached, times out or keeps failing
+      ValueError: if the answer isn't valid json
+    """
+    response = self.session.post(self.url,
+                                 data={"query": food_request},
+                                 timeout=self.timeout)
+    # Retries are already used up at this point, so the search failed
+    if response.status_code in RETRY_STATUSES:
+      raise requests.HTTPError(f"Nutritionix answered {response.status_code}",
+                               response=response)
+    # The body is parsed only once
+    response_json = response.json()
+    # Checks if there is an error. If there is, no foods were found
+    if "message" in response_json:
+      return []
+    return parse_foods(response_json)
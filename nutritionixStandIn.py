@@ -0,0 +1,288 @@
+"""
+A local stand-in for the Nutritionix natural language endpoint, so searches can be measured without using up the API quota.
+
+It answers POST /v2/natural/nutrients from the foods of foods.csv, in the same shape as Nutritionix, and can be made slow, rate limited or unresponsive. Point the application at it with the MYPROTEINBUDDY_NUTRITIONIX_URL environment variable.
+
+Usage:
+  python nutritionixStandIn.py --port 8765 --latency 0.2 --rate-limited 0.1
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from localFoods import LocalFoodDatabase
+
+ENDPOINT = "/v2/natural/nutrients"
+# Splits a search such as "2 eggs and toast" into its foods
+FOOD_SEPARATOR = re.compile(r",|\band\b|\bwith\b|&")
+# A number of servings at the start of a food, such as the 2 of "2 eggs"
+QUANTITY = re.compile(r"^\s*(\d+(?:\.\d+)?)\s+(.*)$")
+
+
+class NutritionixStandIn(ThreadingHTTPServer):
+  """
+  Class for the stand-in server. Each request is answered on its own thread, like a real server handling several clients.
+
+  Attributes
+    foods: LocalFoodDatabase object
+        foods the server knows
+    latency: float
+        seconds every answer is delayed by
+    jitter: float
+        up to this many extra seconds are added to the delay at random
+    rate_limited: float
+        share of requests answered 429, between 0 and 1
+    server_errors: float
+        share of requests answered 503, between 0 and 1
+    timeouts: float
+        share of requests that hang for hang seconds before being answered
+    hang: float
+        seconds a hanging request waits, longer than the client's timeout
+    random: Random object
+        decides which requests fail, seeded so runs can be repeated
+    lock: Lock object
+        requests are handled on several threads, so counters are updated one at a time
+    counts: dict
+        number of requests answered with each outcome
+
+  Methods
+    outcome(self)
+        decides how the next request is answered
+    count(self, outcome)
+        counts a request answered
+    url(self)
+        returns the address of the endpoint
+    start(self)
+        serves requests on a background thread
+  """
+
+  def __init__(self, port=0, foods_path="foods.csv", latency=0, jitter=0,
+               rate_limited=0, server_errors=0, timeouts=0, hang=15, seed=0):
+    """
+    Initializes NutritionixStandIn.
+
+    Args
+      port: int
+          port listened on, 0 to pick a free one
+      foods_path: str
+          csv file of the foods the server knows
+      latency: float
+          seconds every answer is delayed by
+      jitter: float
+          up to this many extra seconds are added to the delay at random
+      rate_limited: float
+          share of requests answered 429
+      server_errors: float
+          share of requests answered 503
+      timeouts: float
+          share of requests that hang before being answered
+      hang: float
+          seconds a hanging request waits
+      seed: int
+          seed deciding which requests fail
+    """
+    ThreadingHTTPServer.__init__(self, ("127.0.0.1", port), StandInHandler)
+    self.foods = LocalFoodDatabase(foods_path)
+    self.latency = latency
+    self.jitter = jitter
+    self.rate_limited = rate_limited
+    self.server_errors = server_errors
+    self.timeouts = timeouts
+    self.hang = hang
+    self.random = random.Random(seed)
+    self.lock = threading.Lock()
+    self.counts = {}
+
+  def outcome(self):
+    """
+    Decides how the next request is answered
+
+    Returns
+      str: "rate_limited", "server_error", "timeout" or "answered"
+    """
+    with self.lock:
+      draw = self.random.random()
+    if draw < self.rate_limited:
+      return "rate_limited"
+    draw -= self.rate_limited
+    if draw < self.server_errors:
+      return "server_error"
+    draw -= self.server_errors
+    if draw < self.timeouts:
+      return "timeout"
+    return "answered"
+
+  def count(self, outcome):
+    """
+    Counts a request answered
+
+    Args
+      outcome: str
+          how the request was answered
+    """
+    with self.lock:
+      self.counts[outcome] = self.counts.get(outcome, 0) + 1
+
+  def url(self):
+    """
+    Gets the address of the endpoint
+
+    Returns
+      str: the address, to give to NutritionixClient
+    """
+    return f"http://127.0.0.1:{self.server_address[1]}{ENDPOINT}"
+
+  def start(self):
+    """
+    Serves requests on a background thread until shutdown is called
+
+    Returns
+      Thread object: the thread serving requests
+    """
+    thread = threading.Thread(target=self.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+  """
+  Class answering one request to the stand-in server
+
+  Methods
+    do_POST(self)
+        answers a search
+    send_json(self, status, body, headers)
+        sends an answer as JSON
+    find_foods(self, query)
+        gets the foods of a search in the shape of Nutritionix
+  """
+
+  # Keep connections open between requests like Nutritionix does, so the client's connection pool is exercised
+  protocol_version = "HTTP/1.1"
+
+  def do_POST(self):
+    """ Answers a search, after the delay and failures the server is set up with """
+    length = int(self.headers.get("Content-Length", 0))
+    form = urllib.parse.parse_qs(self.rfile.read(length).decode())
+    if self.path != ENDPOINT:
+      self.server.count("not_found")
+      self.send_json(404, {"message": "Resource not found"})
+      return
+    if self.headers.get("x-app-id") is None or self.headers.get(
+        "x-app-key") is None:
+      self.server.count("unauthorized")
+      self.send_json(401, {"message": "unauthorized"})
+      return
+    outcome = self.server.outcome()
+    delay = self.server.latency + self.server.random.random(
+    ) * self.server.jitter
+    if outcome == "timeout":
+      delay += self.server.hang
+    time.sleep(delay)
+    self.server.count(outcome)
+    if outcome == "rate_limited":
+      self.send_json(429, {"message": "usage limits exceeded"},
+                     {"Retry-After": "0"})
+    elif outcome == "server_error":
+      self.send_json(503, {"message": "service unavailable"})
+    else:
+      foods = self.find_foods(form.get("query", [""])[0])
+      # Nutritionix answers 404 with a message when it knows none of the foods
+      if len(foods) == 0:
+        self.send_json(404,
+                       {"message": "We couldn't match any of your foods"})
+      else:
+        self.send_json(200, {"foods": foods})
+
+  def send_json(self, status, body, headers=None):
+    """
+    Sends an answer as JSON. A client that stopped waiting is ignored.
+
+    Args
+      status: int
+          HTTP status of the answer
+      body: dict
+          the answer
+      headers: dict
+          extra headers sent
+    """
+    data = json.dumps(body).encode()
+    try:
+      self.send_response(status)
+      self.send_header("Content-Type", "application/json")
+      self.send_header("Content-Length", str(len(data)))
+      for name, value in (headers or {}).items():
+        self.send_header(name, value)
+      self.end_headers()
+      self.wfile.write(data)
+    except (BrokenPipeError, ConnectionResetError):
+      pass
+
+  def find_foods(self, query):
+    """
+    Gets the foods of a search in the shape of Nutritionix. Foods the server doesn't know are left out.
+
+    Args
+      query: str
+          the search, such as "2 eggs and toast"
+
+    Returns
+      list: each food found with its name, servings, serving weight and protein
+    """
+    foods = []
+    for part in FOOD_SEPARATOR.split(query):
+      quantity = 1
+      match = QUANTITY.match(part)
+      if match is not None:
+        quantity = float(match.group(1))
+        part = match.group(2)
+      found = self.server.foods.search(part)
+      if found is None:
+        continue
+      food = found[0]
+      foods.append({
+        "food_name": food["food_name"],
+        "serving_qty": quantity,
+        "serving_unit": "serving",
+        "serving_weight_grams": food["serving_weight_grams"] * quantity,
+        "nf_protein": round(food["nf_protein"] * quantity, 2)
+      })
+    return foods
+
+  def log_message(self, format, *args):
+    """ Keeps the server quiet, as a load test sends many requests """
+
+
+def main():
+  """ Runs the stand-in server from the command line until interrupted """
+  parser = argparse.ArgumentParser(
+    description="Serve a local stand-in of the Nutritionix nutrients endpoint")
+  parser.add_argument("--port", type=int, default=8765)
+  parser.add_argument("--foods", default="foods.csv")
+  parser.add_argument("--latency", type=float, default=0)
+  parser.add_argument("--jitter", type=float, default=0)
+  parser.add_argument("--rate-limited", type=float, default=0)
+  parser.add_argument("--server-errors", type=float, default=0)
+  parser.add_argument("--timeouts", type=float, default=0)
+  parser.add_argument("--hang", type=float, default=15)
+  parser.add_argument("--seed", type=int, default=0)
+  args = parser.parse_args()
+  server = NutritionixStandIn(args.port, args.foods, args.latency,
+                              args.jitter, args.rate_limited,
+                              args.server_errors, args.timeouts, args.hang,
+                              args.seed)
+  print(f"Serving {server.url()}")
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    server.server_close()
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,72 @@
+import bisect
+from nutritionCache import normalize_query
+
+
+class PrefixIndex:
+  """
+  Class for a sorted index of food names, used to suggest foods while the user types. Names sharing a prefix sit next to each other once sorted, so finding them is a binary search.
+
+  Attributes
+    keys: list
+        normalized names, sorted
+    names: dict
+        name shown to the user for each normalized name
+
+  Methods
+    add(self, name)
+        adds a food name to the index
+    suggest(self, prefix, limit)
+        returns the food names starting with a prefix
+  """
+
+  def __init__(self, names=()):
+    """
+    Initializes PrefixIndex.
+
+    Args
+      names: iterable
+          food names to start the index with
+    """
+    self.keys = []
+    self.names = {}
+    for name in names:
+      self.add(name)
+
+  def add(self, name):
+    """
+    Adds a food name to the index, keeping it sorted
+
+    Args
+      name: str
+          the food name
+    """
+    key = normalize_query(name)
+    if key == "" or key in self.names:
+      return
+    # Learned how to insert into a sorted list using https://docs.python.org/3/library/bisect.html
+    bisect.insort(self.keys, key)
+    self.names[key] = name.strip()
+
+  def suggest(self, prefix, limit=5):
+    """
+    Gets the food names starting with a prefix
+
+    Args
+      prefix: str
+          what the user has typed so far
+      limit: int
+          maximum number of names returned
+
+    Returns
+      list: names starting with the prefix, in alphabetical order
+    """
+    prefix = normalize_query(prefix)
+    if prefix == "":
+      return []
+    suggestions = []
+    start = bisect.bisect_left(self.keys, prefix)
+    for key in self.keys[start:start + limit]:
+      if not key.startswith(prefix):
+        break
+      suggestions.append(self.names[key])
+    return suggestions
@@ -77,6 +77,9 @@ class ProfilePage(tk.Frame):
     change_protein.grid(column=1, row=2, pady=5)
     change_password.grid(column=1, row=3, pady=5)
     logout.grid(column=1, row=4, pady=5)
+    # The page is built the first time it is shown, which may be after the user logged in
+    if controller.tracker is not None:
+      self.get_intake(controller, db)
 
   def goal_setting(self, controller):
     """
@@ -99,11 +102,9 @@ class ProfilePage(tk.Frame):
       db: firestore client object
           Used to access firestore database to persist information 
     """
-    doc_ref = db.collection('users').document(controller.user_email)
-    doc = doc_ref.get()
-    # Obtain protein goal from firestore
+    # Obtain protein goal from the tracker loaded at log in
     self.user_goal.configure(
-      text=f"Protein goal: {doc.to_dict()['protein_goal']}g")
+      text=f"Protein goal: {controller.tracker.protein_goal()}g")
     self.user_email.configure(text=f"Current user: {controller.user_email}")
 
   def log_out(self, controller):
@@ -115,10 +116,19 @@ class ProfilePage(tk.Frame):
           Used to allow page changes and to access appliction attributes
     """
     # Empties food list
-    controller.listing["FoodPage"].mylist.delete(0, "end")
+    controller.listing["FoodPage"].food_model.clear()
+    if "DeletePage" in controller.listing:
+      controller.listing["DeletePage"].food_model.clear()
     controller.listing["FoodPage"].intake.configure(
       text="Today's intake: 0.00g")
-    controller.listing["GoalSetter"].destination = "food"
+    # Forget the suggestions built from the user's foods, so the next user doesn't see them
+    controller.listing["FoodPage"].hide_suggestions()
+    controller.listing["FoodPage"].suggestion_index = None
+    if "GoalSetter" in controller.listing:
+      controller.listing["GoalSetter"].destination = "food"
+    # Stop listening to the user's intake and forget their snapshot
+    controller.tracker.unsubscribe()
+    controller.tracker = None
     # Delete menu bar
     controller.config(menu="")
     # Clear user.txt as the user is not longer logged in
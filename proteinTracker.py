@@ -0,0 +1,420 @@
+import datetime
+from userSession import TOTAL_FIELD, UserSession, firestore_values
+
+
+def food_key(food_name):
+  """
+  Turns a food name into its firestore key. A food named "total intake" gets its own key, as it would otherwise overwrite the day's total.
+
+  Args
+    food_name: str
+        the food name, such as "greek yogurt"
+
+  Returns
+    str: the name with spaces replaced by underscores to conform to firestore format
+  """
+  key = food_name.replace(" ", "_")
+  if key == TOTAL_FIELD:
+    return f"{key}_food"
+  return key
+
+
+class ProteinTracker:
+  """
+  Class for a user's protein tracking, without any widget: logging and deleting food, today's summary, the goal, the streak and the history. The pages read the widgets and show the results, while every rule about the user's intake lives here so it can be used and measured without a display.
+
+  Attributes
+    db: firestore client object
+        used to access firestore database to persist information
+    session: UserSession object
+        snapshot of the user's data, kept in step with every write
+
+  Methods
+    load(cls, db, email)
+        returns the tracker of an existing user
+    fetch(cls, db, email)
+        returns the tracker of an existing user without writing anything
+    prepare(self)
+        brings the user's data up to date once they are authenticated
+    sign_up(cls, db, email, password)
+        creates a new user and returns their tracker
+    email(self)
+        returns the user's email
+    check_password(self, password)
+        returns whether a password is the user's
+    subscribe(self)
+        starts listening to changes made on other devices
+    unsubscribe(self)
+        stops listening to changes made on other devices
+    apply_updates(self)
+        applies the changes made on other devices
+    today_foods(self)
+        returns the foods logged today
+    today_intake(self)
+        returns today's total intake
+    protein_goal(self)
+        returns the user's protein goal
+    goal_reached(self)
+        returns whether today's intake is above the goal
+    streak(self)
+        returns the user's streak
+    today_summary(self)
+        returns today's foods, intake, goal and streak together
+    known_foods(self)
+        returns the names of the foods the user logged
+    log_food(self, amounts)
+        adds foods to today's intake
+    delete_foods(self, keys)
+        removes foods from today's intake
+    set_goal(self, goal)
+        changes the user's protein goal
+    first_date(self)
+        returns the first day the user tracked
+    history(self, start, end)
+        returns the statistics of the user's intake over a period
+  """
+
+  def __init__(self, db, session):
+    """
+    Initializes ProteinTracker.
+
+    Args
+      db: firestore client object
+          used to access firestore database to persist information
+      session: UserSession object
+          snapshot of the user's data
+    """
+    self.db = db
+    self.session = session
+
+  @classmethod
+  def load(cls, db, email):
+    """
+    Gets the tracker of an existing user, fetching their document and today's intake in a single round trip
+
+    Args
+      db: firestore client object
+          used to access firestore database to persist information
+      email: str
+          email of the user
+
+    Returns
+      ProteinTracker: the user's tracker, or None if the user doesn't exist
+    """
+    tracker = cls.fetch(db, email)
+    if tracker is not None:
+      tracker.prepare()
+    return tracker
+
+  @classmethod
+  def fetch(cls, db, email):
+    """
+    Gets the tracker of an existing user without writing anything, so the password is checked before a legacy user is migrated. prepare must be called once they are authenticated.
+
+    Args
+      db: firestore client object
+          used to access firestore database to persist information
+      email: str
+          email of the user
+
+    Returns
+      ProteinTracker: the user's tracker, or None if the user doesn't exist
+    """
+    session = UserSession.fetch(db, email)
+    if session is None:
+      return None
+    return cls(db, session)
+
+  def prepare(self):
+    """ Moves a legacy user's days to their own documents and builds their streak record, once they are authenticated """
+    self.session.prepare(self.db)
+
+  @classmethod
+  def sign_up(cls, db, email, password):
+    """
+    Creates a new user with their document and today's document in a single write
+
+    Args
+      db: firestore client object
+          used to access firestore database to persist information
+      email: str
+          email of the new user
+      password: str
+          password of the new user
+
+    Returns
+      ProteinTracker: the new user's tracker, or None if the email is already used
+    """
+    doc_ref = db.collection('users').document(email)
+    if doc_ref.get().exists:
+      return None
+    today = str(datetime.date.today())
+    user_json = {
+      "password": password,
+      "protein_goal": 0,
+      "streak": {
+        "length": 0,
+        "last_date": str(datetime.date.today() - datetime.timedelta(1))
+      }
+    }
+    # The new user's data is already known, so it is kept without reading it back
+    session = UserSession(email, user_json, {today: {TOTAL_FIELD: 0}})
+    batch = db.batch()
+    batch.set(doc_ref, user_json)
+    batch.set(session.day_ref(db, today), session.today())
+    batch.commit()
+    return cls(db, session)
+
+  def email(self):
+    """
+    Gets the user's email
+
+    Returns
+      str: the email
+    """
+    return self.session.email
+
+  def check_password(self, password):
+    """
+    Checks a password against the user's
+
+    Args
+      password: str
+          the password given
+
+    Returns
+      bool: True if it is the user's password
+    """
+    return self.session.data["password"] == password
+
+  def subscribe(self):
+    """ Starts listening to today's intake, so changes made on other devices show up """
+    self.session.subscribe(self.db)
+
+  def unsubscribe(self):
+    """ Stops listening to today's intake """
+    self.session.unsubscribe()
+
+  def apply_updates(self):
+    """
+    Applies the changes made on other devices, and moves on to the new day after midnight
+
+    Returns
+      bool: True if today's intake changed
+    """
+    return self.session.apply_updates()
+
+  def today_foods(self):
+    """
+    Gets the foods logged today
+
+    Returns
+      dict: protein amount of each food, keyed by its firestore key
+    """
+    return {
+      food: amount
+      for food, amount in self.session.today().items()
+      if food != TOTAL_FIELD
+    }
+
+  def today_intake(self):
+    """
+    Gets today's total intake, kept up to date whenever food is logged or deleted
+
+    Returns
+      float: today's intake in grams
+    """
+    return self.session.today().get(TOTAL_FIELD, 0)
+
+  def protein_goal(self):
+    """
+    Gets the user's protein goal
+
+    Returns
+      float: the goal in grams
+    """
+    return self.session.protein_goal()
+
+  def goal_reached(self):
+    """
+    Checks if today's intake is above the user's protein goal
+
+    Returns
+      bool: True if the goal is reached
+    """
+    return self.today_intake() > self.protein_goal()
+
+  def streak(self):
+    """
+    Gets the number of days in a row the user tracked food, up to yesterday
+
+    Returns
+      int: length of the streak
+    """
+    return self.session.streak()
+
+  def today_summary(self):
+    """
+    Gets today's foods, intake, goal and streak together
+
+    Returns
+      dict: the foods, total_intake, protein_goal, goal_reached and streak
+    """
+    return {
+      "foods": self.today_foods(),
+      "total_intake": self.today_intake(),
+      "protein_goal": self.protein_goal(),
+      "goal_reached": self.goal_reached(),
+      "streak": self.streak()
+    }
+
+  def known_foods(self):
+    """
+    Gets the names of the foods the user logged on the days already loaded
+
+    Returns
+      list: the food names, with underscores turned back into spaces
+    """
+    names = []
+    for day in self.session.days.values():
+      if day is not None:
+        names += [
+          food.replace('_', ' ') for food in day if food != TOTAL_FIELD
+        ]
+    return names
+
+  def log_food(self, amounts):
+    """
+    Adds foods to today's intake. The foods, today's total, this year's rollup and the streak are written in a single batch with atomic increments, without reading anything, so logs from other devices are not lost.
+
+    Args
+      amounts: dict
+          protein amount in grams of each food, keyed by its name
+
+    Returns
+      float: today's intake after logging
+    """
+    firestore = firestore_values(self.db)
+    logged = {}
+    for food_name, amount in amounts.items():
+      logged[food_key(food_name)] = logged.get(food_key(food_name), 0) + amount
+    meal_intake = sum(logged.values())
+    session = self.session
+    today = str(datetime.date.today())
+    # If a food or today's document doesn't exist yet, it is created with the amount
+    day_update = {
+      food: firestore.Increment(amount)
+      for food, amount in logged.items()
+    }
+    day_update[TOTAL_FIELD] = firestore.Increment(meal_intake)
+    batch = self.db.batch()
+    batch.set(session.day_ref(self.db, today), day_update, merge=True)
+    session.queue_rollup(self.db, batch, meal_intake)
+    today_foods = session.today()
+    before = today_foods.get(TOTAL_FIELD, 0)
+    # The streak record changes in the same write if this is today's first food
+    streak = session.streak_change(before, before + meal_intake)
+    if streak is not None:
+      batch.set(session.user_ref(self.db), {"streak": streak}, merge=True)
+    batch.commit()
+    # The session only changes once the write is saved, so a failed write shows nothing that wasn't saved
+    for food, amount in logged.items():
+      today_foods[food] = today_foods.get(food, 0) + amount
+    today_foods[TOTAL_FIELD] = before + meal_intake
+    session.count_in_rollup(meal_intake)
+    if streak is not None:
+      session.data["streak"] = streak
+    return today_foods[TOTAL_FIELD]
+
+  def delete_foods(self, keys):
+    """
+    Removes foods from today's intake. The amounts are read and the foods, today's total, this year's rollup and the streak are written in a single transaction, so the total goes down by what the database holds even if another device changed the foods since the session last heard of them.
+
+    Args
+      keys: list
+          firestore keys (or names) of the foods removed
+
+    Returns
+      float: grams removed from today's intake
+    """
+    firestore = firestore_values(self.db)
+    session = self.session
+    today = str(datetime.date.today())
+    day_ref = session.day_ref(self.db, today)
+    # The day's total is never removed, even if it is asked for by its field name
+    keys = list(
+      dict.fromkeys(food_key(key) for key in keys if key != TOTAL_FIELD))
+    if len(keys) == 0:
+      return 0
+
+    # Learned how to read and write together using https://firebase.google.com/docs/firestore/manage-data/transactions
+    @firestore.transactional
+    def remove(transaction):
+      snapshot = day_ref.get(transaction=transaction)
+      day = snapshot.to_dict() if snapshot.exists else {TOTAL_FIELD: 0}
+      removed_foods = [food for food in keys if food in day]
+      if len(removed_foods) == 0:
+        return day, 0, None
+      removed_intake = sum(day[food] for food in removed_foods)
+      # Learned that a merged set takes field names as they are, so food names with dots are not read as nested fields
+      deletions = {food: firestore.DELETE_FIELD for food in removed_foods}
+      # Today's total goes down by the removed amount in the same write
+      deletions[TOTAL_FIELD] = firestore.Increment(-removed_intake)
+      transaction.set(day_ref, deletions, merge=True)
+      session.queue_rollup(self.db, transaction, -removed_intake)
+      before = day.get(TOTAL_FIELD, 0)
+      for food in removed_foods:
+        day.pop(food)
+      day[TOTAL_FIELD] = before - removed_intake
+      # The streak record changes in the same write if today is now empty
+      streak = session.streak_change(before, day[TOTAL_FIELD])
+      if streak is not None:
+        transaction.set(session.user_ref(self.db), {"streak": streak},
+                        merge=True)
+      return day, removed_intake, streak
+
+    # The transaction may be retried, so the session only changes once it is committed
+    day, removed_intake, streak = remove(self.db.transaction())
+    session.days[today] = day
+    session.count_in_rollup(-removed_intake)
+    if streak is not None:
+      session.data["streak"] = streak
+    return removed_intake
+
+  def set_goal(self, goal):
+    """
+    Changes the user's protein goal
+
+    Args
+      goal: float
+          the new goal in grams
+    """
+    self.session.user_ref(self.db).set({'protein_goal': goal}, merge=True)
+    self.session.data["protein_goal"] = goal
+
+  def first_date(self):
+    """
+    Gets the first day the user tracked
+
+    Returns
+      datetime.date: the first day tracked, or today if the user never tracked
+    """
+    return self.session.first_date(self.db)
+
+  def history(self, start, end):
+    """
+    Gets the statistics of the user's intake over a period, from the yearly rollups
+
+    Args
+      start: datetime.date
+          first day of the period
+      end: datetime.date
+          last day of the period
+
+    Returns
+      StatsEngine: the intake of every day of the period
+    """
+    # numpy is slow to import, so it is only imported once statistics are needed
+    from statsEngine import StatsEngine
+    return StatsEngine.from_days(self.session.get_totals(self.db, start, end),
+                                 start, end)
@@ -0,0 +1,186 @@
+"""
+Load test of the search path: runs SearchResults.get_information many times against nutritionixStandIn.py, and reports the cache hit rate, the requests the client sent including retries, and search latency.
+
+Searches are drawn at random from a list where a few foods are searched far more often than the others, like real users do. The application runs in a temporary working directory, so it starts with an empty cache and no real file is touched. The report is written as JSON.
+
+Usage:
+  python searchBenchmark.py --searches 200 --latency 0.1 --rate-limited 0.1 --timeouts 0.02
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+import time
+
+from benchmarkHarness import SOURCE, open_window, working_directory
+from fakeFirestore import FakeFirestore
+from nutritionixStandIn import NutritionixStandIn
+
+# Searches made by the load test, including meals and a food the stand-in doesn't know
+QUERIES = [
+  "egg", "chicken breast", "2 eggs and toast", "greek yogurt", "tuna",
+  "almonds", "salmon with rice", "tofu", "lentils", "milk", "peanut butter",
+  "dragon fruit smoothie"
+]
+# Seconds allowed to connect and to wait for an answer, shorter than the application's so hanging requests don't slow the test down too much
+CLIENT_TIMEOUT = (1, 2)
+# Seconds a single search may take before the load test gives up on it
+SEARCH_LIMIT = 60
+
+
+def percentile(values, share):
+  """
+  Gets a percentile of a list of values, picking the nearest value
+
+  Args
+    values: list
+        the values, in any order
+    share: float
+        percentile wanted, between 0 and 100
+
+  Returns
+    float: the percentile, 0 if there are no values
+  """
+  if len(values) == 0:
+    return 0
+  ordered = sorted(values)
+  return ordered[min(round(share / 100 * (len(ordered) - 1)),
+                     len(ordered) - 1)]
+
+
+def outcome_of(search_results):
+  """
+  Gets what a search showed, from the text of the search results page
+
+  Args
+    search_results: SearchResults object
+        the page showing the search
+
+  Returns
+    str: "searching" while waiting, then "unreachable", "not_found" or "found"
+  """
+  texts = [
+    widget.cget("text") for widget in search_results.winfo_children()
+    if widget.winfo_class() == "Label"
+  ]
+  if any(text.startswith("Searching for") for text in texts):
+    return "searching"
+  if any("could not be reached" in text for text in texts):
+    return "unreachable"
+  if any("not in the database" in text for text in texts):
+    return "not_found"
+  return "found"
+
+
+def run_benchmark(searches, seed, server):
+  """
+  Runs searches through SearchResults.get_information one after the other, waiting for each to be shown
+
+  Args
+    searches: int
+        number of searches made
+    seed: int
+        seed picking the searches
+    server: NutritionixStandIn object
+        the stand-in answering the searches, already started
+
+  Returns
+    dict: the report
+  """
+  # The client reads the address when it is imported
+  os.environ["MYPROTEINBUDDY_NUTRITIONIX_URL"] = server.url()
+  report = {
+    "created": datetime.datetime.now().isoformat(timespec="seconds"),
+    "searches": searches,
+    "seed": seed
+  }
+  rng = random.Random(seed)
+  # Earlier queries are searched more often
+  weights = [1 / (rank + 1) for rank in range(len(QUERIES))]
+  with working_directory():
+    db = FakeFirestore()
+    app, error = open_window(db)
+    if app is None:
+      report["error"] = error
+      return report
+    food_page = app.listing["FoodPage"]
+    search_results = app.listing["SearchResults"]
+    search_results.client.timeout = CLIENT_TIMEOUT
+    latencies = {"hit": [], "miss": []}
+    outcomes = {}
+    for search in range(searches):
+      food_page.food_request = rng.choices(QUERIES, weights)[0]
+      hits = search_results.cache.hits
+      start = time.perf_counter()
+      search_results.get_information(app, db)
+      # Let tkinter run the page's checks until the search is shown
+      while outcome_of(search_results) == "searching" and time.perf_counter(
+      ) - start < SEARCH_LIMIT:
+        app.update()
+        time.sleep(0.001)
+      milliseconds = (time.perf_counter() - start) * 1000
+      outcome = outcome_of(search_results)
+      outcomes[outcome] = outcomes.get(outcome, 0) + 1
+      latencies["hit" if search_results.cache.hits > hits else "miss"].append(
+        milliseconds)
+    app.destroy()
+  every = latencies["hit"] + latencies["miss"]
+  requests_sent = sum(server.counts.values())
+  misses = len(latencies["miss"])
+  report.update({
+    "cache_hit_rate": round(len(latencies["hit"]) / max(searches, 1), 3),
+    "outcomes": outcomes,
+    "requests_sent": requests_sent,
+    "server_answers": server.counts,
+    "retries_per_miss": round((requests_sent - misses) / max(misses, 1), 3),
+    "latency_ms": {
+      name: {
+        "p50": round(percentile(values, 50), 2),
+        "p99": round(percentile(values, 99), 2),
+        "max": round(max(values, default=0), 2)
+      }
+      for name, values in [("all", every), ("cache_hit",
+                                             latencies["hit"]),
+                           ("cache_miss", latencies["miss"])]
+    }
+  })
+  return report
+
+
+def main():
+  """ Starts the stand-in, runs the load test and writes the report """
+  parser = argparse.ArgumentParser(
+    description="Load test the search path against a Nutritionix stand-in")
+  parser.add_argument("--searches", type=int, default=100)
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--latency", type=float, default=0.05)
+  parser.add_argument("--jitter", type=float, default=0.05)
+  parser.add_argument("--rate-limited", type=float, default=0)
+  parser.add_argument("--server-errors", type=float, default=0)
+  parser.add_argument("--timeouts", type=float, default=0)
+  parser.add_argument("--output", help="file the JSON report is written to")
+  args = parser.parse_args()
+  foods_path = os.path.join(SOURCE, "foods.csv")
+  server = NutritionixStandIn(0, foods_path, args.latency, args.jitter,
+                              args.rate_limited, args.server_errors,
+                              args.timeouts, CLIENT_TIMEOUT[1] + 1, args.seed)
+  server.start()
+  try:
+    report = run_benchmark(args.searches, args.seed, server)
+  finally:
+    server.shutdown()
+  text = json.dumps(report, indent=2)
+  if args.output is None:
+    print(text)
+  else:
+    with open(args.output, "w") as file:
+      file.write(text + "\n")
+  if "error" in report:
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+  main()
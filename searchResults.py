@@ -1,7 +1,10 @@
 import tkinter as tk
 import tkinter.messagebox as messagebox
-import requests
-import datetime
+import threading
+import queue
+
+# How often, in milliseconds, the page checks if the search has finished
+POLL_INTERVAL = 50
 
 
 class SearchResults(tk.Frame):
@@ -9,35 +12,61 @@ class SearchResults(tk.Frame):
   Class for search results page.
   
   Attributes:
-    serving_box: tk Entry object
-        allows user to input serving amount
-    protein: float
-        protein amount of food
+    serving_boxes: list
+        tk Entry objects allowing user to input serving amount of each food
+    foods: list
+        foods found by the search, with their protein amount
+    search_id: int
+        number of the latest search, used to ignore searches that were cancelled or replaced
+    results: Queue object
+        used by the search thread to hand its result back to the tkinter thread
+    cache: NutritionCache object
+        searches remembered from previous sessions, checked before Nutritionix and shared with the food page's suggestions
+    client: NutritionixClient object
+        shared connection to Nutritionix, reused by every search
         
   Methods
     get_information(self, controller, db)
-        accesses Nutritionix database to get food data
+        starts a search of the Nutritionix database without freezing the window
+    fetch(self, search_id, food_request)
+        accesses Nutritionix database to get food data, run on a background thread
+    check_results(self, search_id, controller, db)
+        shows the search result once the background thread is done
+    cancel_search(self, controller)
+        abandons the current search and returns to food page
+    show_food(self, controller, db, foods)
+        shows the food found by the search
+    show_error(self, controller, message)
+        shows an error instead of the food
     write_to_database(self, controller, db)
         write the user's intake to the firestore database
   """
 
-  def __init__(self, parent):
+  def __init__(self, parent, cache):
     """
     Initializes SearchResults.
 
     Args
       parent: tk Frame object
           Container that will hold the frame
+      cache: NutritionCache object
+          searches remembered from previous sessions
     """
     # Inherit from super class
     tk.Frame.__init__(self, parent)
     self.columnconfigure((0, 1, 2), weight=1)
-    self.protein = 0
-    self.serving_box = None
+    self.foods = []
+    self.serving_boxes = []
+    self.search_id = 0
+    self.results = queue.Queue()
+    self.cache = cache
+    # requests is slow to import, so the client is only built with the page
+    from nutritionixClient import NutritionixClient
+    self.client = NutritionixClient()
 
   def get_information(self, controller, db):
     """
-    Gets information from the Nutritionix database.
+    Starts a search of the Nutritionix database. The request runs on a background thread so the window keeps responding, and a loading message is shown until it is done.
 
     Args
       controller: Tk object
@@ -48,94 +77,224 @@ class SearchResults(tk.Frame):
     # Clear frame so information doesn't overlap for previous searches, learned usinghttps://stackoverflow.com/questions/15781802/python-tkinter-clearing-a-frame
     for widget in self.winfo_children():
       widget.destroy()
-    query = {"query": controller.listing["FoodPage"].food_request}
-    # Make a request to Nutrionix. Learned how to using https://stackoverflow.com/questions/63164520/nutritionix-error-messagechild-query-fails-because-query-is-requir
-    response = requests.request(
-      "POST",
-      'https://trackapi.nutritionix.com/v2/natural/nutrients',
-      headers={
-        'Content-Type': "application/x-www-form-urlencoded",
-        'x-app-id': "c1358ca9",
-        'x-app-key': "7ecc612b2d7418187f2187710a7da088",
-        'x-remote-user-id': "0"
-      },
-      data=query)
-    # Checks if there is an error. If there is, an error is shown
-    if "message" in response.json():
-      error_label = tk.Label(self,
-                             text="Sorry this food is not in the database.",
+    # A new search replaces any search still running
+    self.search_id += 1
+    search_id = self.search_id
+    food_request = controller.listing["FoodPage"].food_request
+    # Foods searched before are shown straight away without going to Nutritionix
+    foods = self.cache.get(food_request)
+    if foods is not None:
+      self.show_food(controller, db, foods)
+      return
+    loading_label = tk.Label(self,
+                             text=f"Searching for {food_request}...",
                              font=controller.titlefont,
                              bg=controller.BEIGE,
                              fg=controller.BROWN)
-      return_to_food = tk.Button(
-        self,
-        text="Return",
-        activebackground=controller.BEIGE2,
-        activeforeground=controller.BROWN,
-        bg=controller.ALMOND,
-        fg=controller.BEIGE,
-        font=controller.titlefont,
-        command=lambda: controller.up_frame("FoodPage"))
-      error_label.grid(row=0, column=1)
-      return_to_food.grid(row=1, column=1)
-    # Parse through json to find protein amount and serving weight and set up new page
+    cancel = tk.Button(self,
+                       text="Cancel",
+                       activebackground=controller.BEIGE2,
+                       activeforeground=controller.BROWN,
+                       bg=controller.ALMOND,
+                       fg=controller.BEIGE,
+                       font=controller.titlefont,
+                       command=lambda: self.cancel_search(controller))
+    loading_label.grid(row=0, column=1, pady=5)
+    cancel.grid(row=1, column=1, pady=5)
+    # Learned that daemon threads don't stop the application from closing using https://docs.python.org/3/library/threading.html
+    threading.Thread(target=self.fetch,
+                     args=(search_id, food_request),
+                     daemon=True).start()
+    # Tkinter can only be used from its own thread, so the page checks for the result with after() instead of being updated by the search thread
+    self.after(POLL_INTERVAL,
+               lambda: self.check_results(search_id, controller, db))
+
+  def fetch(self, search_id, food_request):
+    """
+    Gets information from the Nutritionix database. Runs on a background thread, so it must not touch any widget.
+
+    Args
+      search_id: int
+          number of the search, handed back with the result
+      food_request: str
+          the food searched by the user
+    """
+    # Already loaded by the client, imported here to catch its errors
+    import requests
+    try:
+      self.results.put((search_id, self.client.search(food_request)))
+    # If Nutritionix can't be reached or takes too long, there is no result to show
+    except (requests.RequestException, ValueError, KeyError):
+      self.results.put((search_id, None))
+
+  def check_results(self, search_id, controller, db):
+    """
+    Shows the result of a search once the background thread has finished. Checks again later if it hasn't.
+
+    Args
+      search_id: int
+          number of the search being waited for
+      controller: Tk object
+          Used to allow page changes and to access appliction attributes
+      db: firestore client object
+          Used to access firestore database to persist information 
+    """
+    # Stop waiting if the search was cancelled or replaced by a newer one
+    if search_id != self.search_id:
+      return
+    try:
+      result_id, foods = self.results.get_nowait()
+    except queue.Empty:
+      self.after(POLL_INTERVAL,
+                 lambda: self.check_results(search_id, controller, db))
+      return
+    # Results of cancelled or replaced searches are thrown away
+    if result_id != search_id:
+      self.after(POLL_INTERVAL,
+                 lambda: self.check_results(search_id, controller, db))
+    elif foods is None:
+      self.show_error(controller,
+                      "Sorry, the food database could not be reached.")
+    # If no foods were found, an error is shown
+    elif len(foods) == 0:
+      self.show_error(controller, "Sorry this food is not in the database.")
     else:
-      self.protein = response.json()["foods"][0]["nf_protein"]
-      serving_size = response.json()["foods"][0]["serving_weight_grams"]
-      # Indicate aforementioned values to user
+      # Remember the search for next time
+      self.cache.put(controller.listing["FoodPage"].food_request, foods)
+      self.show_food(controller, db, foods)
+
+  def cancel_search(self, controller):
+    """
+    Abandons the current search and returns to food page. The request is left to finish on its own, but its result is ignored.
+
+    Args
+      controller: Tk object
+          Used to allow page changes and to access appliction attributes
+    """
+    self.search_id += 1
+    controller.listing["FoodPage"].search_box.focus_set()
+    controller.up_frame("FoodPage")
+
+  def show_error(self, controller, message):
+    """
+    Shows an error instead of the food
+
+    Args
+      controller: Tk object
+          Used to allow page changes and to access appliction attributes
+      message: str
+          error shown to the user
+    """
+    for widget in self.winfo_children():
+      widget.destroy()
+    error_label = tk.Label(self,
+                           text=message,
+                           font=controller.titlefont,
+                           bg=controller.BEIGE,
+                           fg=controller.BROWN)
+    return_to_food = tk.Button(
+      self,
+      text="Return",
+      activebackground=controller.BEIGE2,
+      activeforeground=controller.BROWN,
+      bg=controller.ALMOND,
+      fg=controller.BEIGE,
+      font=controller.titlefont,
+      command=lambda: controller.up_frame("FoodPage"))
+    error_label.grid(row=0, column=1)
+    return_to_food.grid(row=1, column=1)
+
+  def show_food(self, controller, db, foods):
+    """
+    Shows the foods found by the search and asks for the number of servings of each. A search such as "2 eggs and toast" finds several foods, which are all shown so the whole meal is logged at once.
+
+    Args
+      controller: Tk object
+          Used to allow page changes and to access appliction attributes
+      db: firestore client object
+          Used to access firestore database to persist information 
+      foods: list
+          foods found by the search, as returned by parse_foods
+    """
+    for widget in self.winfo_children():
+      widget.destroy()
+    self.foods = foods
+    self.serving_boxes = []
+    row = 0
+    # A single food shows its protein amount and serving weight
+    if len(foods) == 1:
       protein_label = tk.Label(
         self,
-        text=f"The amount of protein: {self.protein} grams",
+        text=f"The amount of protein: {foods[0]['nf_protein']} grams",
         font=controller.titlefont,
         bg=controller.BEIGE,
         fg=controller.BROWN)
-      size_label = tk.Label(self,
-                            text=f"The serving size: {serving_size} grams",
-                            font=controller.titlefont,
-                            bg=controller.BEIGE,
-                            fg=controller.BROWN)
-      # Create aspects for input and submission
-      serving_question = tk.Label(self,
-                                  text="How many servings did you consume?",
-                                  font=controller.titlefont,
-                                  bg=controller.BEIGE,
-                                  fg=controller.BROWN)
-      self.serving_box = tk.Entry(self, width=22)
-      # Bind return button to submit button
-      self.serving_box.bind("<Return>",
-                            lambda event, controller=controller, db=db: self.
-                            write_to_database(event, controller, db))
-      submit_servings = tk.Button(
-        self,
-        text="Submit",
-        activebackground=controller.BEIGE2,
-        activeforeground=controller.BROWN,
-        bg=controller.ALMOND,
-        fg=controller.BEIGE,
-        font=controller.titlefont,
-        command=lambda: self.write_to_database("", controller, db))
-      return_to_food_mistake = tk.Button(
+      size_label = tk.Label(
         self,
-        text="Return",
-        activebackground=controller.BEIGE2,
-        activeforeground=controller.BROWN,
-        bg=controller.ALMOND,
-        fg=controller.BEIGE,
+        text=f"The serving size: {foods[0]['serving_weight_grams']} grams",
         font=controller.titlefont,
-        command=lambda: controller.up_frame("FoodPage"))
-      # Set focus on servings box
-      self.serving_box.focus_set()
-      # Grid all aspects
+        bg=controller.BEIGE,
+        fg=controller.BROWN)
       protein_label.grid(row=0, column=1, pady=5)
       size_label.grid(row=1, column=1, pady=5)
-      serving_question.grid(row=2, column=1, pady=5)
-      self.serving_box.grid(row=3, column=1, pady=5)
-      submit_servings.grid(row=4, column=1, pady=10)
-      return_to_food_mistake.grid(row=5, column=1, pady=10)
+      row = 2
+    # Create aspects for input and submission
+    serving_question = tk.Label(self,
+                                text="How many servings did you consume?",
+                                font=controller.titlefont,
+                                bg=controller.BEIGE,
+                                fg=controller.BROWN)
+    serving_question.grid(row=row, column=1, pady=5)
+    row += 1
+    for food in foods:
+      # A meal shows each food above its own servings box, which starts at one serving
+      if len(foods) > 1:
+        food_label = tk.Label(
+          self,
+          text=
+          f"{food['food_name']}: {food['nf_protein']}g protein ({food['serving_weight_grams']}g)",
+          font=controller.titlefont,
+          bg=controller.BEIGE,
+          fg=controller.BROWN)
+        food_label.grid(row=row, column=1)
+        row += 1
+      serving_box = tk.Entry(self, width=22)
+      if len(foods) > 1:
+        serving_box.insert(0, "1")
+      # Bind return button to submit button
+      serving_box.bind("<Return>",
+                       lambda event, controller=controller, db=db: self.
+                       write_to_database(event, controller, db))
+      serving_box.grid(row=row, column=1, pady=2)
+      self.serving_boxes.append(serving_box)
+      row += 1
+    submit_servings = tk.Button(
+      self,
+      text="Submit",
+      activebackground=controller.BEIGE2,
+      activeforeground=controller.BROWN,
+      bg=controller.ALMOND,
+      fg=controller.BEIGE,
+      font=controller.titlefont,
+      command=lambda: self.write_to_database("", controller, db))
+    return_to_food_mistake = tk.Button(
+      self,
+      text="Return",
+      activebackground=controller.BEIGE2,
+      activeforeground=controller.BROWN,
+      bg=controller.ALMOND,
+      fg=controller.BEIGE,
+      font=controller.titlefont,
+      command=lambda: controller.up_frame("FoodPage"))
+    # Set focus on the first servings box
+    self.serving_boxes[0].focus_set()
+    # Grid all aspects
+    submit_servings.grid(row=row, column=1, pady=10)
+    return_to_food_mistake.grid(row=row + 1, column=1, pady=10)
 
   def write_to_database(self, event, controller, db):
     """
-    Writes user's protein intake to database 
+    Writes user's protein intake to database. Every food of a meal is written together in one batch.
 
     Args
       event: Any
@@ -145,51 +304,44 @@ class SearchResults(tk.Frame):
       db: firestore client object
           Used to access firestore database to persist information 
     """
-    servings = self.serving_box.get().rstrip()
+    food_request = controller.listing["FoodPage"].food_request
+    logged = {}
     num = True
-    # Create document
-    doc_ref = db.collection('users').document(controller.user_email)
-    doc = doc_ref.get()
-    # Check is number is a float
-    if len(servings) != 0:
+    for food, serving_box in zip(self.foods, self.serving_boxes):
+      servings = serving_box.get().rstrip()
+      # Foods of a meal left empty are skipped
+      if len(servings) == 0 and len(self.foods) > 1:
+        continue
+      # Check is number is a float, without signs or exponents
+      try:
+        float(servings)
+      except ValueError:
+        num = False
       for s in servings:
         if s not in ".1234567890":
           num = False
-      # If the number is not a number, an error is shown. If note, the food the written to the database in the today's field with the food name and the protein amount as a key value pair
-      if num:
-        protein_amount = float("%.2f" % (float(servings) * self.protein))
-        today = str(datetime.date.today())
-        # Replace all spaces with underscores to conform to firestore format
-        food_search = controller.listing["FoodPage"].food_request.replace(
-          " ", "_")
-        # If there is already a dictionary for today, continue to log food. If not, create a new field
-        if today in doc.to_dict():
-          # If the food is already in the list, create a new key value pair
-          if food_search not in doc.to_dict()[today]:
-            doc_ref.update({f'{today}.{food_search}': protein_amount})
-          # If is already in the list, add amount to intial value
-          else:
-            doc_ref.update({
-              f'{today}.{food_search}':
-              protein_amount + doc.to_dict()[today][food_search]
-            })
-        else:
-          doc_ref.set({today: {}}, merge=True)
-          doc_ref.update({f'{today}.{food_search}': protein_amount})
-          # Get food for food page, indicating that it is not the initial request
-        controller.listing["FoodPage"].get_food(controller, "not", db)
-        # Set cursor at food page search box
-        controller.listing["FoodPage"].search_box.focus_set()
-        controller.up_frame("FoodPage")
+      if not num:
+        break
+      # A single food keeps the name the user searched for, while the foods of a meal are named by Nutritionix
+      if len(self.foods) == 1:
+        food_search = food_request
       else:
-        messagebox.showwarning(title="Error",
-                               message="Please enter a valid value.")
+        food_search = food["food_name"]
+      protein_amount = float("%.2f" % (float(servings) * food["nf_protein"]))
+      logged[food_search] = logged.get(food_search, 0) + protein_amount
+    # If a number is not a number or nothing was entered, an error is shown. If not, each food is added to today's intake with the food name and the protein amount as a key value pair
+    if num and len(logged) != 0:
+      controller.tracker.log_food(logged)
+      # Get food for food page, indicating that it is not the initial request
+      controller.listing["FoodPage"].get_food(controller, "not", db)
+      # Set cursor at food page search box
+      controller.listing["FoodPage"].search_box.focus_set()
+      controller.up_frame("FoodPage")
     else:
       messagebox.showwarning(title="Error",
                              message="Please enter a valid value.")
-      # If the user reached their protein goal and if the goal as not been shown yet, congratulate user and indicate that the goal has already been shown to avoid repeat
-    if controller.goal and not controller.goal_shown and controller.starting_intake <= doc.to_dict(
-    )["protein_goal"]:
+    # If the user reached their protein goal and if the goal as not been shown yet, congratulate user and indicate that the goal has already been shown to avoid repeat
+    if controller.goal and not controller.goal_shown and controller.starting_intake <= controller.tracker.protein_goal():
       messagebox.showinfo(title="Congrats",
                           message="You hit your protein goal!")
       controller.goal_shown = True
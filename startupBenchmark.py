@@ -0,0 +1,267 @@
+"""
+Measures how long MyProteinBuddy takes to start, so that changes making startup slower are caught.
+
+Each measurement runs in a fresh python process, as modules already imported would otherwise make the next measurement look free. The report is written as JSON.
+
+Usage:
+  python startupBenchmark.py --output report.json
+  python startupBenchmark.py --baseline report.json
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarkHarness import SOURCE, prepare_directory
+from userSession import TOTAL_FIELD
+
+# Modules whose import time is measured, from the heaviest libraries to each page
+MODULES = [
+  "firebase_admin", "firebase_admin.firestore", "grpc", "requests", "sendgrid",
+  "numpy", "userSession", "lazyDatabase", "welcomePage", "emailPassSignUp",
+  "emailPassLogIn", "goalSetter", "foodPage", "searchResults", "deletePage",
+  "statsPage", "profilePage", "passwordChange", "helpPage", "main"
+]
+# Email written to user.txt so the application starts on the food page
+BENCHMARK_EMAIL = "benchmark@myproteinbuddy.test"
+# A metric is a regression if it is slower than the baseline by more than this share
+TOLERANCE = 0.25
+# Metrics faster than this in the baseline, in milliseconds, are too noisy to compare
+MIN_COMPARED = 5
+
+# Foods logged today by the benchmark user, shown on the food page when it is filled
+BENCHMARK_FOODS = {"egg": 12, "chicken_breast": 31, "greek_yogurt": 17}
+# Seconds the window script waits for the food page to be filled before giving up
+FILL_LIMIT = 30
+
+# Run in a fresh process by measure_window. The benchmark user and today's document, given as JSON, are written to a FakeFirestore before the start time is taken, then the time is taken until get_information and FoodPage.get_food have filled the food page from it.
+WINDOW_SCRIPT = """
+import datetime, json, sys, time
+sys.path.insert(0, sys.argv[1])
+from fakeFirestore import FakeFirestore
+
+email, day, limit = sys.argv[2], json.loads(sys.argv[3]), float(sys.argv[4])
+db = FakeFirestore()
+today = datetime.date.today()
+user_ref = db.collection("users").document(email)
+user_ref.set({
+  "password": "benchmark",
+  "protein_goal": 200,
+  "streak": {"length": 0, "last_date": str(today - datetime.timedelta(1))}
+})
+user_ref.collection("days").document(str(today)).set(day)
+db.reset_stats()
+
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+app = main.MainFrame(db=db)
+constructed = time.perf_counter()
+food_page = app.listing["FoodPage"]
+app.update()
+# Every field of the day but its total is a food
+while food_page.mylist.size() < len(day) - 1 and time.perf_counter() - start < limit:
+  app.update()
+rendered = time.perf_counter()
+print(json.dumps({
+  "import_main_ms": (imported - start) * 1000,
+  "mainframe_constructed_ms": (constructed - start) * 1000,
+  "first_food_page_ms": (rendered - start) * 1000,
+  "food_page_shown": bool(food_page.winfo_ismapped()),
+  "foods_shown": food_page.mylist.size(),
+  "database": db.stats(),
+  "pages_built": sorted(app.listing)
+}))
+app.destroy()
+"""
+
+
+def measure_import(module, repeat):
+  """
+  Measures how long a module takes to import in a fresh process, using python's -X importtime
+
+  Args
+    module: str
+        the module imported
+    repeat: int
+        number of fresh processes measured, the median is kept
+
+  Returns
+    dict: median cumulative import time in milliseconds, or the error if the module can't be imported
+  """
+  times = []
+  for run in range(repeat):
+    completed = subprocess.run(
+      [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+      cwd=SOURCE,
+      capture_output=True,
+      text=True)
+    if completed.returncode != 0:
+      return {"error": completed.stderr.strip().splitlines()[-1]}
+    # Learned that each line is "import time: self | cumulative | name" using https://docs.python.org/3/using/cmdline.html#cmdoption-X
+    for line in completed.stderr.splitlines():
+      parts = line.split("|")
+      if len(parts) == 3 and parts[2].strip() == module:
+        times.append(int(parts[1]) / 1000)
+  if len(times) == 0:
+    return {"error": "already imported by python at startup"}
+  return {"ms": statistics.median(times)}
+
+
+def measure_window(repeat):
+  """
+  Measures how long it takes to build MainFrame and show the food page of a logged in user, filled with the foods of BENCHMARK_FOODS read from a FakeFirestore. Runs in a temporary working directory holding the application's assets and a user.txt, so no real user file is touched.
+
+  Args
+    repeat: int
+        number of fresh processes measured, the median of each time is kept
+
+  Returns
+    dict: median times in milliseconds since the start of the process, or the error if no window could be opened
+  """
+  runs = []
+  with tempfile.TemporaryDirectory() as directory:
+    prepare_directory(directory, BENCHMARK_EMAIL)
+    for run in range(repeat):
+      completed = subprocess.run(
+        [
+          sys.executable, "-c", WINDOW_SCRIPT, SOURCE, BENCHMARK_EMAIL,
+          json.dumps({
+            **BENCHMARK_FOODS, TOTAL_FIELD:
+            sum(BENCHMARK_FOODS.values())
+          }),
+          str(FILL_LIMIT)
+        ],
+        cwd=directory,
+        capture_output=True,
+        text=True)
+      # Tkinter can't open a window without a display
+      if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1]}
+      runs.append(json.loads(completed.stdout))
+  report = {
+    name: statistics.median(run[name] for run in runs)
+    for name in
+    ["import_main_ms", "mainframe_constructed_ms", "first_food_page_ms"]
+  }
+  report["food_page_shown"] = all(run["food_page_shown"] for run in runs)
+  # The food page is only measured properly if every food was listed in each run
+  report["food_page_filled"] = all(
+    run["foods_shown"] == len(BENCHMARK_FOODS) for run in runs)
+  report["database"] = runs[-1]["database"]
+  report["pages_built"] = runs[-1]["pages_built"]
+  return report
+
+
+def run_benchmark(repeat):
+  """
+  Measures the import time of every module of MODULES and the time to the first window
+
+  Args
+    repeat: int
+        number of fresh processes measured for each time
+
+  Returns
+    dict: the report
+  """
+  start = time.perf_counter()
+  report = {
+    "created": datetime.datetime.now().isoformat(timespec="seconds"),
+    "python": platform.python_version(),
+    "platform": platform.platform(),
+    "repeat": repeat,
+    "imports": {module: measure_import(module, repeat)
+                for module in MODULES},
+    "window": measure_window(repeat)
+  }
+  report["benchmark_seconds"] = round(time.perf_counter() - start, 2)
+  return report
+
+
+def timings(report):
+  """
+  Gets every time of a report
+
+  Args
+    report: dict
+        a report made by run_benchmark
+
+  Returns
+    dict: each time in milliseconds, keyed by its name
+  """
+  times = {
+    f"import {module}": result["ms"]
+    for module, result in report["imports"].items() if "ms" in result
+  }
+  for name, value in report["window"].items():
+    if name.endswith("_ms"):
+      times[name] = value
+  return times
+
+
+def find_regressions(report, baseline, tolerance=TOLERANCE):
+  """
+  Compares a report with an earlier one
+
+  Args
+    report: dict
+        the new report
+    baseline: dict
+        the earlier report
+    tolerance: float
+        share a time may grow by before it counts as a regression
+
+  Returns
+    list: a message for each time slower than the baseline by more than the tolerance
+  """
+  regressions = []
+  before = timings(baseline)
+  for name, after in timings(report).items():
+    if name in before and before[name] >= MIN_COMPARED and after > before[
+        name] * (1 + tolerance):
+      regressions.append(
+        f"{name}: {before[name]:.1f}ms -> {after:.1f}ms (+{after / before[name] - 1:.0%})"
+      )
+  return regressions
+
+
+def main():
+  """ Runs the benchmark from the command line. Exits with 1 if a baseline was given and startup got slower. """
+  parser = argparse.ArgumentParser(
+    description="Measure MyProteinBuddy's startup time")
+  parser.add_argument("--repeat",
+                      type=int,
+                      default=3,
+                      help="fresh processes measured for each time")
+  parser.add_argument("--output", help="file the JSON report is written to")
+  parser.add_argument("--baseline",
+                      help="earlier report to check for regressions")
+  parser.add_argument("--tolerance",
+                      type=float,
+                      default=TOLERANCE,
+                      help="share a time may grow by before it fails")
+  args = parser.parse_args()
+  report = run_benchmark(args.repeat)
+  text = json.dumps(report, indent=2)
+  if args.output is None:
+    print(text)
+  else:
+    with open(args.output, "w") as file:
+      file.write(text + "\n")
+  if args.baseline is not None:
+    with open(args.baseline) as file:
+      regressions = find_regressions(report, json.load(file), args.tolerance)
+    for regression in regressions:
+      print(f"Slower than baseline: {regression}", file=sys.stderr)
+    if len(regressions) != 0:
+      sys.exit(1)
+
+
+if __name__ == "__main__":
+  main()
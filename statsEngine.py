@@ -0,0 +1,181 @@
+import numpy as np
+
+# 1970-01-05 was a Monday, so weeks counted from it start on Mondays
+FIRST_MONDAY = np.datetime64("1970-01-05")
+
+
+class StatsEngine:
+  """
+  Class for statistics over a user's daily intake. Every day from the first to the last is held in one NumPy array, days without food being 0, so sums, averages and percentiles are computed without looping over days in Python.
+
+  Attributes
+    dates: numpy array
+        each day covered, as datetime64
+    totals: numpy array
+        protein intake of each day in grams
+
+  Methods
+    from_days(cls, days, start, end)
+        builds the engine from the totals of the days that have food
+    rolling_average(self, window)
+        returns the average intake of the window ending on each day
+    period_sums(self, period)
+        returns the intake of each week, month or year
+    goal_hit_rate(self, goal)
+        returns the share of tracked days on which the goal was reached
+    percentile_bands(self, percentiles)
+        returns percentiles of the intake of tracked days
+  """
+
+  def __init__(self, dates, totals):
+    """
+    Initializes StatsEngine.
+
+    Args
+      dates: numpy array
+          each day covered, as datetime64, one day apart
+      totals: numpy array
+          protein intake of each day in grams
+    """
+    self.dates = dates
+    self.totals = totals
+
+  @classmethod
+  def from_days(cls, days, start, end):
+    """
+    Builds the engine from the totals of the days that have food
+
+    Args
+      days: dict
+          total intake of each day, keyed by date (YYYY-MM-DD). Missing days count as 0
+      start: datetime.date
+          first day covered
+      end: datetime.date
+          last day covered
+
+    Returns
+      StatsEngine: the engine covering start to end
+    """
+    first = np.datetime64(start, "D")
+    length = max((end - start).days + 1, 0)
+    dates = first + np.arange(length)
+    totals = np.zeros(length)
+    if len(days) != 0:
+      day_dates = np.array(list(days), dtype="datetime64[D]")
+      offsets = (day_dates - first).astype(int)
+      inside = (offsets >= 0) & (offsets < length)
+      totals[offsets[inside]] = np.fromiter(days.values(), float)[inside]
+    return cls(dates, totals)
+
+  def rolling_average(self, window=7):
+    """
+    Gets the average intake of the window ending on each day. The first days average over the days available.
+
+    Args
+      window: int
+          number of days averaged
+
+    Returns
+      numpy array: average of each day
+    """
+    # Learned that a running sum gives every window's sum with one subtraction using https://numpy.org/doc/stable/reference/generated/numpy.cumsum.html
+    sums = np.concatenate(([0], np.cumsum(self.totals)))
+    ends = np.arange(1, len(self.totals) + 1)
+    starts = np.maximum(ends - window, 0)
+    return (sums[ends] - sums[starts]) / (ends - starts)
+
+  def period_sums(self, period):
+    """
+    Gets the intake of each week (starting Monday), month or year
+
+    Args
+      period: str
+          "week", "month" or "year"
+
+    Returns
+      tuple: first day of each period as datetime64, and the intake of each period
+    """
+    if len(self.totals) == 0:
+      return self.dates, self.totals
+    if period == "week":
+      keys = (self.dates - FIRST_MONDAY).astype(int) // 7
+    elif period == "month":
+      keys = self.dates.astype("datetime64[M]").astype(int)
+    else:
+      keys = self.dates.astype("datetime64[Y]").astype(int)
+    # The days are in order, so each period starts where the key changes
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+    return self.dates[starts], np.add.reduceat(self.totals, starts)
+
+  def goal_hit_rate(self, goal):
+    """
+    Gets the share of tracked days on which the goal was reached
+
+    Args
+      goal: float
+          protein goal in grams
+
+    Returns
+      float: share between 0 and 1, or 0 if no day was tracked
+    """
+    tracked = self.totals[self.totals > 0]
+    if len(tracked) == 0:
+      return 0.0
+    return float(np.mean(tracked >= goal))
+
+  def percentile_bands(self, percentiles=(25, 50, 75)):
+    """
+    Gets percentiles of the intake of tracked days
+
+    Args
+      percentiles: tuple
+          percentiles wanted, between 0 and 100
+
+    Returns
+      numpy array: intake at each percentile, all 0 if no day was tracked
+    """
+    tracked = self.totals[self.totals > 0]
+    if len(tracked) == 0:
+      return np.zeros(len(percentiles))
+    return np.percentile(tracked, percentiles)
+
+
+def downsample(values, points):
+  """
+  Picks the days to draw so a long history is drawn with a fixed number of points while keeping its peaks and dips. Uses largest triangle three buckets: the days are split into buckets, and from each bucket the day forming the largest triangle with the day picked before it and the average of the next bucket is kept.
+
+  Args
+    values: numpy array
+        intake of each day
+    points: int
+        number of days to keep
+
+  Returns
+    numpy array: indexes of the days kept, in order
+  """
+  # Learned the algorithm from https://skemman.is/bitstream/1946/15343/3/SS_MSthesis.pdf
+  length = len(values)
+  if points >= length or points < 3:
+    return np.arange(length)
+  # Bucket edges for every day except the first and last, which are always kept
+  edges = (np.arange(points - 1) * (length - 2) / (points - 2)).astype(int) + 1
+  edges[-1] = length - 1
+  indexes = np.zeros(points, dtype=int)
+  indexes[-1] = length - 1
+  picked = 0
+  for bucket in range(points - 2):
+    start, end = edges[bucket], edges[bucket + 1]
+    # Average of the next bucket, which is just the last day for the last bucket
+    if bucket + 2 < len(edges):
+      next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+    else:
+      next_start, next_end = length - 1, length
+    average_x = (next_start + next_end - 1) / 2
+    average_y = values[next_start:next_end].mean()
+    # Twice the area of the triangle made by each day of the bucket
+    days = np.arange(start, end)
+    areas = np.abs((picked - average_x) * (values[start:end] - values[picked]) -
+                   (picked - days) * (average_y - values[picked]))
+    picked = start + int(np.argmax(areas))
+    indexes[bucket + 1] = picked
+  return indexes
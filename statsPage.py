@@ -1,17 +1,57 @@
 import tkinter as tk
 import datetime
 
+# Ranges the user can pick, in days. None shows every day since the user started tracking
+RANGES = [("7 days", 7), ("30", 30), ("90", 90), ("365", 365), ("All", None)]
+# Most points drawn for a long range, whatever the length of the history
+MAX_POINTS = 120
+# The variables below size the bar graph, followed https://stackoverflow.com/questions/35666573/use-tkinter-to-draw-a-specific-bar-chart
+GRAPH_WIDTH = 240
+GRAPH_HEIGHT = 260
+Y_GAP = 20  # The gap between lower canvas edge and x axis, and between the highest value and the upper edge
+X_STRETCH = 10  # Stretch x wide enough to fit the variables
+X_WIDTH = 20  # The width of the x-axis
+X_GAP = 20  # The gap between left canvas edge and y axis
+
 
 class StatsPage(tk.Frame):
   """
-  Class for stats page.
-    
+  Class for stats page. The graph and labels are created once and redrawn in place, so logging in and out doesn't stack new widgets on the page. The last seven days are shown as bars, and longer ranges as a line drawn with a fixed number of points.
+
+  Attributes
+    graph: tk Canvas object
+        shows the intake of the chosen range
+    title: tk Label object
+        names the range shown
+    days: tk IntVar object
+        number of days shown, 0 for every day since the user started tracking
+    line: int
+        canvas id of the line used for long ranges
+    streak_label: tk Label object
+        shows the user's streak
+    summary_label: tk Label object
+        shows the week's average, the month's intake and the goal hit rate
+    bars: list
+        canvas ids of the bar and value text of each day
+    bands: list
+        canvas ids of the lines showing the usual day
+    data: list
+        intake shown by each bar, used to only redraw bars that changed
+    top: float
+        intake at the top of the graph when the bars were last drawn
+
   Methods
-    create_graph(self, controller, db)
-        creates graph
+    refresh(self, controller, db)
+        redraws the graph and labels with the user's latest intake
+    bar_height(self, intake, top)
+        returns the y coordinate of an intake on the graph
+    draw_bars(self, data, top)
+        shows the intake of the last seven days as bars
+    draw_line(self, values, top)
+        shows the intake of a long range as a line
   """
 
-  def __init__(self, parent, controller):
+  def __init__(self, parent, controller, db):
     """
     Initializes StatsPage.
 
@@ -20,91 +60,199 @@ class StatsPage(tk.Frame):
           Used to allow page changes and to access appliction attributes
       parent: tk Frame object
           Container that will hold the frame
+      db: firestore client object
+          Used to access firestore database to persist information 
     """
     # Inherit from super class
     tk.Frame.__init__(self, parent)
     self.columnconfigure((0, 1, 2), weight=1)
+    # Initialize labels and graph
+    self.title = tk.Label(self,
+                          text="Your intake in the last seven days!",
+                          font=controller.titlefont,
+                          bg=controller.BEIGE,
+                          fg=controller.BROWN)
+    # Create a button for each range, learned how to make radio buttons look like buttons using https://tkdocs.com/shipman/radiobutton.html
+    self.days = tk.IntVar(value=7)
+    range_buttons = tk.Frame(self, bg=controller.BEIGE)
+    for text, days in RANGES:
+      tk.Radiobutton(range_buttons,
+                     text=text,
+                     variable=self.days,
+                     value=days if days is not None else 0,
+                     indicatoron=0,
+                     selectcolor=controller.BEIGE2,
+                     bg=controller.ALMOND,
+                     fg=controller.BEIGE,
+                     font=controller.titlefont,
+                     command=lambda: self.refresh(controller, db)).pack(
+                       side="left")
+    self.graph = tk.Canvas(self,
+                           width=GRAPH_WIDTH,
+                           height=GRAPH_HEIGHT,
+                           bg=controller.BEIGE,
+                           highlightthickness=0)
+    self.streak_label = tk.Label(self,
+                                 text="You have a 0-day streak!",
+                                 font=controller.titlefont,
+                                 bg=controller.BEIGE,
+                                 fg=controller.BROWN)
+    self.summary_label = tk.Label(self,
+                                  font=controller.titlefont,
+                                  bg=controller.BEIGE,
+                                  fg=controller.BROWN)
+    # The band of a usual day sits behind the bars, so it is drawn first
+    self.bands = []
+    for band in range(2):
+      line = self.graph.create_line(0, 0, 0, 0, fill=controller.ALMOND,
+                                    dash=(4, 2))
+      self.bands.append(line)
+    # Create an empty bar and value text for each day, moved into place when refreshed
+    self.bars = []
+    for x in range(7):
+      bar = self.graph.create_rectangle(0, 0, 0, 0, fill=controller.BROWN)
+      value = self.graph.create_text(0, 0, anchor=tk.SW)
+      self.bars.append((bar, value))
+    self.data = [None] * 7
+    self.top = None
+    self.line = self.graph.create_line(0, 0, 0, 0, fill=controller.BROWN,
+                                       width=2, state="hidden")
+    # Grid aspects onto page
+    range_buttons.grid(row=0, column=1)
+    self.graph.grid(row=1, column=1)
+    self.title.grid(row=2, column=1)
+    self.streak_label.grid(row=3, column=1)
+    self.summary_label.grid(row=4, column=1)
 
-  def create_graph(self, controller, db):
+  def refresh(self, controller, db):
     """
-    Create graph on the application. Not created earlier to avoid empty requests to firebase
+    Redraws the graph and labels with the user's latest intake over the chosen range. Only the yearly rollups covering the range are fetched, and only the bars whose intake changed are moved.
 
     Args
       controller: Tk object
           Used to allow page changes and to access appliction attributes
       db: firestore client object
-          Used to access firestore database to persist information 
+          Used to access firestore database to persist information
     """
-    # Initialize labels
-    label = tk.Label(self,
-                     text="Your intake in the last seven days!",
-                     font=controller.titlefont,
-                     bg=controller.BEIGE,
-                     fg=controller.BROWN)
-    # Define the graph's width
-    graph_width = 240
-    graph_height = 350
-    graph = tk.Canvas(self,
-                      width=graph_width,
-                      height=graph_height,
-                      bg=controller.BEIGE,
-                      highlightthickness=0)
-    # Grid aspects onto page
-    graph.grid(row=0, column=1)
-    label.grid(row=1, column=1)
-    doc_ref = db.collection('users').document(controller.user_email)
-    doc = doc_ref.get()
-    date_list = []
-    tracked = True
-    days_before = 1
-    # Calculates streak by looping through dates until there is no data or no logged food.
-    while tracked:
-      # Accessed previous days using https://stackoverflow.com/questions/30483977/python-get-yesterdays-date-as-a-string-in-yyyy-mm-dd-format
-      date = str(datetime.date.today() - datetime.timedelta(days_before))
-      if date not in doc.to_dict():
-        days_before -= 1
-        tracked = False
-      elif doc.to_dict()[date]["total_intake"] == 0:
-        days_before -= 1
-        tracked = False
-      else:
-        days_before += 1
-    streak_label = tk.Label(self,
-                            text=f"You have a {days_before}-day streak!",
-                            font=controller.titlefont,
-                            bg=controller.BEIGE,
-                            fg=controller.BROWN)
-    streak_label.grid(row=2, column=1)
-    # Get data from the last seven days in reverse (get earlier days first)
-    for i in range(1, 8):
-      date_list.append(str(datetime.date.today() - datetime.timedelta(9 - i)))
-    data = []
-    for date in date_list:
-      if date in doc.to_dict():
-        intake = round(doc.to_dict()[date]["total_intake"], 2)
-        data.append(intake)
-      # If date is not in database, the day's data is 0
-      else:
-        data.append(0)
-    # Followed #https://stackoverflow.com/questions/35666573/use-tkinter-to-draw-a-specific-bar-chart to create graph
-    # The variables below size the bar graph
-    y_stretch = 15  # The highest y = max_data_value * y_stretch
-    y_gap = 20  # The gap between lower canvas edge and x axis
-    x_stretch = 10  # Stretch x wide enough to fit the variables
-    x_width = 20  # The width of the x-axis
-    x_gap = 20  # The gap between left canvas edge and y axis
-    # For loop to calculate the rectangle
+    # numpy is slow to import, so it is only imported once statistics are shown
+    from statsEngine import StatsEngine
+    tracker = controller.tracker
+    today = datetime.date.today()
+    days = self.days.get()
+    # Load at least the last year of daily totals from the yearly rollups into the stats engine, or every day for the whole history
+    start = today - datetime.timedelta(max(days, 365) - 1)
+    if days == 0:
+      start = min(start, tracker.first_date())
+    engine = tracker.history(start, today)
+    year = StatsEngine(engine.dates[-365:], engine.totals[-365:])
+    # The streak is read from the streak record kept up to date whenever food is logged or deleted
+    self.streak_label.configure(
+      text=f"You have a {tracker.streak()}-day streak!")
+    # Summarize the past week, this month and the goal hit rate of the past 30 days
+    week_average = engine.rolling_average(7)[-1]
+    month_intake = engine.period_sums("month")[1][-1]
+    hit_rate = StatsEngine(engine.dates[-30:],
+                           engine.totals[-30:]).goal_hit_rate(
+                             tracker.protein_goal())
+    self.summary_label.configure(
+      text=
+      f"Past week: {week_average:.1f}g a day\nThis month: {month_intake:.0f}g, goal hit on {hit_rate:.0%} of days"
+    )
+    # The band of a usual day is the 25th to 75th percentile of the past year
+    bands = year.percentile_bands((25, 75))
+    if days == 7:
+      self.title.configure(text="Your intake in the last seven days!")
+      # Get data from the last seven days in reverse (get earlier days first). Days without food are 0
+      values = engine.totals[-9:-2]
+    elif days == 0:
+      self.title.configure(text="Your intake since you started!")
+      # Only the days since the user started are drawn, even though the last year is always loaded
+      values = engine.totals[max((tracker.first_date() - start).days, 0):]
+    else:
+      self.title.configure(text=f"Your intake in the last {days} days!")
+      values = engine.totals[-days:]
+    # The graph is scaled so the highest day and the band fit in it
+    top = max(float(values.max()), float(bands.max()), 1)
+    if days == 7:
+      self.draw_bars([round(float(y), 2) for y in values], top)
+    else:
+      self.draw_line(values, top)
+    for line, band in zip(self.bands, bands):
+      y = self.bar_height(band, top)
+      self.graph.coords(line, 0, y, GRAPH_WIDTH, y)
+
+  def bar_height(self, intake, top):
+    """
+    Gets the y coordinate of an intake on the graph
+
+    Args
+      intake: float
+          protein intake
+      top: float
+          intake at the top of the graph
+
+    Returns
+      float: y coordinate on the graph
+    """
+    return GRAPH_HEIGHT - Y_GAP - intake / top * (GRAPH_HEIGHT - 2 * Y_GAP)
+
+  def draw_bars(self, data, top):
+    """
+    Shows the intake of the last seven days as bars, moving only the bars that changed
+
+    Args
+      data: list
+          intake of each of the seven days, earlier days first
+      top: float
+          intake at the top of the graph
+    """
+    self.graph.itemconfigure(self.line, state="hidden")
+    # Every bar moves when the scale changes
+    if top != self.top:
+      self.data = [None] * 7
+      self.top = top
     for x, y in enumerate(data):
-      # coordinates of each bar
+      bar, value = self.bars[x]
+      self.graph.itemconfigure(bar, state="normal")
+      self.graph.itemconfigure(value, state="normal")
+      if y == self.data[x]:
+        continue
       # Bottom left coordinate
-      x0 = x * x_stretch + x * x_width + x_gap
+      x0 = x * X_STRETCH + x * X_WIDTH + X_GAP
       # Top left coordinates
-      y0 = graph_height - (y / 10 * y_stretch + y_gap)
+      y0 = self.bar_height(y, top)
       # Bottom right coordinates
-      x1 = x * x_stretch + x * x_width + x_width + x_gap
+      x1 = x * X_STRETCH + x * X_WIDTH + X_WIDTH + X_GAP
       # Top right coordinates
-      y1 = graph_height - y_gap
-      # Draw the bar
-      graph.create_rectangle(x0, y0, x1, y1, fill=controller.BROWN)
-      # Put the y value above the bar
-      graph.create_text(x0 + 2, y0, anchor=tk.SW, text=str(y))
+      y1 = GRAPH_HEIGHT - Y_GAP
+      # Move the bar and put the y value above it
+      self.graph.coords(bar, x0, y0, x1, y1)
+      self.graph.coords(value, x0 + 2, y0)
+      self.graph.itemconfigure(value, text=f"{y:g}")
+      self.data[x] = y
+
+  def draw_line(self, values, top):
+    """
+    Shows the intake of a long range as a line. Long histories are downsampled so the line always has at most MAX_POINTS points.
+
+    Args
+      values: numpy array
+          intake of each day of the range, earlier days first
+      top: float
+          intake at the top of the graph
+    """
+    for bar, value in self.bars:
+      self.graph.itemconfigure(bar, state="hidden")
+      self.graph.itemconfigure(value, state="hidden")
+    from statsEngine import downsample
+    indexes = downsample(values, MAX_POINTS)
+    # Spread the days over the width of the graph
+    x_scale = (GRAPH_WIDTH - 2 * X_GAP) / max(len(values) - 1, 1)
+    coords = []
+    for i in indexes:
+      coords += [X_GAP + i * x_scale, self.bar_height(values[i], top)]
+    # A line needs at least two points
+    if len(coords) == 2:
+      coords += coords
+    self.graph.coords(self.line, *coords)
+    self.graph.itemconfigure(self.line, state="normal")
@@ -0,0 +1,40 @@
+import datetime
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repository, next to main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakeFirestore import FakeFirestore
+
+
+class FixedDate(datetime.date):
+  """ Class for dates whose today() is set by the test, so streaks and rollups don't depend on when the tests run """
+
+  current = datetime.date(2026, 3, 15)
+
+  @classmethod
+  def today(cls):
+    """
+    Gets the day the test is set on
+
+    Returns
+      FixedDate: the day
+    """
+    return cls(cls.current.year, cls.current.month, cls.current.day)
+
+
+@pytest.fixture
+def today(monkeypatch):
+  """ Sets today to FixedDate.current for the test, and lets the test move it with FixedDate.current """
+  monkeypatch.setattr(FixedDate, "current", FixedDate.current)
+  monkeypatch.setattr(datetime, "date", FixedDate)
+  return FixedDate
+
+
+@pytest.fixture
+def db():
+  """ An empty FakeFirestore kept in memory """
+  return FakeFirestore()
@@ -0,0 +1,126 @@
+import asyncio
+import base64
+import datetime
+import json
+
+import pytest
+
+import apiServer
+from apiServer import HTTPError, TrackerServer, is_food_name, is_grams
+
+
+@pytest.fixture
+def server(db, today):
+  """ A server on a FakeFirestore, stopped after the test """
+  server = TrackerServer(db, workers=2)
+  yield server
+  for tracker, loaded in server.trackers.values():
+    tracker.unsubscribe()
+  server.executor.shutdown()
+
+
+def basic(email, password):
+  """ Headers of a request authenticated as a user """
+  credentials = base64.b64encode(f"{email}:{password}".encode()).decode()
+  return {"authorization": f"Basic {credentials}"}
+
+
+async def call(server, method, path, body=None, headers=None):
+  """ Sends one request to the server, answering errors like handle_connection does """
+  try:
+    return await server.respond(method, path, headers or {},
+                                json.dumps(body).encode() if body else b"")
+  except HTTPError as error:
+    return error.status, {"message": error.message}
+
+
+def test_requests_need_the_users_password(server):
+
+  async def requests():
+    user = {"email": "user@example.com", "password": "secret"}
+    assert (await call(server, "POST", "/users", user))[0] == 201
+    assert (await call(server, "POST", "/users", user))[0] == 409
+    assert (await call(server, "GET", "/today"))[0] == 401
+    assert (await call(server, "GET", "/today", headers=basic(
+      "user@example.com", "guess")))[0] == 401
+    status, answer = await call(server, "GET", "/today",
+                                headers=basic("user@example.com", "secret"))
+    assert status == 200 and answer["total_intake"] == 0
+    assert (await call(server, "GET", "/today", headers=basic(
+      "nobody@example.com", "secret")))[0] == 401
+
+  asyncio.run(requests())
+  # A failed log in keeps neither a tracker nor a lock
+  assert list(server.trackers) == ["user@example.com"]
+  assert list(server.locks) == ["user@example.com"]
+
+
+def test_wrong_password_leaves_a_legacy_user_untouched(server, db, today):
+  yesterday = str(today.today() - datetime.timedelta(1))
+  user_ref = db.collection("users").document("old@example.com")
+  user_ref.set({"password": "secret", "protein_goal": 0, yesterday: {"egg": 6}})
+  headers = basic("old@example.com", "guess")
+  assert asyncio.run(call(server, "GET", "/today", headers=headers))[0] == 401
+  assert yesterday in user_ref.get().to_dict()
+  headers = basic("old@example.com", "secret")
+  status, answer = asyncio.run(call(server, "GET", "/today", headers=headers))
+  assert status == 200 and answer["streak"] == 1
+  assert yesterday not in user_ref.get().to_dict()
+
+
+def test_bodies_are_validated(server):
+  headers = basic("user@example.com", "secret")
+  invalid = [("POST", "/foods", {"foods": {"egg": True}}),
+             ("POST", "/foods", {"foods": {"egg": -5}}),
+             ("POST", "/foods", {"foods": {"total intake": 5}}),
+             ("POST", "/foods", {"foods": {"a" * 101: 5}}),
+             ("POST", "/foods", {"foods": {}}),
+             ("DELETE", "/foods", {"foods": [""]}),
+             ("PUT", "/goal", {"goal": "120"}),
+             ("PUT", "/goal", {"goal": 5000}), ("GET", "/stats?days=0", None),
+             ("GET", "/stats?days=week", None)]
+
+  async def requests():
+    await call(server, "POST", "/users", {
+      "email": "user@example.com",
+      "password": "secret"
+    })
+    statuses = [(await call(server, method, path, body, headers))[0]
+                for method, path, body in invalid]
+    logged = await call(server, "POST", "/foods", {"foods": {"egg": 6}},
+                        headers)
+    return statuses, logged
+
+  statuses, logged = asyncio.run(requests())
+  assert statuses == [400] * len(invalid)
+  assert logged == (200, {
+    "foods": {
+      "egg": 6
+    },
+    "total_intake": 6,
+    "protein_goal": 0,
+    "goal_reached": True,
+    "streak": 0
+  })
+
+
+def test_sign_up_keeps_the_cache_bounded(server, monkeypatch):
+  monkeypatch.setattr(apiServer, "TRACKER_CACHE_SIZE", 2)
+
+  async def requests():
+    for name in ["a", "b", "c"]:
+      await call(server, "POST", "/users", {
+        "email": f"{name}@example.com",
+        "password": "secret"
+      })
+
+  asyncio.run(requests())
+  assert list(server.trackers) == ["b@example.com", "c@example.com"]
+  assert "a@example.com" not in server.locks
+
+
+def test_is_grams_and_is_food_name():
+  assert is_grams(6) and is_grams(6.5)
+  assert not is_grams(True) and not is_grams(float("nan")) and not is_grams("6")
+  assert is_food_name("greek yogurt")
+  assert not is_food_name(" ") and not is_food_name("total intake")
@@ -0,0 +1,109 @@
+import json
+
+from instrumentedDatabase import InstrumentedDatabase
+from proteinTracker import ProteinTracker
+
+
+class SdkTransaction:
+  """ Class standing in for a transaction of firebase_admin, which firestore.transactional begins and commits through private methods """
+
+  def __init__(self):
+    self.attempts = 0
+    self.committed = []
+
+  def set(self, reference, data, merge=False):
+    self.committed.append((reference, data))
+
+  def _begin(self, retry_id=None):
+    self.attempts += 1
+    self.committed = []
+
+  def _commit(self):
+    return self.committed
+
+
+class SdkClient:
+  """ Class standing in for the firebase_admin client, only handing out transactions """
+
+  def transaction(self):
+    return SdkTransaction()
+
+
+def test_transaction_writes_are_recorded_once_per_commit():
+  db = InstrumentedDatabase(SdkClient())
+  transaction = db.transaction()
+  # A first attempt conflicts and is started again, like firestore.transactional does
+  transaction._begin()
+  transaction.set("users/a", {"goal": 1})
+  transaction.set("users/b", {"goal": 2})
+  transaction._begin(retry_id=b"1")
+  transaction.set("users/a", {"goal": 1})
+  transaction._commit()
+  report = db.stats.report()
+  assert report["writes"] == 1
+  assert [site["operation"] for site in report["sites"]] == ["commit"]
+
+
+def operations(db):
+  """ Reads and writes recorded for each operation, whatever the call site """
+  totals = {}
+  for site in db.stats.report()["sites"]:
+    reads, writes = totals.get(site["operation"], (0, 0))
+    totals[site["operation"]] = (reads + site["reads"],
+                                 writes + site["writes"])
+  return totals
+
+
+def test_tracker_reads_and_writes_are_counted(db, today):
+  counted = InstrumentedDatabase(db)
+  # Checking the email is free reads one document, and the user is created in one batch
+  tracker = ProteinTracker.sign_up(counted, "user@example.com", "secret")
+  assert operations(counted) == {"get": (1, 0), "commit": (0, 2)}
+  # The first log of the day writes the day, the rollup and the streak together
+  tracker.log_food({"egg": 6})
+  assert operations(counted)["commit"] == (0, 5)
+  # The user's document and today's document are fetched together
+  ProteinTracker.load(counted, "user@example.com")
+  assert operations(counted)["get_all"] == (2, 0)
+  # Deleting reads today's document and writes the day, the rollup and the streak in a transaction
+  tracker.delete_foods(["egg"])
+  assert operations(counted)["get"] == (2, 0)
+  assert operations(counted)["commit"] == (0, 8)
+
+
+def test_call_sites_name_the_calling_methods(db, today):
+  counted = InstrumentedDatabase(db)
+  ProteinTracker.sign_up(counted, "user@example.com", "secret")
+  sites = {site["site"] for site in counted.stats.report()["sites"]}
+  assert all(site.endswith("ProteinTracker.sign_up") for site in sites)
+
+
+def test_queries_and_listeners_are_billed_per_document(db, today):
+  counted = InstrumentedDatabase(db)
+  days = counted.collection("users").document("user@example.com").collection(
+    "days")
+  # An empty query is still billed one read
+  assert list(days.stream()) == []
+  days.document("2026-03-14").set({"total_intake": 6})
+  days.document("2026-03-15").set({"total_intake": 8})
+  assert len(days.order_by("__name__").stream()) == 2
+  assert operations(counted)["stream"] == (3, 0)
+  assert operations(counted)["set"] == (0, 2)
+  watch = days.document("2026-03-15").on_snapshot(
+    lambda docs, changes, read_time: None)
+  days.document("2026-03-15").set({"total_intake": 10})
+  watch.unsubscribe()
+  assert operations(counted)["on_snapshot"][0] >= 1
+
+
+def test_report_is_dumped_as_json_or_summarized(db, today, tmp_path, capsys):
+  counted = InstrumentedDatabase(db)
+  ProteinTracker.sign_up(counted, "user@example.com", "secret")
+  path = tmp_path / "stats.json"
+  counted.stats.dump(str(path))
+  report = json.loads(path.read_text())
+  assert (report["reads"], report["writes"], report["calls"]) == (1, 2, 2)
+  assert all(sum(site["histogram"].values()) == site["calls"]
+             for site in report["sites"])
+  counted.stats.dump("-")
+  assert "1 reads, 2 writes" in capsys.readouterr().err
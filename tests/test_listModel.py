@@ -0,0 +1,74 @@
+from listModel import ListModel, food_row
+
+
+class Listbox:
+  """ Class standing in for a tk Listbox, keeping its rows and selection in lists """
+
+  def __init__(self):
+    self.rows = []
+    self.selected = set()
+    self.changes = 0
+
+  def insert(self, index, text):
+    self.changes += 1
+    if index == "end":
+      index = len(self.rows)
+    self.rows.insert(index, text)
+    self.selected = {i + 1 if i >= index else i for i in self.selected}
+
+  def delete(self, first, last=None):
+    self.changes += 1
+    last = len(self.rows) - 1 if last == "end" else first if last is None else last
+    del self.rows[first:last + 1]
+    removed = last - first + 1
+    self.selected = {
+      i - removed if i > last else i
+      for i in self.selected if not first <= i <= last
+    }
+
+  def selection_includes(self, index):
+    return index in self.selected
+
+  def selection_set(self, index):
+    self.selected.add(index)
+
+
+def test_sync_adds_updates_and_removes_rows():
+  listbox = Listbox()
+  model = ListModel(listbox, food_row)
+  model.sync({"egg": 6, "greek_yogurt": 10})
+  assert listbox.rows == ["egg: 6", "greek yogurt: 10"]
+  model.sync({"greek_yogurt": 12, "tuna": 20})
+  assert listbox.rows == ["greek yogurt: 12", "tuna: 20"]
+  assert model.keys == ["greek_yogurt", "tuna"]
+
+
+def test_sync_only_touches_changed_rows():
+  listbox = Listbox()
+  model = ListModel(listbox, food_row)
+  model.sync({"egg": 6, "tuna": 20, "milk": 8})
+  listbox.changes = 0
+  model.sync({"egg": 6, "tuna": 25, "milk": 8})
+  # The changed row is deleted and inserted again, the others are left alone
+  assert listbox.changes == 2
+  model.sync({"egg": 6, "tuna": 25, "milk": 8})
+  assert listbox.changes == 2
+
+
+def test_sync_keeps_the_selection_of_updated_rows():
+  listbox = Listbox()
+  model = ListModel(listbox, food_row)
+  model.sync({"egg": 6, "tuna": 20})
+  listbox.selection_set(1)
+  model.sync({"egg": 6, "tuna": 25})
+  assert listbox.selection_includes(1)
+
+
+def test_remove_and_clear():
+  listbox = Listbox()
+  model = ListModel(listbox, food_row)
+  model.sync({"egg": 6, "tuna": 20, "milk": 8})
+  assert model.remove([2, 0]) == ["egg", "milk"]
+  assert listbox.rows == ["tuna: 20"]
+  model.clear()
+  assert listbox.rows == [] and model.values == {}
@@ -0,0 +1,50 @@
+import time
+
+from nutritionCache import NutritionCache
+
+EGG = [{"food_name": "egg", "nf_protein": 6.3, "serving_weight_grams": 50}]
+
+
+def test_get_normalizes_searches(tmp_path):
+  cache = NutritionCache(str(tmp_path / "cache.json"))
+  cache.put("Egg", EGG)
+  assert cache.get("  EGG ") == EGG
+  assert cache.get("tuna") is None
+  assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entries_expire(tmp_path, monkeypatch):
+  now = [1000.0]
+  monkeypatch.setattr(time, "time", lambda: now[0])
+  cache = NutritionCache(str(tmp_path / "cache.json"), ttl=60)
+  cache.put("egg", EGG)
+  now[0] += 59
+  assert cache.get("egg") == EGG
+  now[0] += 2
+  assert cache.get("egg") is None
+  assert "egg" not in cache.entries
+
+
+def test_least_recently_used_is_forgotten(tmp_path):
+  cache = NutritionCache(str(tmp_path / "cache.json"), size=2)
+  cache.put("egg", EGG)
+  cache.put("tuna", EGG)
+  cache.get("egg")
+  cache.put("milk", EGG)
+  assert list(cache.entries) == ["egg", "milk"]
+
+
+def test_cache_is_kept_on_disk(tmp_path, monkeypatch):
+  path = str(tmp_path / "cache.json")
+  NutritionCache(path).put("egg", EGG)
+  assert NutritionCache(path).get("egg") == EGG
+  # Expired entries aren't loaded
+  later = time.time() + 120
+  monkeypatch.setattr(time, "time", lambda: later)
+  assert NutritionCache(path, ttl=60).entries == {}
+
+
+def test_damaged_file_is_ignored(tmp_path):
+  path = tmp_path / "cache.json"
+  path.write_text("{not json")
+  assert NutritionCache(str(path)).entries == {}
@@ -0,0 +1,36 @@
+import pytest
+
+# The client needs requests, which brings urllib3
+pytest.importorskip("requests")
+
+from urllib3.response import HTTPResponse
+
+from nutritionixClient import (MAX_RETRY_WAIT, RETRY_STATUSES, CappedRetry,
+                               NutritionixClient)
+
+
+def test_exponential_backoff_is_capped():
+  retry = CappedRetry(total=10, backoff_factor=10)
+  for attempt in range(5):
+    retry = retry.increment(method="POST", url="/v2/natural/nutrients")
+  # Uncapped, the fifth wait would be 10 * 2 ** 4 seconds
+  assert retry.get_backoff_time() == MAX_RETRY_WAIT
+
+
+def test_retry_after_is_capped():
+  retry = CappedRetry(total=3, respect_retry_after_header=True)
+  asked = HTTPResponse(body=b"", headers={"Retry-After": "120"}, status=429)
+  assert retry.get_retry_after(asked) == MAX_RETRY_WAIT
+  short = HTTPResponse(body=b"", headers={"Retry-After": "1"}, status=429)
+  assert retry.get_retry_after(short) == 1
+  assert retry.get_retry_after(HTTPResponse(body=b"", status=429)) is None
+
+
+def test_client_retries_post_with_the_capped_rules():
+  client = NutritionixClient(retries=2)
+  adapter = client.session.get_adapter("https://trackapi.nutritionix.com")
+  retry = adapter.max_retries
+  assert isinstance(retry, CappedRetry)
+  assert retry.total == 2
+  assert set(retry.status_forcelist) == set(RETRY_STATUSES)
+  assert "POST" in retry.allowed_methods
@@ -0,0 +1,20 @@
+from prefixIndex import PrefixIndex
+
+
+def test_suggest_names_starting_with_prefix():
+  index = PrefixIndex(["Greek Yogurt", "grapes", "egg", "green beans"])
+  assert index.suggest("gr") == ["grapes", "Greek Yogurt", "green beans"]
+  assert index.suggest("  GREE ") == ["Greek Yogurt", "green beans"]
+  assert index.suggest("z") == []
+
+
+def test_suggest_empty_prefix_and_limit():
+  index = PrefixIndex(f"chicken {i}" for i in range(10))
+  assert index.suggest("") == []
+  assert len(index.suggest("chicken", limit=3)) == 3
+
+
+def test_add_skips_duplicates_and_blank_names():
+  index = PrefixIndex(["egg", "Egg ", "  "])
+  assert index.keys == ["egg"]
+  assert index.suggest("e") == ["egg"]
@@ -0,0 +1,228 @@
+import datetime
+
+import pytest
+
+from instrumentedDatabase import InstrumentedDatabase
+from proteinTracker import ProteinTracker, food_key
+from userSession import firestore_values
+
+
+@pytest.fixture
+def tracker(db, today):
+  """ A new user signed up on a FakeFirestore """
+  return ProteinTracker.sign_up(db, "user@example.com", "secret")
+
+
+def day_document(db, date):
+  """ Fields of one of the user's day documents, as stored """
+  doc = db.collection("users").document("user@example.com").collection(
+    "days").document(str(date)).get()
+  return doc.to_dict()
+
+
+def test_special_values_come_from_the_client(db):
+  assert firestore_values(db) is db.field_values
+  assert firestore_values(InstrumentedDatabase(db)) is db.field_values
+
+
+def test_sign_up_refuses_a_used_email(db, tracker):
+  assert ProteinTracker.sign_up(db, "user@example.com", "other") is None
+  assert ProteinTracker.load(db, "user@example.com").check_password("secret")
+
+
+def test_load_unknown_user(db, today):
+  assert ProteinTracker.load(db, "nobody@example.com") is None
+
+
+def test_log_food_adds_to_foods_and_total(db, today, tracker):
+  assert tracker.log_food({"egg": 6, "greek yogurt": 10}) == 16
+  assert tracker.log_food({"egg": 6}) == 22
+  assert tracker.today_foods() == {"egg": 12, "greek_yogurt": 10}
+  assert day_document(db, today.today()) == {
+    "egg": 12,
+    "greek_yogurt": 10,
+    "total_intake": 22
+  }
+
+
+def test_log_food_from_two_devices_keeps_both(db, today, tracker):
+  other = ProteinTracker.load(db, "user@example.com")
+  tracker.log_food({"egg": 6})
+  other.log_food({"egg": 10})
+  assert day_document(db, today.today()) == {"egg": 16, "total_intake": 16}
+
+
+def test_delete_foods_lowers_total(db, today, tracker):
+  tracker.log_food({"egg": 6, "tuna": 20})
+  assert tracker.delete_foods(["egg", "egg", "bread"]) == 6
+  assert tracker.today_summary()["foods"] == {"tuna": 20}
+  assert day_document(db, today.today()) == {"tuna": 20, "total_intake": 20}
+
+
+def test_delete_foods_uses_the_amounts_in_the_database(db, today, tracker):
+  tracker.log_food({"egg": 6, "tuna": 20})
+  # Another device logs more egg, which this session hasn't heard of
+  ProteinTracker.load(db, "user@example.com").log_food({"egg": 10})
+  assert tracker.delete_foods(["egg"]) == 16
+  assert tracker.today_intake() == 20
+  assert day_document(db, today.today()) == {"tuna": 20, "total_intake": 20}
+
+
+def test_food_named_like_the_total_keeps_the_total(db, today, tracker):
+  assert food_key("total intake") != "total_intake"
+  tracker.log_food({"egg": 6, "total intake": 5})
+  assert day_document(db, today.today())["total_intake"] == 11
+  assert tracker.delete_foods(["total_intake"]) == 0
+  assert tracker.today_intake() == 11
+
+
+def test_streak_follows_todays_intake(db, today, tracker):
+  assert tracker.streak() == 0
+  tracker.log_food({"egg": 6})
+  today.current = today.current + datetime.timedelta(1)
+  assert tracker.streak() == 1
+  tracker.log_food({"egg": 6})
+  # Today only counts once it is over
+  assert tracker.streak() == 1
+  tracker.delete_foods(["egg"])
+  assert tracker.session.data["streak"] == {
+    "length": 1,
+    "last_date": str(today.today() - datetime.timedelta(1))
+  }
+  assert ProteinTracker.load(db, "user@example.com").streak() == 1
+
+
+def test_streak_starts_over_after_a_missed_day(db, today, tracker):
+  tracker.log_food({"egg": 6})
+  today.current = today.current + datetime.timedelta(2)
+  assert tracker.streak() == 0
+  tracker.log_food({"egg": 6})
+  assert tracker.session.data["streak"]["length"] == 1
+
+
+def test_set_goal(db, today, tracker):
+  tracker.set_goal(120)
+  tracker.log_food({"chicken": 130})
+  assert ProteinTracker.load(db, "user@example.com").protein_goal() == 120
+  assert tracker.goal_reached()
+
+
+def test_legacy_user_is_migrated(db, today):
+  yesterday = str(today.today() - datetime.timedelta(1))
+  before = str(today.today() - datetime.timedelta(2))
+  db.collection("users").document("old@example.com").set({
+    "password": "secret",
+    "protein_goal": 100,
+    # Old versions could leave the total stale or missing
+    yesterday: {
+      "egg": 6,
+      "tuna": 20,
+      "total_intake": 6
+    },
+    before: {
+      "milk": 8
+    }
+  })
+  tracker = ProteinTracker.load(db, "old@example.com")
+  user = db.collection("users").document("old@example.com").get().to_dict()
+  assert yesterday not in user and before not in user
+  days = db.collection("users").document("old@example.com").collection("days")
+  assert days.document(yesterday).get().to_dict()["total_intake"] == 26
+  assert days.document(before).get().to_dict() == {
+    "milk": 8,
+    "total_intake": 8
+  }
+  assert tracker.streak() == 2
+
+
+def test_history_rebuilds_and_then_follows_the_rollup(db, today, tracker):
+  yesterday = today.today() - datetime.timedelta(1)
+  # A day logged before rollups existed
+  db.collection("users").document("user@example.com").collection(
+    "days").document(str(yesterday)).set({
+      "egg": 12,
+      "total_intake": 12
+    })
+  engine = tracker.history(yesterday, today.today())
+  assert list(engine.totals) == [12, 0]
+  tracker.log_food({"egg": 6})
+  assert list(tracker.history(yesterday, today.today()).totals) == [12, 6]
+  # A new session reads the rollup kept up to date by the log
+  reloaded = ProteinTracker.load(db, "user@example.com")
+  assert list(reloaded.history(yesterday, today.today()).totals) == [12, 6]
+
+
+def test_updates_from_another_device_and_the_next_day(db, today, tracker):
+  tracker.subscribe()
+  tracker.log_food({"egg": 6})
+  other = ProteinTracker.load(db, "user@example.com")
+  other.log_food({"tuna": 20})
+  assert tracker.apply_updates()
+  assert tracker.today_intake() == 26
+  # After midnight the session listens to the new day, where another device already logged food
+  today.current = today.current + datetime.timedelta(1)
+  other.log_food({"milk": 8})
+  assert tracker.apply_updates()
+  assert tracker.today_foods() == {"milk": 8}
+  tracker.unsubscribe()
+
+
+def test_failed_log_leaves_the_session_unchanged(db, today, tracker,
+                                                 monkeypatch):
+  tracker.log_food({"egg": 6})
+
+  def fail(operations):
+    raise ConnectionError("offline")
+
+  monkeypatch.setattr(db, "commit", fail)
+  with pytest.raises(ConnectionError):
+    tracker.log_food({"tuna": 20})
+  assert tracker.today_foods() == {"egg": 6}
+  assert tracker.today_intake() == 6
+  assert tracker.session.data["streak"]["last_date"] == str(today.today())
+
+
+def test_history_follows_food_logged_on_another_device(db, today, tracker):
+  tracker.subscribe()
+  tracker.log_food({"egg": 6})
+  assert list(tracker.history(today.today(), today.today()).totals) == [6]
+  ProteinTracker.load(db, "user@example.com").log_food({"tuna": 20})
+  tracker.apply_updates()
+  assert tracker.today_intake() == 26
+  assert list(tracker.history(today.today(), today.today()).totals) == [26]
+  tracker.unsubscribe()
+
+
+def test_rebuilding_a_rollup_keeps_days_added_meanwhile(db, today, tracker):
+  year = str(today.today().year)
+  rollup_ref = tracker.session.rollup_ref(db, year)
+  # Another device adds a day to the rollup while it is rebuilt
+  rollup_ref.set({"days": {f"{year}-01-02": 9}})
+  totals = tracker.session.rebuild_rollup(db, year)
+  assert rollup_ref.get().to_dict() == {
+    "days": {
+      f"{year}-01-02": 9,
+      **totals
+    },
+    "complete": True
+  }
+
+
+def test_fetch_writes_nothing_until_prepared(db, today):
+  yesterday = str(today.today() - datetime.timedelta(1))
+  db.collection("users").document("old@example.com").set({
+    "password": "secret",
+    "protein_goal": 100,
+    yesterday: {
+      "egg": 6
+    }
+  })
+  counted = InstrumentedDatabase(db)
+  tracker = ProteinTracker.fetch(counted, "old@example.com")
+  assert not tracker.check_password("guess")
+  assert counted.stats.report()["writes"] == 0
+  assert yesterday in db.collection("users").document(
+    "old@example.com").get().to_dict()
+  tracker.prepare()
+  assert counted.stats.report()["writes"] > 0
+  assert tracker.streak() == 1
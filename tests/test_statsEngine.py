@@ -0,0 +1,76 @@
+import datetime
+
+import numpy as np
+
+from statsEngine import StatsEngine, downsample
+
+
+def engine(start, totals):
+  """ An engine over consecutive days from start (YYYY-MM-DD) """
+  first = np.datetime64(start, "D")
+  return StatsEngine(first + np.arange(len(totals)),
+                     np.array(totals, dtype=float))
+
+
+def test_from_days_fills_missing_days():
+  days = {"2026-03-02": 10, "2026-03-04": 30, "2026-04-01": 50}
+  stats = StatsEngine.from_days(days, datetime.date(2026, 3, 1),
+                                datetime.date(2026, 3, 5))
+  assert list(stats.totals) == [0, 10, 0, 30, 0]
+  assert str(stats.dates[0]) == "2026-03-01"
+
+
+def test_rolling_average_starts_with_the_days_available():
+  stats = engine("2026-03-01", [10, 20, 30, 40])
+  assert list(stats.rolling_average(2)) == [10, 15, 25, 35]
+  assert list(stats.rolling_average(7)) == [10, 15, 20, 25]
+
+
+def test_period_sums_start_weeks_on_monday():
+  # 2026-03-01 is a Sunday
+  stats = engine("2026-03-01", [1, 2, 3, 4, 5, 6, 7, 8])
+  starts, sums = stats.period_sums("week")
+  assert [str(start) for start in starts] == ["2026-03-01", "2026-03-02"]
+  assert list(sums) == [1, 35]
+
+
+def test_period_sums_by_month_and_year():
+  stats = engine("2025-12-30", [1, 2, 3, 4])
+  starts, sums = stats.period_sums("month")
+  assert [str(start) for start in starts] == ["2025-12-30", "2026-01-01"]
+  assert list(sums) == [3, 7]
+  assert list(stats.period_sums("year")[1]) == [3, 7]
+  assert len(engine("2026-03-01", []).period_sums("week")[1]) == 0
+
+
+def test_goal_hit_rate_counts_tracked_days_only():
+  stats = engine("2026-03-01", [0, 100, 50, 0, 120])
+  assert stats.goal_hit_rate(100) == 2 / 3
+  assert engine("2026-03-01", [0, 0]).goal_hit_rate(100) == 0
+
+
+def test_percentile_bands_skip_untracked_days():
+  stats = engine("2026-03-01", [0, 10, 20, 0, 30])
+  assert list(stats.percentile_bands((0, 50, 100))) == [10, 20, 30]
+  assert list(engine("2026-03-01", [0]).percentile_bands()) == [0, 0, 0]
+
+
+def test_short_series_is_kept_whole():
+  values = np.arange(10, dtype=float)
+  assert list(downsample(values, 20)) == list(range(10))
+  assert list(downsample(values, 2)) == list(range(10))
+
+
+def test_downsample_keeps_ends_and_order():
+  values = np.random.default_rng(0).random(1000)
+  indexes = downsample(values, 120)
+  assert len(indexes) == 120
+  assert indexes[0] == 0 and indexes[-1] == 999
+  assert np.all(np.diff(indexes) > 0)
+
+
+def test_downsample_keeps_peaks():
+  values = np.zeros(1000)
+  values[[137, 512, 871]] = 200
+  indexes = downsample(values, 50)
+  assert {137, 512, 871} <= set(indexes.tolist())
@@ -0,0 +1,553 @@
+import datetime
+import queue
+
+# Firestore allows at most 500 operations in a batch. One is kept for removing the legacy fields from the user's document.
+BATCH_LIMIT = 499
+# Number of yearly rollups fetched per round trip
+ROLLUP_PAGE = 5
+# Field of a day's document holding the day's total, so no food may use it as its key
+TOTAL_FIELD = "total_intake"
+
+
+def is_date(key):
+  """
+  Checks if a field of the user's document is a legacy day field
+
+  Args
+    key: str
+        name of the field
+
+  Returns
+    bool: True if the field is named after a date (YYYY-MM-DD)
+  """
+  try:
+    datetime.date.fromisoformat(key)
+  except ValueError:
+    return False
+  return True
+
+
+def firestore_values(db):
+  """
+  Gets the module holding firestore's special values, such as Increment, DELETE_FIELD and transactional. A client bringing its own, like FakeFirestore, names them in a field_values attribute.
+
+  Args
+    db: firestore client object
+        the client the values are written with
+
+  Returns
+    module: the client's field_values, or firebase_admin.firestore
+  """
+  values = getattr(db, "field_values", None)
+  if values is not None:
+    return values
+  # firebase_admin is slow to import, so it is only imported once it is needed
+  from firebase_admin import firestore
+  return firestore
+
+
+class UserSession:
+  """
+  Class for an in-memory snapshot of the logged in user's data, shared by every page so that pages render without going back to firestore. The user's document (users/{email}) only holds their profile, and each day's intake lives in its own document (users/{email}/days/{YYYY-MM-DD}) so reads stay the same size no matter how long the user has tracked. The total of every day of a year is also kept in one document (users/{email}/rollups/{YYYY}) so statistics over long periods take one read per year.
+
+  Attributes
+    email: str
+        email of the logged in user, used as the document id
+    data: dict
+        contents of the user's document (password, protein goal and streak record)
+    days: dict
+        intake of each day fetched so far, keyed by date. Days that were fetched but don't exist are None
+    updates: Queue object
+        changes to today's document pushed by firestore, waiting to be applied on the tkinter thread
+    watch: firestore Watch object
+        listener on today's document, or None if the session isn't listening
+    watched_date: str
+        day whose document is listened to (YYYY-MM-DD)
+    watch_db: firestore client object
+        client the listener was started with, used to listen to the next day after midnight
+    rollups: dict
+        total intake of each day of the years fetched so far, keyed by year then date
+    first_day: datetime.date
+        first day the user tracked, or None until it is needed
+
+  Methods
+    load(cls, db, email)
+        fetches the user's document and today's document in one round trip, and prepares the session
+    fetch(cls, db, email)
+        fetches the user's document and today's document in one round trip, without writing anything
+    prepare(self, db)
+        migrates legacy days and builds the streak record if needed
+    user_ref(self, db)
+        returns the reference to the user's document
+    day_ref(self, db, date)
+        returns the reference to a day's document
+    today(self)
+        returns today's intake dictionary, creating it locally if needed
+    protein_goal(self)
+        returns the user's protein goal
+    get_days(self, db, dates)
+        fetches the days that haven't been fetched yet in one round trip
+    migrate(self, db)
+        moves legacy day fields from the user's document into day documents
+    subscribe(self, db)
+        starts listening to changes of today's document
+    unsubscribe(self)
+        stops listening to changes of today's document
+    apply_updates(self)
+        applies the changes pushed by firestore to the session
+    streak(self)
+        returns the number of days in a row the user tracked, up to yesterday
+    ensure_streak(self, db)
+        builds the streak record of users who don't have one yet
+    streak_change(self, before, after)
+        works out the streak record after a change of today's intake, without changing the session
+    rollup_ref(self, db, year)
+        returns the reference to a year's rollup document
+    get_totals(self, db, start, end)
+        returns the total intake of every day with food between two days
+    rebuild_rollup(self, db, year)
+        rebuilds a year's rollup from the year's day documents
+    queue_rollup(self, db, batch, amount)
+        queues the write of a change of today's intake to this year's rollup
+    count_in_rollup(self, amount)
+        adds a change of today's intake to this year's rollup in the session
+    first_date(self, db)
+        returns the first day the user tracked
+  """
+
+  def __init__(self, email, data, days=None):
+    """
+    Initializes UserSession.
+
+    Args
+      email: str
+          email of the logged in user
+      data: dict
+          contents of the user's firestore document
+      days: dict
+          intake of the days already known, keyed by date
+    """
+    self.email = email
+    self.data = data
+    self.days = days if days is not None else {}
+    self.updates = queue.Queue()
+    self.watch = None
+    self.watched_date = None
+    self.watch_db = None
+    self.rollups = {}
+    self.first_day = None
+
+  @classmethod
+  def load(cls, db, email):
+    """
+    Fetches the user's document and today's document in a single round trip. Users still on the old layout are migrated.
+
+    Args
+      db: firestore client object
+          Used to access firestore database to persist information
+      email: str
+          email of the user to load
+
+    Returns
+      UserSession: the snapshot of the user's data, or None if the user doesn't exist
+    """
+    session = cls.fetch(db, email)
+    if session is not None:
+      session.prepare(db)
+    return session
+
+  @classmethod
+  def fetch(cls, db, email):
+    """
+    Fetches the user's document and today's document in a single round trip, without writing anything, so the password can be checked before the user's data is changed
+
+    Args
+      db: firestore client object
+          Used to access firestore database to persist information
+      email: str
+          email of the user to load
+
+    Returns
+      UserSession: the snapshot of the user's data, or None if the user doesn't exist
+    """
+    today = str(datetime.date.today())
+    user_ref = db.collection('users').document(email)
+    day_ref = user_ref.collection('days').document(today)
+    session = None
+    today_doc = None
+    # Learned that get_all returns documents in any order, so they are matched by their id
+    for doc in db.get_all([user_ref, day_ref]):
+      if doc.id == today:
+        today_doc = doc
+      elif doc.exists:
+        session = cls(email, doc.to_dict())
+    if session is None:
+      return None
+    session.days[today] = today_doc.to_dict() if today_doc.exists else None
+    return session
+
+  def prepare(self, db):
+    """
+    Moves a user still on the old layout to day documents and builds their streak record if they don't have one yet. Writes nothing for users already on the current layout.
+
+    Args
+      db: firestore client object
+          Used to access firestore database to persist information
+    """
+    self.migrate(db)
+    self.ensure_streak(db)
+
+  def user_ref(self, db):
+    """
+    Gets the reference to the user's document
+
+    Args
+      db: firestore client object
+          Used to access firestore database to persist information
+
+    Returns
+      firestore DocumentReference: users/{email}
+    """
+    return db.collection('users').document(self.email)
+
+  def day_ref(self, db, date):
+    """
+    Gets the reference to a day's document
+
+    Args
+      db: firestore client object
+          Used to access firestore database to persist information
+      date: str
+          day to access (YYYY-MM-DD)
+
+    Returns
+      firestore DocumentReference: users/{email}/days/{date}
+    """
+    return self.user_ref(db).collection('days').document(date)
+
+  def today(self):
+    """
+    Gets today's intake dictionary. If the user has not logged anything today, an empty day is created locally.
+
+    Returns
+      dict: today's foods and total intake
+    """
+    today = str(datetime.date.today())
+    if self.days.get(today) is None:
+      self.days[today] = {TOTAL_FIELD: 0}
+    return self.days[today]
+
+  def protein_goal(self):
+    """
+    Gets the user's protein goal
+
+    Returns
+      int: the user's protein goal in grams
+    """
+    return self.data["protein_goal"]
+
+  def get_days(self, db, dates):
+    """
+    Gets the intake of several days, fetching the ones not in the session in one round trip
+
+    Args
+      db: firestore client object
+          Used to access firestore database to persist information
+      dates: list
+          days to get (YYYY-MM-DD)
+
+    Returns
+      dict: intake of each requested day that exists, keyed by date
+    """
+    missing = [date for date in dates if date not in self.days]
+    if len(missing) != 0:
+      for doc in db.get_all([self.day_ref(db, date) for date in missing]):
+        self.days[doc.id] = doc.to_dict() if doc.exists else None
+    return {
+      date: self.days[date]
+      for date in dates if self.days[date] is not None
+    }
+
+  def migrate(self, db):
+    """
+    Moves days stored as fields of the user's document (old layout) into their own documents. Each batch copies the days and removes them from the user's document together, so a migration that stops halfway can carry on at the next log in.
+
+    Args
+      db: firestore client object
+          Used to access firestore database to persist information
+    """
+    legacy_dates = [key for key in self.data if is_date(key)]
+    if len(legacy_dates) == 0:
+      return
+    firestore = firestore_values(db)
+    for start in range(0, len(legacy_dates), BATCH_LIMIT):
+      batch = db.batch()
+      removed_fields = {}
+      for date in legacy_dates[start:start + BATCH_LIMIT]:
+        day = self.data.pop(date)
+        # Old versions only rewrote the total when the food page was shown, so it may be missing or stale. It is worked out from the foods once here, after which it is kept up to date whenever food is logged or deleted.
+        day[TOTAL_FIELD] = sum(
+          amount for food, amount in day.items() if food != TOTAL_FIELD)
+        batch.set(self.day_ref(db, date), day)
+        removed_fields[date] = firestore.DELETE_FIELD
+        self.days[date] = day
+      batch.set(self.user_ref(db), removed_fields, merge=True)
+      batch.commit()
+
+  def subscribe(self, db):
+    """
+    Starts listening to today's document, so food logged or deleted on another device shows up without reading it again. Firestore calls the listener on its own thread, so changes are queued and applied later by apply_updates.
+
+    Args
+      db: firestore client object
+          Used to access firestore database to persist information
+    """
+    today = str(datetime.date.today())
+
+    def on_snapshot(docs, changes, read_time):
+      # Learned how to listen to a document using https://firebase.google.com/docs/firestore/query-data/listen
+      for doc in docs:
+        self.updates.put((today, doc.to_dict() if doc.exists else None))
+
+    self.unsubscribe()
+    self.watch = self.day_ref(db, today).on_snapshot(on_snapshot)
+    self.watched_date = today
+    self.watch_db = db
+
+  def unsubscribe(self):
+    """ Stops listening to today's document """
+    if self.watch is not None:
+      self.watch.unsubscribe()
+      self.watch = None
+
+  def apply_updates(self):
+    """
+    Applies the changes pushed by firestore to the session. After midnight the session listens to the new day instead, which also fetches it, as food may already have been logged on it from another device. Must be called from the tkinter thread.
+
+    Returns
+      bool: True if a day changed or a new day started
+    """
+    changed = False
+    if self.watch is not None and self.watched_date != str(
+        datetime.date.today()):
+      self.subscribe(self.watch_db)
+      changed = True
+    while True:
+      try:
+        date, day = self.updates.get_nowait()
+      except queue.Empty:
+        return changed
+      if day != self.days.get(date):
+        self.days[date] = day
+        # The yearly rollup fetched for statistics follows the day, so the stats page agrees with the food page
+        if date[:4] in self.rollups:
+          self.rollups[date[:4]][date] = (day or {}).get(TOTAL_FIELD, 0)
+        changed = True
+
+  def streak(self):
+    """
+    Gets the number of days in a row the user tracked food, up to yesterday, from the streak record
+
+    Returns
+      int: length of the streak
+    """
+    today = datetime.date.today()
+    record = self.data["streak"]
+    if record["last_date"] == str(today - datetime.timedelta(1)):
+      return record["length"]
+    # Today is not counted until it is over
+    if record["last_date"] == str(today):
+      return record["length"] - 1
+    return 0
+
+  def ensure_streak(self, db):
+    """
+    Builds the streak record of users who don't have one yet by walking back one day at a time. This only happens once per user, a month of days per round trip.
+
+    Args
+      db: firestore client object
+          Used to access firestore database to persist information
+    """
+    if "streak" in self.data:
+      return
+    today = datetime.date.today()
+    length = 0
+    tracked = True
+    while tracked:
+      month = [
+        str(today - datetime.timedelta(length + i)) for i in range(1, 31)
+      ]
+      days = self.get_days(db, month)
+      for date in month:
+        if date not in days or days[date][TOTAL_FIELD] == 0:
+          tracked = False
+          break
+        length += 1
+    record = {
+      "length": length,
+      "last_date": str(today - datetime.timedelta(1))
+    }
+    # A day with food logged today extends the streak to today
+    if self.today().get(TOTAL_FIELD, 0) > 0:
+      record = {"length": length + 1, "last_date": str(today)}
+    self.data["streak"] = record
+    self.user_ref(db).set({"streak": record}, merge=True)
+
+  def streak_change(self, before, after):
+    """
+    Works out the streak record after today's intake becomes or stops being empty, without changing the session. Only today can change, so the record is worked out in constant time.
+
+    Args
+      before: float
+          today's total intake before the change
+      after: float
+          today's total intake after the change
+
+    Returns
+      dict: the new streak record, or None if it doesn't change
+    """
+    today = datetime.date.today()
+    yesterday = str(today - datetime.timedelta(1))
+    record = self.data["streak"]
+    # Round so that what is left of float sums after deleting every food counts as empty
+    before = round(before, 2)
+    after = round(after, 2)
+    # Today becomes tracked: the streak goes on from yesterday or starts over
+    if before <= 0 < after and record["last_date"] != str(today):
+      if record["last_date"] == yesterday:
+        return {"length": record["length"] + 1, "last_date": str(today)}
+      return {"length": 1, "last_date": str(today)}
+    # Today is emptied: the streak goes back to ending yesterday
+    if after <= 0 < before and record["last_date"] == str(today):
+      return {"length": record["length"] - 1, "last_date": yesterday}
+    return None
+
+  def rollup_ref(self, db, year):
+    """
+    Gets the reference to a year's rollup document
+
+    Args
+      db: firestore client object
+          Used to access firestore database to persist information
+      year: str
+          year of the rollup (YYYY)
+
+    Returns
+      firestore DocumentReference: users/{email}/rollups/{year}
+    """
+    return self.user_ref(db).collection('rollups').document(year)
+
+  def get_totals(self, db, start, end):
+    """
+    Gets the total intake of every day with food between two days from the yearly rollups, fetching the years not in the session a page at a time. A rollup that was never completed (the year started before rollups existed) is rebuilt once from the year's day documents.
+
+    Args
+      db: firestore client object
+          Used to access firestore database to persist information
+      start: datetime.date
+          first day
+      end: datetime.date
+          last day
+
+    Returns
+      dict: total intake of each day with food, keyed by date
+    """
+    years = [str(year) for year in range(start.year, end.year + 1)]
+    missing = [year for year in years if year not in self.rollups]
+    # Long histories are fetched a page of years at a time
+    for page in range(0, len(missing), ROLLUP_PAGE):
+      refs = [
+        self.rollup_ref(db, year)
+        for year in missing[page:page + ROLLUP_PAGE]
+      ]
+      for doc in db.get_all(refs):
+        rollup = doc.to_dict() if doc.exists else {}
+        if rollup.get("complete", False):
+          self.rollups[doc.id] = rollup["days"]
+        else:
+          self.rollups[doc.id] = self.rebuild_rollup(db, doc.id)
+    totals = {}
+    for year in years:
+      for date, total in self.rollups[year].items():
+        if str(start) <= date <= str(end) and total > 0:
+          totals[date] = total
+    return totals
+
+  def rebuild_rollup(self, db, year):
+    """
+    Rebuilds a year's rollup from the year's day documents and saves it
+
+    Args
+      db: firestore client object
+          Used to access firestore database to persist information
+      year: str
+          year of the rollup (YYYY)
+
+    Returns
+      dict: total intake of each day of the year, keyed by date
+    """
+    days_ref = self.user_ref(db).collection('days')
+    # Learned that documents can be filtered by id with "__name__" using https://firebase.google.com/docs/firestore/query-data/queries
+    query = days_ref.where("__name__", ">=",
+                           days_ref.document(f"{year}-01-01")).where(
+                             "__name__", "<=",
+                             days_ref.document(f"{year}-12-31"))
+    totals = {
+      doc.id: doc.to_dict().get(TOTAL_FIELD, 0)
+      for doc in query.stream()
+    }
+    # Merged, so a day another device adds to the rollup meanwhile isn't erased
+    rollup = {"days": totals, "complete": True}
+    self.rollup_ref(db, year).set(rollup, merge=True)
+    return totals
+
+  def queue_rollup(self, db, batch, amount):
+    """
+    Queues the write adding a change of today's intake to this year's rollup, without changing the session
+
+    Args
+      db: firestore client object
+          Used to access firestore database to persist information
+      batch: firestore WriteBatch or Transaction object
+          batch or transaction writing the change of today's intake
+      amount: float
+          grams added to today's intake, negative when food is deleted
+    """
+    firestore = firestore_values(db)
+    today = str(datetime.date.today())
+    batch.set(self.rollup_ref(db, today[:4]),
+              {"days": {
+                today: firestore.Increment(amount)
+              }},
+              merge=True)
+
+  def count_in_rollup(self, amount):
+    """
+    Adds a change of today's intake to this year's rollup in the session, if the year was fetched
+
+    Args
+      amount: float
+          grams added to today's intake, negative when food is deleted
+    """
+    today = str(datetime.date.today())
+    year = today[:4]
+    if year in self.rollups:
+      self.rollups[year][today] = self.rollups[year].get(today, 0) + amount
+
+  def first_date(self, db):
+    """
+    Gets the first day the user tracked, with a query reading a single day document. It is remembered for the rest of the session.
+
+    Args
+      db: firestore client object
+          Used to access firestore database to persist information
+
+    Returns
+      datetime.date: the first day tracked, or today if the user never tracked
+    """
+    if self.first_day is None:
+      days_ref = self.user_ref(db).collection('days')
+      self.first_day = datetime.date.today()
+      for doc in days_ref.order_by("__name__").limit(1).stream():
+        self.first_day = datetime.date.fromisoformat(doc.id)
+    return self.first_day